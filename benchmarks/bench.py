@@ -0,0 +1,168 @@
+import io
+import os
+import sys
+import json
+import contextlib
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import subprocess
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, '..', 'src'))
+
+from corpus import CorpusSpec, make_document, write_corpus
+from codefile import text_to_textnodes, markdown_to_blocks
+from blocktype import block_to_block_type, markdown_to_html_node, scan_blocks
+import main as site
+
+HISTORY_PATH = os.path.join(HERE, 'history.jsonl')
+
+def best_of(func, repeat, number=1):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        best = min(best, (time.perf_counter() - start) / number)
+    return best
+
+def micro_benchmarks(spec, repeat):
+    document = make_document(spec)
+    blocks = markdown_to_blocks(document)
+    paragraphs = [block for block in blocks if block_to_block_type(block).value == "paragraph"]
+    tree = markdown_to_html_node(document)
+
+    def inline():
+        for paragraph in paragraphs:
+            text_to_textnodes(" ".join(paragraph.split("\n")))
+
+    def classify():
+        for block in blocks:
+            block_to_block_type(block)
+
+    return {
+        "text_to_textnodes": best_of(inline, repeat),
+        "markdown_to_blocks": best_of(lambda: markdown_to_blocks(document), repeat),
+        "block_to_block_type": best_of(classify, repeat),
+        "scan_blocks": best_of(lambda: list(scan_blocks(io.StringIO(document))), repeat),
+        "markdown_to_html_node": best_of(lambda: markdown_to_html_node(document), repeat),
+        "to_html": best_of(tree.to_html, repeat),
+    }
+
+def build(root, args):
+    cwd = os.getcwd()
+    os.chdir(root)
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            site.main(args)
+    finally:
+        os.chdir(cwd)
+
+def end_to_end_benchmarks(spec, repeat, jobs, pipeline=False):
+    root = tempfile.mkdtemp(prefix="staticsite-bench-")
+    try:
+        write_corpus(root, spec)
+        results = {"build_full": best_of(lambda: build(root, ["/", "-q"]), repeat)}
+        results["build_incremental_noop"] = best_of(lambda: build(root, ["/", "-q", "--incremental"]), repeat)
+        if jobs > 1:
+            results[f"build_full_j{jobs}"] = best_of(lambda: build(root, ["/", "-q", "-j", str(jobs)]), repeat)
+        if pipeline:
+            results["build_full_pipeline"] = best_of(lambda: build(root, ["/", "-q", "--pipeline"]), repeat)
+        return results
+    finally:
+        shutil.rmtree(root)
+
+def current_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=HERE, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def load_history(path):
+    if not os.path.exists(path):
+        return []
+    with open(path) as file:
+        return [json.loads(line) for line in file if line.strip()]
+
+def run(args):
+    spec = CorpusSpec(pages=args.pages, page_size=args.page_size, inline_density=args.inline_density,
+                      list_ratio=args.list_ratio, code_ratio=args.code_ratio, quote_ratio=args.quote_ratio,
+                      nesting_depth=args.nesting_depth, seed=args.seed)
+    results = micro_benchmarks(spec, args.repeat)
+    if not args.micro_only:
+        results.update(end_to_end_benchmarks(spec, args.repeat, args.jobs, args.pipeline))
+
+    record = {
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "commit": current_commit(),
+        "label": args.label,
+        "python": platform.python_version(),
+        "corpus": spec.as_dict(),
+        "results": results,
+    }
+    with open(args.history, 'a') as file:
+        file.write(json.dumps(record, sort_keys=True) + "\n")
+
+    for name, seconds in results.items():
+        print(f"{name:<26}{seconds * 1000:>12.3f} ms")
+    print(f"Appended to {args.history}")
+
+def compare(args):
+    history = load_history(args.history)
+    if len(history) < 2:
+        sys.exit("Need at least two runs in the history to compare")
+    baseline, latest = history[args.baseline], history[args.candidate]
+    if baseline["corpus"] != latest["corpus"]:
+        print("warning: the two runs used different corpus settings")
+
+    slower = []
+    print(f"{'benchmark':<26}{'baseline ms':>13}{'latest ms':>13}{'change':>9}")
+    for name, seconds in latest["results"].items():
+        before = baseline["results"].get(name)
+        if before is None:
+            continue
+        change = seconds / before - 1
+        flag = ""
+        if change > args.threshold:
+            flag = "  SLOWER"
+            slower.append(name)
+        print(f"{name:<26}{before * 1000:>13.3f}{seconds * 1000:>13.3f}{change:>+9.1%}{flag}")
+
+    if slower:
+        sys.exit(f"{len(slower)} benchmark(s) slowed down by more than {args.threshold:.0%}")
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Benchmark the markdown pipeline and site builds")
+    parser.add_argument('--history', default=HISTORY_PATH)
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = commands.add_parser('run', help="run the suite and append the results to the history")
+    run_parser.add_argument('--pages', type=int, default=200)
+    run_parser.add_argument('--page-size', type=int, default=40, help="blocks per page")
+    run_parser.add_argument('--inline-density', type=float, default=0.3)
+    run_parser.add_argument('--list-ratio', type=float, default=0.2)
+    run_parser.add_argument('--code-ratio', type=float, default=0.1)
+    run_parser.add_argument('--quote-ratio', type=float, default=0.05)
+    run_parser.add_argument('--nesting-depth', type=int, default=2)
+    run_parser.add_argument('--seed', type=int, default=0)
+    run_parser.add_argument('--repeat', type=int, default=5)
+    run_parser.add_argument('--jobs', type=int, default=1, help="also time a parallel build with N workers")
+    run_parser.add_argument('--pipeline', action='store_true', help="also time a --pipeline build")
+    run_parser.add_argument('--micro-only', action='store_true')
+    run_parser.add_argument('--label', default=None)
+    run_parser.set_defaults(func=run)
+
+    compare_parser = commands.add_parser('compare', help="flag benchmarks that got slower between two runs")
+    compare_parser.add_argument('--threshold', type=float, default=0.10)
+    compare_parser.add_argument('--baseline', type=int, default=-2, help="history index of the baseline run")
+    compare_parser.add_argument('--candidate', type=int, default=-1, help="history index of the run to check")
+    compare_parser.set_defaults(func=compare)
+    return parser.parse_args(argv)
+
+if __name__ == "__main__":
+    arguments = parse_args(sys.argv[1:])
+    arguments.func(arguments)
@@ -0,0 +1,74 @@
+import os
+import sys
+import json
+import shutil
+import argparse
+import tempfile
+import subprocess
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.join(HERE, '..')
+
+# Block-heavy corpora: these are where per-block classification and
+# rendering dominate, rather than inline parsing
+CORPORA = {
+    "lists": {"list_ratio": 0.8, "code_ratio": 0.0, "quote_ratio": 0.0, "inline_density": 0.1},
+    "quotes": {"list_ratio": 0.0, "code_ratio": 0.0, "quote_ratio": 0.8, "inline_density": 0.1},
+    "mixed": {},
+}
+
+# Runs inside a subprocess with one revision's src/ on the path, so two
+# versions of blocktype never share an interpreter
+TIMER = """
+import io, sys, json, time
+sys.path[:0] = [sys.argv[1], sys.argv[2]]
+from corpus import CorpusSpec, make_document
+from blocktype import markdown_to_html_node
+settings = json.loads(sys.argv[3])
+repeat = int(sys.argv[4])
+results = {}
+for name, overrides in settings.items():
+    document = make_document(CorpusSpec(page_size=400, **overrides))
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        markdown_to_html_node(document).to_html()
+        best = min(best, time.perf_counter() - start)
+    results[name] = best
+print(json.dumps(results))
+"""
+
+def export_src(revision, directory):
+    # git archive gives us that revision's src/ without touching the worktree
+    archive = subprocess.run(["git", "archive", revision, "src"], cwd=ROOT, capture_output=True, check=True)
+    subprocess.run(["tar", "-x", "-C", directory], input=archive.stdout, check=True)
+    return os.path.join(directory, "src")
+
+def time_src(src, repeat):
+    output = subprocess.run(
+        [sys.executable, "-c", TIMER, src, HERE, json.dumps(CORPORA), str(repeat)],
+        capture_output=True, text=True, check=True,
+    ).stdout
+    return json.loads(output)
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Compare block rendering against an earlier revision")
+    parser.add_argument('--baseline', required=True, metavar='REV',
+                        help="git revision to compare against, e.g. the commit before the block dispatch table")
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args(argv)
+
+    directory = tempfile.mkdtemp(prefix="staticsite-blocks-")
+    try:
+        baseline = time_src(export_src(args.baseline, directory), args.repeat)
+    finally:
+        shutil.rmtree(directory)
+    current = time_src(os.path.join(ROOT, "src"), args.repeat)
+
+    print(f"{'corpus':<10}{args.baseline + ' ms':>16}{'current ms':>13}{'speedup':>9}")
+    for name in CORPORA:
+        before, after = baseline[name], current[name]
+        print(f"{name:<10}{before * 1000:>16.3f}{after * 1000:>13.3f}{before / after:>8.2f}x")
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,87 @@
+import os
+import sys
+import shutil
+import tempfile
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from textnode import TextNode, TextType
+from htmlnode import LeafNode
+from blocktype import markdown_to_html_node
+from renderer import generate_page
+import mapped
+import log
+
+NODE_COUNT = 100_000
+
+# Same layout as the nodes had before they were slotted, kept here as the baseline
+class DictTextNode:
+    def __init__(self, text, text_type, url=None):
+        self.text = text
+        self.text_type = text_type
+        self.url = url
+
+class DictLeafNode:
+    def __init__(self, tag, value, props=None):
+        self.tag = tag
+        self.value = value
+        self.children = None
+        self.props = props
+
+def measure(build):
+    tracemalloc.start()
+    kept = build()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del kept
+    return current
+
+def per_node(build):
+    return measure(build) / NODE_COUNT
+
+def build_document():
+    paragraph = "Some **bold** words, an _italic_ one, `code` and a [link](/x) to follow. "
+    sections = []
+    for i in range(2000):
+        sections.append(f"## Section {i}\n\n{paragraph * 4}\n\n- item **{i}**\n- item _{i}_")
+    return "\n\n".join(sections)
+
+def main():
+    words = [f"word {i}" for i in range(NODE_COUNT)]
+    rows = [
+        ("TextNode", per_node(lambda: [DictTextNode(w, TextType.BOLD) for w in words]),
+                     per_node(lambda: [TextNode(w, TextType.BOLD) for w in words])),
+        ("LeafNode", per_node(lambda: [DictLeafNode("b", w) for w in words]),
+                     per_node(lambda: [LeafNode("b", w) for w in words])),
+    ]
+    print(f"{'node':<10}{'dict bytes':>12}{'slots bytes':>13}{'saved':>8}")
+    for name, before, after in rows:
+        print(f"{name:<10}{before:>12.1f}{after:>13.1f}{1 - after / before:>8.0%}")
+
+    markdown = build_document()
+    peak = measure(lambda: markdown_to_html_node(markdown))
+    print(f"document of {len(markdown) // 1024} KiB keeps {peak / (1024 * 1024):.1f} MiB of nodes alive")
+
+    # The same page rendered to disk, normally and memory-mapped and streamed
+    root = tempfile.mkdtemp()
+    try:
+        source = os.path.join(root, "page.md")
+        template_path = os.path.join(root, "template.html")
+        with open(source, 'w') as file:
+            file.write("# Page\n\n" + markdown)
+        with open(template_path, 'w') as file:
+            file.write("<title>{{ Title }}</title>{{ Content }}")
+        log.QUIET = True
+        for label, threshold in (("generate_page", None), ("--mmap-threshold", 1)):
+            mapped.threshold = threshold
+            tracemalloc.start()
+            generate_page(source, template_path, os.path.join(root, "page.html"), "/")
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            print(f"{label:<18} peak {peak / (1024 * 1024):.1f} MiB")
+    finally:
+        shutil.rmtree(root)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+import os
+import random
+
+WORDS = (
+    "the ring of power was forged in the fires of mount doom by sauron who "
+    "sought dominion over elves dwarves and men across middle earth while the "
+    "fellowship walked from rivendell through moria to lothlorien and beyond"
+).split()
+
+LANGUAGES = ("", "python", "go", "js")
+
+class CorpusSpec:
+    def __init__(self, pages=200, page_size=40, inline_density=0.3, list_ratio=0.2,
+                 code_ratio=0.1, quote_ratio=0.05, nesting_depth=2, seed=0):
+        # page_size is blocks per page; the ratios pick each block's kind and
+        # inline_density is the chance a word turns into a span
+        self.pages = pages
+        self.page_size = page_size
+        self.inline_density = inline_density
+        self.list_ratio = list_ratio
+        self.code_ratio = code_ratio
+        self.quote_ratio = quote_ratio
+        self.nesting_depth = nesting_depth
+        self.seed = seed
+
+    def as_dict(self):
+        return dict(vars(self))
+
+def words(rng, count):
+    return " ".join(rng.choice(WORDS) for _ in range(count))
+
+def inline_span(rng, depth):
+    text = words(rng, rng.randint(1, 3))
+    if depth > 1 and rng.random() < 0.5:
+        text = f"{text} {inline_span(rng, depth - 1)}"
+    kind = rng.randrange(5)
+    if kind == 0:
+        return f"**{text}**"
+    if kind == 1:
+        return f"_{text}_"
+    if kind == 2:
+        return f"`{text.replace('**', '').replace('_', '')}`"
+    if kind == 3:
+        return f"[{text}](/blog/{rng.choice(WORDS)})"
+    return f"![{rng.choice(WORDS)}](/images/{rng.choice(WORDS)}.png)"
+
+def inline_text(rng, spec, count):
+    out = []
+    for _ in range(count):
+        if rng.random() < spec.inline_density:
+            out.append(inline_span(rng, spec.nesting_depth))
+        else:
+            out.append(rng.choice(WORDS))
+    return " ".join(out)
+
+def make_block(rng, spec):
+    roll = rng.random()
+    if roll < spec.code_ratio:
+        lines = [f"    {words(rng, rng.randint(2, 6))}" for _ in range(rng.randint(2, 8))]
+        return "```" + rng.choice(LANGUAGES) + "\n" + "\n".join(lines) + "\n```"
+    roll -= spec.code_ratio
+    if roll < spec.list_ratio:
+        count = rng.randint(2, 8)
+        if rng.random() < 0.5:
+            return "\n".join(f"- {inline_text(rng, spec, rng.randint(3, 10))}" for _ in range(count))
+        return "\n".join(f"{i + 1}. {inline_text(rng, spec, rng.randint(3, 10))}" for i in range(count))
+    roll -= spec.list_ratio
+    if roll < spec.quote_ratio:
+        return "\n".join(f"> {inline_text(rng, spec, rng.randint(4, 12))}" for _ in range(rng.randint(1, 4)))
+    if rng.random() < 0.1:
+        return f"{'#' * rng.randint(2, 4)} {inline_text(rng, spec, rng.randint(2, 6))}"
+    return "\n".join(inline_text(rng, spec, rng.randint(8, 16)) for _ in range(rng.randint(1, 4)))
+
+def make_page(rng, spec, title):
+    blocks = [f"# {title}"]
+    blocks.extend(make_block(rng, spec) for _ in range(spec.page_size))
+    return "\n\n".join(blocks) + "\n"
+
+def make_document(spec):
+    return make_page(random.Random(spec.seed), spec, "Document")
+
+def write_corpus(root, spec):
+    # Lays out content/, static/ and template.html the way main() expects
+    rng = random.Random(spec.seed)
+    for i in range(spec.pages):
+        page_dir = os.path.join(root, "content", "blog", f"post-{i:05d}")
+        os.makedirs(page_dir, exist_ok=True)
+        with open(os.path.join(page_dir, "index.md"), "w") as file:
+            file.write(make_page(rng, spec, f"Post {i}"))
+
+    os.makedirs(os.path.join(root, "static", "images"), exist_ok=True)
+    with open(os.path.join(root, "static", "index.css"), "w") as file:
+        file.write("body { margin: 0 auto; max-width: 40em; }\n")
+    with open(os.path.join(root, "static", "images", "blank.png"), "wb") as file:
+        file.write(rng.randbytes(4096))
+
+    here = os.path.dirname(os.path.abspath(__file__))
+    with open(os.path.join(here, "..", "template.html")) as source, \
+            open(os.path.join(root, "template.html"), "w") as dest:
+        dest.write(source.read())
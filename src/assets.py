@@ -0,0 +1,157 @@
+import os
+import shutil
+from manifest import remove_output
+import compress
+import minify
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# ioctl(dest_fd, FICLONE, src_fd) shares extents on btrfs, xfs and friends
+FICLONE = 0x40049409
+COPY_CHUNK = 1 << 30
+
+def list_assets(source):
+    assets = []
+    for dirpath, _, filenames in os.walk(source):
+        rel_dir = os.path.relpath(dirpath, source)
+        for filename in filenames:
+            assets.append(os.path.normpath(os.path.join(rel_dir, filename)))
+    return sorted(assets)
+
+def is_current(source_stat, dest_path):
+    try:
+        dest_stat = os.stat(dest_path)
+    except FileNotFoundError:
+        return False
+    if os.path.samestat(source_stat, dest_stat):
+        return True
+    return dest_stat.st_size == source_stat.st_size and dest_stat.st_mtime_ns == source_stat.st_mtime_ns
+
+def reflink(source_file, dest_file):
+    if fcntl is None:
+        return False
+    try:
+        fcntl.ioctl(dest_file.fileno(), FICLONE, source_file.fileno())
+    except OSError:
+        return False
+    return True
+
+def kernel_copy(source_file, dest_file, size):
+    # Both of these keep the bytes inside the kernel instead of a Python buffer
+    source_fd, dest_fd = source_file.fileno(), dest_file.fileno()
+    offset = 0
+    try:
+        while offset < size:
+            count = min(COPY_CHUNK, size - offset)
+            if hasattr(os, "copy_file_range"):
+                copied = os.copy_file_range(source_fd, dest_fd, count, offset, offset)
+            elif hasattr(os, "sendfile"):
+                copied = os.sendfile(dest_fd, source_fd, offset, count)
+            else:
+                return False
+            if copied == 0:
+                break
+            offset += copied
+    except OSError:
+        # Unsupported between these filesystems; let the caller fall back
+        return False
+    return offset == size
+
+def copy_asset(source_path, dest_path, source_stat, hardlink=False):
+    # Never write through an existing file: it may be a hardlink back into static/
+    if os.path.lexists(dest_path):
+        os.remove(dest_path)
+
+    if hardlink:
+        try:
+            os.link(source_path, dest_path)
+            return "linked"
+        except OSError:
+            pass
+
+    with open(source_path, 'rb') as source_file, open(dest_path, 'wb') as dest_file:
+        if reflink(source_file, dest_file):
+            method = "reflinked"
+        elif kernel_copy(source_file, dest_file, source_stat.st_size):
+            method = "copied"
+        else:
+            dest_file.seek(0)
+            dest_file.truncate()
+            shutil.copyfileobj(source_file, dest_file)
+            method = "copied"
+
+    shutil.copymode(source_path, dest_path)
+    os.utime(dest_path, ns=(source_stat.st_atime_ns, source_stat.st_mtime_ns))
+    return method
+
+def write_minified(source_path, dest_path, source_stat, minifier):
+    # The output carries the source's mtime so the next build can tell it is current
+    if os.path.lexists(dest_path):
+        os.remove(dest_path)
+    with open(source_path, 'rb') as file:
+        data = minifier.minify_css(file.read())
+    with open(dest_path, 'wb') as file:
+        file.write(data)
+    shutil.copymode(source_path, dest_path)
+    os.utime(dest_path, ns=(source_stat.st_atime_ns, source_stat.st_mtime_ns))
+    return data
+
+def is_minified_current(source_stat, dest_path):
+    try:
+        dest_stat = os.stat(dest_path)
+    except FileNotFoundError:
+        return False
+    return dest_stat.st_mtime_ns == source_stat.st_mtime_ns
+
+def sync_one(source, destination, rel_path, hardlink):
+    source_path = os.path.join(source, rel_path)
+    dest_path = os.path.join(destination, rel_path)
+    source_stat = os.stat(source_path)
+    minifier = minify.active
+    data = None
+    if minifier is not None and minify.is_minifiable(rel_path):
+        if is_minified_current(source_stat, dest_path):
+            result = "skipped"
+        else:
+            data = write_minified(source_path, dest_path, source_stat, minifier)
+            result = "minified"
+    elif is_current(source_stat, dest_path):
+        result = "skipped"
+    else:
+        result = copy_asset(source_path, dest_path, source_stat, hardlink)
+
+    compressor = compress.active
+    if compressor is not None and compress.is_compressible(dest_path):
+        if result != "skipped" or not compressor.has_siblings(dest_path):
+            if data is None:
+                # The copy itself may never pass through Python, so read it in
+                # once; only an up-to-date minified file differs from its source
+                read_path = dest_path if result == "skipped" else source_path
+                with open(read_path, 'rb') as file:
+                    data = file.read()
+            compressor.submit(dest_path, data)
+    return result
+
+def sync_assets(source, destination, previous=(), jobs=None, hardlink=False):
+    from concurrent.futures import ThreadPoolExecutor
+    assets = list_assets(source)
+    for directory in sorted({os.path.dirname(rel_path) for rel_path in assets}):
+        os.makedirs(os.path.join(destination, directory), exist_ok=True)
+
+    counts = {}
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        results = executor.map(lambda rel_path: sync_one(source, destination, rel_path, hardlink), assets)
+        for result in results:
+            counts[result] = counts.get(result, 0) + 1
+
+    # Only prune files we put there ourselves; rendered pages share the tree
+    stale = sorted(set(previous) - set(assets))
+    for rel_path in stale:
+        remove_output(os.path.join(destination, rel_path), destination)
+
+    summary = ", ".join(f"{count} {result}" for result, count in sorted(counts.items()))
+    print(f"Synced {len(assets)} assets from {source}: {summary or 'nothing to do'}, {len(stale)} pruned")
+    return assets
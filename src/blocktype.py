@@ -1,7 +1,17 @@
+import io
 from enum import Enum
+import profiler
+import highlight
+from highlight import fence_language
 from textnode import TextType, TextNode
-from codefile import text_to_textnodes, markdown_to_blocks
+from inline import tokenize_inline
 from htmlnode import HTMLNode, ParentNode, LeafNode, text_node_to_html_node
+from links import node_references, fragment_references
+from search import node_text, fragment_text
+
+# Bump whenever a change here or in the inline parser changes the tree a
+# source renders to; saved parse trees from other versions are not reused
+PARSER_VERSION = 2
 
 class BlockType(Enum):
     PARAGRAPH = "paragraph"
@@ -10,166 +20,317 @@ class BlockType(Enum):
     QUOTE = "quote"
     UNORDERED_LIST = "unordered_list"
     ORDERED_LIST = "ordered_list"
+    HORIZONTAL_RULE = "horizontal_rule"
+
+class Block:
+    __slots__ = ("block_type", "lines", "start", "end", "payload")
+
+    def __init__(self, block_type, lines, start, end, payload=None):
+        self.block_type = block_type
+        self.lines = lines
+        # 1-based, inclusive line range in the source
+        self.start = start
+        self.end = end
+        # Whatever classification already parsed out: heading (level, text),
+        # list items, quote lines, code lines or paragraph text
+        self.payload = payload
+
+    @property
+    def text(self):
+        return "\n".join(self.lines)
+
+    def __repr__(self):
+        name = getattr(self.block_type, "value", self.block_type)
+        return f"Block({name}, lines {self.start}-{self.end})"
+
+def heading_level(line):
+    if not line.startswith('#'):
+        return 0
+    parts = line.split(' ', 1)
+    marker = parts[0]
+    # 1-6 # characters followed by a space
+    if len(parts) > 1 and 1 <= len(marker) <= 6 and marker == '#' * len(marker):
+        return len(marker)
+    return 0
+
+def is_heading_line(line):
+    return heading_level(line) > 0
+
+# Extra block types are plugged in here as (block_type, matcher) pairs. A
+# matcher gets the block's stripped lines and returns a payload, or None when
+# the block isn't its type. They are tried before the built-in rules.
+BLOCK_MATCHERS = []
+
+class BlockBuilder:
+    # Collects a block's lines and, while they arrive, both checks each
+    # line-prefix rule and keeps the payload for the rules still standing
+    __slots__ = ("lines", "start", "quote", "unordered", "ordered")
+
+    def __init__(self, start):
+        self.lines = []
+        self.start = start
+        self.quote = []
+        self.unordered = []
+        self.ordered = []
+
+    def add(self, line):
+        self.lines.append(line)
+        # A rule that fails once is dropped, so each line is checked only
+        # against the types the block can still be
+        if self.quote is not None:
+            if line.startswith('>'):
+                self.quote.append(line[1:].lstrip(" "))
+            else:
+                self.quote = None
+        if self.unordered is not None:
+            if line.startswith('- '):
+                self.unordered.append(line[2:].strip(" "))
+            else:
+                self.unordered = None
+        if self.ordered is not None:
+            prefix = f"{len(self.lines)}. "
+            if line.startswith(prefix):
+                self.ordered.append(line[len(prefix):])
+            else:
+                self.ordered = None
+
+    def finish(self, end):
+        lines = self.lines
+        for block_type, matcher in BLOCK_MATCHERS:
+            payload = matcher(lines)
+            if payload is not None:
+                return Block(block_type, lines, self.start, end, payload)
+
+        first = lines[0]
+        level = heading_level(first)
+        if level:
+            text = "\n".join(lines)[level:].lstrip()
+            return Block(BlockType.HEADING, lines, self.start, end, (level, text))
+        if first.startswith('```') and lines[-1].endswith('```'):
+            return Block(BlockType.CODE, lines, self.start, end, (fence_language(first), code_lines(lines)))
+        if self.quote is not None:
+            return Block(BlockType.QUOTE, lines, self.start, end, self.quote)
+        if self.unordered is not None:
+            return Block(BlockType.UNORDERED_LIST, lines, self.start, end, self.unordered)
+        if self.ordered is not None:
+            return Block(BlockType.ORDERED_LIST, lines, self.start, end, self.ordered)
+        return Block(BlockType.PARAGRAPH, lines, self.start, end, " ".join(lines))
+
+def code_lines(lines):
+    # Drop the opening fence and, when the block has one, the closing fence;
+    # everything in between is kept exactly, indentation included
+    if len(lines) > 1 and lines[-1].strip().startswith("```"):
+        return lines[1:-1]
+    return lines[1:]
+
+def parse_block(markdown):
+    builder = BlockBuilder(1)
+    for line in markdown.split('\n'):
+        builder.add(line)
+    return builder.finish(len(builder.lines))
 
 def block_to_block_type(markdown):
-    if markdown.startswith('#'):
-        parts = markdown.split(' ', 1)
-        if parts[0].strip() == '#' * len(parts[0].strip()) and 1 <= len(parts[0].strip()) <= 6: # Check if the first part only contains # characters (1-6 of them)
-            if len(parts) > 1:
-                return BlockType.HEADING
-
-    if markdown.startswith('```') and markdown.endswith("```"):
-        return BlockType.CODE
-    lines = markdown.split('\n')
-
-    is_quote = all(line.startswith('>') for line in lines)
-    if is_quote:
-        return BlockType.QUOTE
-
-    lines = markdown.split('\n')
-    is_unordered_list = all(line.startswith('- ') for line in lines)
-    if is_unordered_list:
-        return BlockType.UNORDERED_LIST
-
-    lines = markdown.split('\n')
-    is_ordered_list = True
-
-    for i, line in enumerate(lines):
-        expected_prefix = f"{i+1}. "
-        if not line.startswith(expected_prefix):
-            is_ordered_list = False
-            break
+    return parse_block(markdown).block_type
+
+def dedent(line, indent):
+    # Drop up to the fence's own indentation so code keeps its relative indent
+    i = 0
+    while i < indent and i < len(line) and line[i] in ' \t':
+        i += 1
+    return line[i:]
+
+def is_single_line_fence(line):
+    return len(line) >= 6 and line.endswith('```')
+
+def scan_blocks(lines):
+    # Single pass over an iterable of lines (a file object works) that yields
+    # classified blocks with their payloads. Fenced code keeps its lines and
+    # blank lines verbatim.
+    builder = None
+    fence = None
+    fence_indent = 0
+    number = 0
 
-    if is_ordered_list:
-        return BlockType.ORDERED_LIST
+    for number, raw in enumerate(lines, 1):
+        line = raw.rstrip('\r\n')
+        stripped = line.strip()
 
-    return BlockType.PARAGRAPH
+        if fence is not None:
+            if stripped.startswith('```'):
+                fence.append(stripped)
+                yield Block(BlockType.CODE, fence, start, number, (fence_language(fence[0]), fence[1:-1]))
+                fence = None
+            else:
+                fence.append(dedent(line, fence_indent))
+            continue
+
+        if not stripped:
+            if builder is not None:
+                yield builder.finish(number - 1)
+                builder = None
+            continue
+
+        if builder is None:
+            if stripped.startswith('```') and not is_single_line_fence(stripped):
+                start = number
+                fence_indent = len(line) - len(line.lstrip())
+                fence = [stripped]
+                continue
+            builder = BlockBuilder(number)
+        builder.add(stripped)
+
+    if fence is not None:
+        # An unclosed fence runs to the end of the document
+        yield Block(BlockType.CODE, fence, start, number, (fence_language(fence[0]), fence[1:]))
+    elif builder is not None:
+        yield builder.finish(number)
 
 def text_to_children(text):
-    text_nodes = text_to_textnodes(text)
-    html_list = []
-    for text_node in text_nodes:
-        html_node = text_node_to_html_node(text_node)
-        html_list.append(html_node)
+    with profiler.stage("inline"):
+        text_nodes = tokenize_inline(text)
+        html_list = []
+        for text_node in text_nodes:
+            html_node = text_node_to_html_node(text_node)
+            html_list.append(html_node)
     return html_list
 
+def render_heading(payload):
+    level, text = payload
+    return ParentNode(f"h{level}", text_to_children(text))
+
+def render_quote(lines):
+    return ParentNode("blockquote", text_to_children("\n".join(lines)))
+
+def render_code(payload):
+    language, lines = payload
+    code = "\n".join(lines) + "\n"
+    if highlight.active is None or not language:
+        return ParentNode("pre", [LeafNode("code", code)])
+    # Tagged even when the language is unknown, for client-side highlighters
+    props = {"class": f"language-{language}"}
+    tokens = highlight.active.tokens(language, code)
+    if tokens is None:
+        return ParentNode("pre", [LeafNode("code", code, props)])
+    spans = [LeafNode("span", text, {"class": css_class}) if css_class else LeafNode(None, text)
+             for css_class, text in tokens]
+    return ParentNode("pre", [ParentNode("code", spans, props)])
+
+def render_list_items(tag, items):
+    return ParentNode(tag, [ParentNode("li", text_to_children(item)) for item in items])
+
+def render_unordered_list(items):
+    return render_list_items("ul", items)
+
+def render_ordered_list(items):
+    return render_list_items("ol", items)
+
+def render_paragraph(text):
+    return ParentNode("p", text_to_children(text))
+
+BLOCK_RENDERERS = {
+    BlockType.HEADING: render_heading,
+    BlockType.CODE: render_code,
+    BlockType.QUOTE: render_quote,
+    BlockType.UNORDERED_LIST: render_unordered_list,
+    BlockType.ORDERED_LIST: render_ordered_list,
+    BlockType.PARAGRAPH: render_paragraph,
+}
+
+def register_block_type(block_type, renderer, matcher=None):
+    # renderer(payload) -> HTMLNode; matcher(lines) -> payload or None
+    BLOCK_RENDERERS[block_type] = renderer
+    if matcher is not None:
+        BLOCK_MATCHERS.append((block_type, matcher))
+
+HORIZONTAL_RULES = {"---", "***", "___"}
+
+def match_horizontal_rule(lines):
+    if len(lines) == 1 and lines[0].replace(" ", "") in HORIZONTAL_RULES:
+        return True
+    return None
+
+register_block_type(BlockType.HORIZONTAL_RULE, lambda payload: LeafNode("hr", ""), match_horizontal_rule)
+
+# Text-level entry points, kept for callers that already have a block string
+
 def process_header_block(block_text):
-    heading_level = 0
+    level = 0
     for char in block_text:
         if char == '#':
-            heading_level += 1
+            level += 1
         else:
             break
-
-    if heading_level > 6:
-        heading_level = 6
-
-    text_content = block_text[heading_level:].lstrip()
-    children = text_to_children(text_content)
-    header_node = ParentNode(f"h{heading_level}", children)
-
-    return header_node
+    level = min(level, 6)
+    return render_heading((level, block_text[level:].lstrip()))
 
 def process_quote_block(block_text):
-    lines = block_text.split("\n")
-    clean_lines = []
-    for line in lines:
-        if line.startswith(">"):
-            clean_line = line[1:].lstrip(" ")
-            clean_lines.append(clean_line)
-    clean_text = "\n".join(clean_lines)
-    children = text_to_children(clean_text)
-    return ParentNode("blockquote", children)
-
+    return render_quote([line[1:].lstrip(" ") for line in block_text.split("\n") if line.startswith(">")])
 
 def process_code_block(block_text):
-    # Split into lines and strip each line
-    lines = [line.strip() for line in block_text.strip().split("\n")]
-    
-    # Find start and end of code block
-    start_idx = -1
-    end_idx = -1
-    
-    for i, line in enumerate(lines):
-        if line.startswith("```") and start_idx == -1:
-            start_idx = i
-        elif line.startswith("```") and start_idx != -1:
-            end_idx = i
-            break
-    
-    # Extract code content
-    if start_idx != -1 and end_idx != -1:
-        content_lines = lines[start_idx+1:end_idx]
-    else:
-        # Fallback - just remove backticks from first and last lines
-        content_lines = lines[1:-1] if len(lines) > 2 else []
-    
-    # Join lines with newlines
-    code_content = "\n".join(content_lines) + "\n"
-    
-    # Create the nodes
-    code_node = LeafNode("code", code_content)
-    pre_node = ParentNode("pre", [code_node])
-    
-    return pre_node
+    lines = block_text.split("\n")
+    return render_code((fence_language(lines[0]), code_lines(lines)))
 
 def process_ul_block(block_text):
-    line_split = block_text.split("\n")
-    clean_lines = []
-    for char in line_split:
-        line_strip = char.strip()
+    items = []
+    for line in block_text.split("\n"):
+        line_strip = line.strip()
         if line_strip.startswith("-") or line_strip.startswith("* "):
-            content = char[2:].strip(" ")
-            item_children = text_to_children(content)
-            li_node = ParentNode("li", item_children)
-            clean_lines.append(li_node)
-
-    return ParentNode("ul", clean_lines)
+            items.append(line[2:].strip(" "))
+    return render_unordered_list(items)
 
 def process_ol_block(block_text):
-    line_split = block_text.split("\n")
-    child_tag = []
-    for char in line_split:
-        line_strip = char.strip()
+    items = []
+    for line in block_text.split("\n"):
+        line_strip = line.strip()
         if line_strip and line_strip[0].isdigit() and ". " in line_strip:
-            marker_end = line_strip.find(". ") + 2
-            content = line_strip[marker_end:]
-            item_children = text_to_children(content)
-            li_node = ParentNode("li", item_children)
-            child_tag.append(li_node)
-    return ParentNode("ol", child_tag)
-
+            items.append(line_strip[line_strip.find(". ") + 2:])
+    return render_ordered_list(items)
 
-def markdown_to_html_node(markdown):
-    parent_node = ParentNode("div", [])
-    blocks = markdown_to_blocks(markdown)
+def render(block):
+    return BLOCK_RENDERERS[block.block_type](block.payload)
 
-    for block in blocks:
-        block_type = block_to_block_type(block)
-
-        if block_type == BlockType.QUOTE:
-            quote_node = process_quote_block(block)
-            parent_node.children.append(quote_node)
-
-        elif block_type == BlockType.CODE:
-             code_node = process_code_block(block)
-             parent_node.children.append(code_node)
+def block_to_html_node(block_text):
+    return render(parse_block(block_text))
 
-        elif block_type == BlockType.HEADING:
-            head_node = process_header_block(block)
-            parent_node.children.append(head_node)
+def markdown_to_html_node(markdown, cache=None, transform=None, references=None, text=None):
+    # markdown may be a string or any iterable of lines, such as an open file.
+    # transform runs on each block before it is cached, so the cache's
+    # namespace has to cover whatever the transform depends on. When given a
+    # list, references collects every emitted (kind, target) href/src pair,
+    # and text the plain text of each block
+    lines = io.StringIO(markdown) if isinstance(markdown, str) else markdown
+    blocks = scan_blocks(lines)
+    if profiler.active is not None:
+        with profiler.stage("blocks"):
+            blocks = list(blocks)
+    return ParentNode("div", list(render_blocks(blocks, cache, transform, references, text)))
 
-        elif block_type == BlockType.UNORDERED_LIST:
-            ul_block = process_ul_block(block)
-            parent_node.children.append(ul_block)
-
-        elif block_type == BlockType.ORDERED_LIST:
-            ol_block = process_ol_block(block)
-            parent_node.children.append(ol_block)
+def render_blocks(blocks, cache=None, transform=None, references=None, text=None):
+    # Yields each block's node as soon as it is rendered; markdown_to_html_node
+    # describes the arguments
+    for block in blocks:
+        if cache is not None:
+            key = block.text
+            fragment = cache.get(key)
+            if fragment is not None:
+                if references is not None:
+                    references.extend(fragment_references(fragment))
+                if text is not None:
+                    text.append(fragment_text(fragment))
+                yield LeafNode(None, fragment)
+                continue
 
-        else:
-            paragraph_text = " ".join([line.strip() for line in block.strip().split("\n")])
-            para_text = ParentNode("p", text_to_children(paragraph_text))
-            parent_node.children.append(para_text)
+        block_node = finish_block(render(block), transform, references, text)
+        if cache is not None:
+            cache.put(key, block_node.to_html())
+        yield block_node
 
-    return parent_node
\ No newline at end of file
+def finish_block(block_node, transform=None, references=None, text=None):
+    # Everything that happens to a freshly rendered block node
+    if transform is not None:
+        transform(block_node)
+    if references is not None:
+        references.extend(node_references(block_node))
+    if text is not None:
+        text.append(node_text(block_node))
+    return block_node
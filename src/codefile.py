@@ -1,7 +1,8 @@
 import re
-import os
 from textnode import TextType, TextNode
 from htmlnode import *
+from inline import tokenize_inline
+from frontmatter import split_frontmatter
 
 def split_nodes_delimiter(old_nodes, delimiter, text_type):
     new_nodes = []
@@ -103,14 +104,7 @@ def split_nodes_image(old_nodes):
     return new_nodes
 
 def text_to_textnodes(text):
-    nodes = [TextNode(text, TextType.TEXT)]
-    nodes = split_nodes_delimiter(nodes, "**", TextType.BOLD)
-    nodes = split_nodes_delimiter(nodes, "_", TextType.ITALIC)
-    nodes = split_nodes_delimiter(nodes, "`", TextType.CODE)
-    nodes = split_nodes_image(nodes)
-    nodes = split_nodes_link(nodes)
-
-    return nodes
+    return tokenize_inline(text)
 
 def markdown_to_blocks(markdown):
 
@@ -128,32 +122,11 @@ def markdown_to_blocks(markdown):
     return cleaned_blocks
 
 def extract_title(markdown):
-    head_split = markdown.split("\n")
-    for title in head_split:
+    meta, body = split_frontmatter(markdown.split("\n"))
+    if meta["title"] is not None:
+        return meta["title"]
+    for title in body:
         result = title.strip()
         if result.startswith("# "):
             return result[2:]
     raise Exception ("No title found")
-
-def generate_page(from_path, template_path, dest_path, basepath):
-    from blocktype import markdown_to_html_node
-    print(f"Generating page from {from_path} to {dest_path} using {template_path}")
-    with open(from_path) as file:
-        md_content = file.read()
-        print("Markdown content:", md_content)
-        md_file = markdown_to_html_node(md_content).to_html()
-        final = extract_title(md_content)
-
-    with open(template_path) as file:
-        template = file.read()
-        new_template = template.replace('{{ Title }}', final).replace('{{ Content }}', md_file)
-        new_template = new_template.replace('href="/', f'href="{basepath}')
-        new_template = new_template.replace('src="/', f'src="{basepath}')
-        
-    os.makedirs(os.path.dirname(dest_path), exist_ok=True)
-    with open(dest_path, 'w') as outfile:
-        outfile.write(new_template)
-
-
-    
-    
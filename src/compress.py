@@ -0,0 +1,142 @@
+import os
+import gzip
+import threading
+from manifest import hash_bytes, COMPRESSED_SUFFIXES
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_EXTENSIONS = (".html", ".css", ".js", ".mjs", ".svg", ".xml", ".json", ".txt", ".ico")
+GZIP_LEVEL = 9
+BROTLI_QUALITY = 11
+
+# The Compressor for the running build, if --precompress is on
+active = None
+
+def is_compressible(path):
+    return path.lower().endswith(COMPRESSIBLE_EXTENSIONS)
+
+def compress_bytes(data):
+    # mtime=0 keeps .gz output identical between builds of the same page
+    encoded = {".gz": gzip.compress(data, GZIP_LEVEL, mtime=0)}
+    if brotli is not None:
+        encoded[".br"] = brotli.compress(data, quality=BROTLI_QUALITY)
+    return encoded
+
+def write_atomic(path, data):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as file:
+        file.write(data)
+    os.replace(tmp_path, path)
+
+def default_threads(processes=1):
+    # gzip and brotli release the GIL, so one thread per core keeps them
+    # busy; with --jobs the cores are shared between the worker processes
+    return max(1, (os.cpu_count() or 1) // processes)
+
+class Compressor:
+    def __init__(self, index=None, threads=None):
+        # output path -> [hash of the bytes, suffixes written]; outputs whose
+        # bytes hash the same as last time are not compressed again
+        self.index = dict(index or {})
+        threads = threads or default_threads()
+        # Imported here, not at the top: the renderer imports this module for
+        # `active`, and library users who never compress shouldn't pay for it
+        from concurrent.futures import ThreadPoolExecutor
+        self.executor = ThreadPoolExecutor(max_workers=threads)
+        # Compressing at these levels is far slower than rendering, so
+        # submit() blocks once every thread is busy and one more file is
+        # waiting for each; otherwise most of the site would pile up here
+        self._slots = threading.BoundedSemaphore(threads * 2)
+        self.futures = []
+        self.counts = {"compressed": 0, "skipped": 0, "bytes_in": 0, "bytes_out": 0}
+        self._lock = threading.Lock()
+        self._new = {}
+
+    def has_siblings(self, path):
+        entry = self.index.get(path)
+        return entry is not None and all(os.path.exists(path + suffix) for suffix in entry[1])
+
+    def submit(self, path, data=None):
+        # data is the exact bytes just written to path; without it the file
+        # is read back on a compressor thread, so a page streamed to disk
+        # never has to exist in memory as a whole on the render side
+        if not is_compressible(path):
+            return
+        self._slots.acquire()
+        try:
+            future = self.executor.submit(self._compress, path, data)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        self.futures.append(future)
+
+    def _compress(self, path, data):
+        if data is None:
+            with open(path, 'rb') as file:
+                data = file.read()
+        digest = hash_bytes(data)
+        with self._lock:
+            entry = self.index.get(path)
+        if entry is not None and entry[0] == digest and self.has_siblings(path):
+            with self._lock:
+                self.counts["skipped"] += 1
+            return
+        written = []
+        size = 0
+        for suffix, encoded in compress_bytes(data).items():
+            if len(encoded) < len(data):
+                write_atomic(path + suffix, encoded)
+                written.append(suffix)
+                size += len(encoded)
+        # A sibling we no longer write must not be served in place of new content
+        for suffix in COMPRESSED_SUFFIXES:
+            if suffix not in written and os.path.exists(path + suffix):
+                os.remove(path + suffix)
+        with self._lock:
+            self.index[path] = self._new[path] = [digest, written]
+            self.counts["compressed"] += 1
+            self.counts["bytes_in"] += len(data)
+            self.counts["bytes_out"] += size
+
+    def wait(self):
+        futures, self.futures = self.futures, []
+        for future in futures:
+            future.result()
+
+    def close(self):
+        # Waits for the remaining files and stops the threads
+        try:
+            self.wait()
+        finally:
+            self.executor.shutdown()
+
+    def drain(self):
+        # New index entries and counts since the last drain, for the parent process
+        self.wait()
+        with self._lock:
+            new, self._new = self._new, {}
+            counts = dict(self.counts)
+            for key in self.counts:
+                self.counts[key] = 0
+        return new, counts
+
+    def merge(self, entries, counts):
+        with self._lock:
+            self.index.update(entries)
+            for key, value in counts.items():
+                self.counts[key] += value
+
+    def retain_existing(self):
+        # Drop entries for outputs that were removed since they were compressed
+        self.index = {path: entry for path, entry in self.index.items() if os.path.exists(path)}
+
+    def summary(self):
+        counts = self.counts
+        ratio = counts["bytes_out"] / counts["bytes_in"] if counts["bytes_in"] else 0.0
+        formats = "gzip and brotli" if brotli is not None else "gzip"
+        return (f"Precompressed {counts['compressed']} files with {formats} "
+                f"({ratio:.0%} of original size), {counts['skipped']} unchanged")
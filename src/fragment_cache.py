@@ -0,0 +1,113 @@
+import os
+import marshal
+import hashlib
+import threading
+from collections import OrderedDict
+
+FRAGMENT_CACHE_VERSION = 1
+
+def fragment_bytes(fragment):
+    # The budget is in UTF-8 bytes; isascii() is a flag check, so most
+    # fragments are never encoded just to be measured
+    return len(fragment) if fragment.isascii() else len(fragment.encode())
+
+class FragmentCache:
+    def __init__(self, max_bytes, namespace=""):
+        # namespace is mixed into every key: anything that changes how a block
+        # renders (basepath, for one) must be part of it
+        self.max_bytes = max_bytes
+        self.namespace = namespace
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        # Worker processes hand their new fragments back to the parent's cache
+        self.track_new = False
+        self._new = []
+
+    def key(self, block):
+        return hashlib.sha1(f"{self.namespace}\0{block}".encode()).digest()
+
+    def get(self, block):
+        key = self.key(block)
+        with self._lock:
+            fragment = self._entries.get(key)
+            if fragment is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return fragment
+
+    def put(self, block, fragment):
+        cost = fragment_bytes(fragment)
+        if cost > self.max_bytes:
+            return
+        key = self.key(block)
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.size -= fragment_bytes(old)
+            self._entries[key] = fragment
+            self.size += cost
+            if self.track_new:
+                self._new.append((key, fragment))
+            self._evict()
+
+    def drain(self):
+        with self._lock:
+            new, self._new = self._new, []
+            hits, misses = self.hits, self.misses
+            self.hits = self.misses = 0
+        return new, hits, misses
+
+    def merge(self, entries, hits, misses):
+        with self._lock:
+            self.hits += hits
+            self.misses += misses
+            for key, fragment in entries:
+                if key not in self._entries:
+                    self._entries[key] = fragment
+                    self.size += fragment_bytes(fragment)
+            self._evict()
+
+    def _evict(self):
+        # Least recently used entries go first once we are over budget
+        while self.size > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self.size -= fragment_bytes(evicted)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        ratio = self.hits / lookups if lookups else 0.0
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self), "bytes": self.size, "hit_ratio": ratio}
+
+    def load(self, path):
+        try:
+            with open(path, 'rb') as file:
+                version, namespace, entries = marshal.load(file)
+        except (OSError, EOFError, ValueError, TypeError):
+            return
+        if version != FRAGMENT_CACHE_VERSION or namespace != self.namespace:
+            return
+        for key, fragment in entries:
+            self._entries[key] = fragment
+            self.size += fragment_bytes(fragment)
+        self._evict()
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with self._lock:
+            entries = list(self._entries.items())
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as file:
+            marshal.dump((FRAGMENT_CACHE_VERSION, self.namespace, entries), file)
+        os.replace(tmp_path, path)
+
+def format_stats(stats):
+    return (f"Fragment cache: {stats['hits']} hits, {stats['misses']} misses "
+            f"({stats['hit_ratio']:.0%} hit rate), {stats['entries']} entries, {stats['bytes']} bytes")
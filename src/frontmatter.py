@@ -0,0 +1,115 @@
+import os
+import re
+import itertools
+
+FRONTMATTER_DELIMITER = "---"
+FRONTMATTER_END = ("---", "...")
+KEY_PATTERN = re.compile(r"^([A-Za-z_][\w-]*)\s*:(.*)$")
+INTEGER_PATTERN = re.compile(r"-?\d+")
+
+def parse_scalar(text):
+    # The small YAML subset pages need: quoted or bare strings, booleans,
+    # integers, null and [flow, lists]
+    text = text.strip()
+    if len(text) >= 2 and text[0] == text[-1] and text[0] in "\"'":
+        return text[1:-1]
+    if text.startswith("[") and text.endswith("]"):
+        inner = text[1:-1].strip()
+        return [parse_scalar(item) for item in inner.split(",")] if inner else []
+    lower = text.lower()
+    if lower in ("true", "yes", "on"):
+        return True
+    if lower in ("false", "no", "off"):
+        return False
+    if lower in ("", "null", "~"):
+        return None
+    if INTEGER_PATTERN.fullmatch(text):
+        return int(text)
+    return text
+
+def parse_frontmatter(lines):
+    meta = {}
+    key = None
+    for line in lines:
+        line = line.rstrip("\r\n")
+        stripped = line.strip()
+        if not stripped or stripped.startswith("#"):
+            continue
+        # "- item" under a key with no value of its own is a block list
+        if stripped.startswith("- ") and key is not None and (meta[key] is None or isinstance(meta[key], list)):
+            if meta[key] is None:
+                meta[key] = []
+            meta[key].append(parse_scalar(stripped[2:]))
+            continue
+        match = KEY_PATTERN.match(line)
+        if match is None:
+            raise ValueError(f"Invalid frontmatter line: {stripped!r}")
+        key = match.group(1)
+        meta[key] = parse_scalar(match.group(2))
+    return normalize(meta)
+
+def normalize(meta):
+    # Every page gets the same core fields, whatever its header had
+    tags = meta.get("tags") or []
+    if isinstance(tags, str):
+        tags = tags.split(",")
+    meta["tags"] = [str(tag).strip() for tag in tags if str(tag).strip()]
+    meta["draft"] = meta.get("draft") is True
+    for field in ("title", "date"):
+        value = meta.get(field)
+        meta[field] = None if value is None else str(value)
+    return meta
+
+def split_frontmatter(lines):
+    # Consumes the header from an iterable of lines; returns the metadata and
+    # an iterator over the rest of the document. A leading "---" is also a
+    # horizontal rule, so without a closing fence, or with no "key: value"
+    # line before it, everything is body.
+    lines = iter(lines)
+    first = next(lines, None)
+    if first is None:
+        return normalize({}), iter(())
+    if first.strip() != FRONTMATTER_DELIMITER:
+        return normalize({}), itertools.chain([first], lines)
+    header = []
+    for line in lines:
+        if line.strip() in FRONTMATTER_END:
+            if any(KEY_PATTERN.match(text) for text in header):
+                return parse_frontmatter(header), lines
+            return normalize({}), itertools.chain([first], header, [line], lines)
+        header.append(line)
+    return normalize({}), itertools.chain([first], header)
+
+def read_metadata(path):
+    # Reads the header and, if it has no title, only as far as the first
+    # "# " heading; the rest of the page is never touched
+    with open(path) as file:
+        meta, body = split_frontmatter(file)
+        if meta["title"] is None:
+            for line in body:
+                stripped = line.strip()
+                if stripped.startswith("# "):
+                    meta["title"] = stripped[2:]
+                    break
+    return meta
+
+def collect_metadata(paths, cache=None):
+    # One pass over the sources: source path -> metadata. cache maps a path to
+    # [size, mtime_ns, metadata] from an earlier build; files whose stat still
+    # matches are not opened, and the cache is updated in place
+    cache = {} if cache is None else cache
+    metadata = {}
+    for path in paths:
+        stat = os.stat(path)
+        entry = cache.get(path)
+        if entry is not None and entry[0] == stat.st_size and entry[1] == stat.st_mtime_ns:
+            metadata[path] = entry[2]
+            continue
+        try:
+            metadata[path] = read_metadata(path)
+        except ValueError as error:
+            raise ValueError(f"{path}: {error}") from None
+        cache[path] = [stat.st_size, stat.st_mtime_ns, metadata[path]]
+    for path in set(cache) - set(metadata):
+        del cache[path]
+    return metadata
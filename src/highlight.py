@@ -0,0 +1,216 @@
+import re
+import hashlib
+import threading
+from collections import OrderedDict
+from html import escape
+
+try:
+    # Only the package itself: pygments.lexers takes longer to import than
+    # the whole renderer, so it waits until a fence first needs it
+    import pygments
+except ImportError:
+    pygments = None
+
+DEFAULT_CACHE_ENTRIES = 1024
+
+# The Highlighter for the running build, if --highlight is on
+active = None
+
+def keywords(words):
+    return r"\b(?:" + "|".join(words.split()) + r")\b"
+
+# Each built-in lexer is an ordered list of (css class, pattern); the first
+# pattern that matches at a position wins and anything unmatched is plain
+# text. Classes are Pygments' short names so one stylesheet serves both.
+PYTHON = [
+    ("c", r"#[^\n]*"),
+    ("s", r"(?i:[rbfu]{0,2})(?:\"\"\"[\s\S]*?\"\"\"|'''[\s\S]*?'''|\"(?:\\.|[^\"\\\n])*\"|'(?:\\.|[^'\\\n])*')"),
+    ("nd", r"@[\w.]+"),
+    ("nf", r"(?<=\bdef )\w+"),
+    ("nc", r"(?<=\bclass )\w+"),
+    ("kc", keywords("True False None")),
+    ("k", keywords("and as assert async await break class continue def del elif else except finally for "
+                   "from global if import in is lambda nonlocal not or pass raise return try while with yield")),
+    ("nb", keywords("abs all any bool dict enumerate filter float getattr hasattr int isinstance iter len "
+                    "list map max min next object open print range repr set sorted str sum super tuple type zip")),
+    ("m", r"\b(?:0[xXoObB][\da-fA-F_]+|\d[\d_]*\.?\d*(?:[eE][+-]?\d+)?j?)\b"),
+    ("o", r"[-+*/%=<>!&|^~]+"),
+]
+
+JAVASCRIPT = [
+    ("c", r"//[^\n]*|/\*[\s\S]*?\*/"),
+    ("s", r"\"(?:\\.|[^\"\\\n])*\"|'(?:\\.|[^'\\\n])*'|`(?:\\.|[^`\\])*`"),
+    ("nf", r"(?<=\bfunction )\w+"),
+    ("nc", r"(?<=\bclass )\w+"),
+    ("kc", keywords("true false null undefined NaN Infinity this")),
+    ("k", keywords("async await break case catch class const continue default delete do else export extends "
+                   "finally for from function if import in instanceof let new of return static switch throw "
+                   "try typeof var void while yield interface type enum implements")),
+    ("nb", keywords("Array Boolean Date Error JSON Map Math Number Object Promise RegExp Set String Symbol "
+                    "console document window require module")),
+    ("m", r"\b(?:0[xXoObB][\da-fA-F_]+|\d[\d_]*\.?\d*(?:[eE][+-]?\d+)?n?)\b"),
+    ("o", r"=>|[-+*/%=<>!&|^~?:]+"),
+]
+
+BASH = [
+    ("c", r"(?<![\w$])#[^\n]*"),
+    ("s", r"\"(?:\\.|[^\"\\])*\"|'[^']*'"),
+    ("nv", r"\$(?:\{[^}\n]*\}|\w+|[@*#?$!-])"),
+    ("k", keywords("if then else elif fi for while until do done case esac function in select return")),
+    ("nb", keywords("cd echo exit export local printf pwd read set shift source test trap unset")),
+    ("o", r"&&|\|\||[|&;<>]"),
+]
+
+JSON = [
+    ("nt", r"\"(?:\\.|[^\"\\\n])*\"(?=\s*:)"),
+    ("s", r"\"(?:\\.|[^\"\\\n])*\""),
+    ("kc", keywords("true false null")),
+    ("m", r"-?\b\d+(?:\.\d+)?(?:[eE][+-]?\d+)?\b"),
+    ("p", r"[{}\[\],:]"),
+]
+
+CSS = [
+    ("c", r"/\*[\s\S]*?\*/"),
+    ("s", r"\"(?:\\.|[^\"\\\n])*\"|'(?:\\.|[^'\\\n])*'"),
+    ("k", r"@[\w-]+|!important"),
+    ("nt", r"[\w-]+(?=\s*:[^;{}]*;)"),
+    ("m", r"#[\da-fA-F]{3,8}\b|-?\b\d+(?:\.\d+)?(?:%|[a-zA-Z]+)?"),
+    ("p", r"[{}:;,()]"),
+]
+
+LEXERS = {"python": PYTHON, "javascript": JAVASCRIPT, "bash": BASH, "json": JSON, "css": CSS}
+ALIASES = {
+    "py": "python", "python3": "python",
+    "js": "javascript", "jsx": "javascript", "mjs": "javascript", "ts": "javascript", "typescript": "javascript",
+    "sh": "bash", "shell": "bash", "zsh": "bash",
+}
+
+def compile_lexer(rules):
+    pattern = "|".join(f"(?P<{css_class}_{i}>{rule})" for i, (css_class, rule) in enumerate(rules))
+    return re.compile(pattern)
+
+# Compiled on first use; builds without --highlight never pay for it
+COMPILED = {}
+
+def lexer_pattern(language):
+    pattern = COMPILED.get(language)
+    if pattern is None and language in LEXERS:
+        pattern = COMPILED[language] = compile_lexer(LEXERS[language])
+    return pattern
+
+def fence_language(line):
+    # ```python, ``` Python or ```py {.numbered} -> "python"; None without a tag
+    info = line.strip().strip("`").strip()
+    if not info:
+        return None
+    word = info.split(None, 1)[0].lstrip("{.").rstrip("}").lower()
+    return word or None
+
+def tokenize_builtin(pattern, code):
+    tokens = []
+    pos = 0
+    for match in pattern.finditer(code):
+        if match.start() > pos:
+            tokens.append((None, code[pos:match.start()]))
+        css_class = match.lastgroup.rsplit("_", 1)[0]
+        tokens.append((css_class, match.group()))
+        pos = match.end()
+    if pos < len(code):
+        tokens.append((None, code[pos:]))
+    return tokens
+
+# Pygments' many token types folded onto the classes the built-in lexers use
+PYGMENTS_CLASSES = [
+    ("Keyword.Constant", "kc"), ("Keyword", "k"), ("Name.Builtin", "nb"), ("Name.Function", "nf"),
+    ("Name.Class", "nc"), ("Name.Decorator", "nd"), ("Name.Variable", "nv"), ("Name.Tag", "nt"),
+    ("Name.Attribute", "na"), ("Literal.String", "s"), ("Literal.Number", "m"), ("Comment", "c"),
+    ("Operator", "o"), ("Punctuation", "p"),
+]
+
+def tokenize_pygments(language, code):
+    from pygments import lex
+    from pygments.lexers import get_lexer_by_name
+    from pygments.token import string_to_tokentype
+    from pygments.util import ClassNotFound
+    try:
+        lexer = get_lexer_by_name(language, stripnl=False, ensurenl=False)
+    except ClassNotFound:
+        return None
+    classes = [(string_to_tokentype(name), css_class) for name, css_class in PYGMENTS_CLASSES]
+    tokens = []
+    for token_type, value in lex(code, lexer):
+        css_class = next((name for parent, name in classes if token_type in parent), None)
+        tokens.append((css_class, value))
+    return tokens
+
+def merge_tokens(tokens):
+    # Escaped once here, so cached tokens go straight into nodes; neighbours
+    # with the same class become one span
+    merged = []
+    for css_class, text in tokens:
+        if merged and merged[-1][0] == css_class:
+            merged[-1] = (css_class, merged[-1][1] + text)
+        else:
+            merged.append((css_class, text))
+    return tuple((css_class, escape(text, quote=False)) for css_class, text in merged if text)
+
+class Highlighter:
+    # Tokens per (language, sha1 of the code) in a bounded LRU: the same
+    # snippets turn up on page after page. Safe to share between threads.
+    def __init__(self, max_entries=DEFAULT_CACHE_ENTRIES):
+        self.max_entries = max_entries
+        self.counts = {"highlighted": 0, "cached": 0, "unknown": 0}
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def signature(self):
+        # Part of every cache key over rendered output
+        return f"highlight:{pygments.__version__}" if pygments is not None else "highlight"
+
+    def tokens(self, language, code):
+        # Returns ((css class or None, escaped text), ...), or None for a
+        # language neither the built-in lexers nor Pygments know
+        language = ALIASES.get(language, language)
+        key = (language, hashlib.sha1(code.encode()).digest())
+        with self._lock:
+            tokens = self._entries.get(key)
+            if tokens is not None:
+                self._entries.move_to_end(key)
+                self.counts["cached"] += 1
+                return tokens
+
+        tokens = None
+        pattern = lexer_pattern(language)
+        if pattern is not None:
+            tokens = tokenize_builtin(pattern, code)
+        elif pygments is not None:
+            tokens = tokenize_pygments(language, code)
+        if tokens is None:
+            with self._lock:
+                self.counts["unknown"] += 1
+            return None
+        tokens = merge_tokens(tokens)
+
+        with self._lock:
+            self.counts["highlighted"] += 1
+            self._entries[key] = tokens
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return tokens
+
+    def drain(self):
+        with self._lock:
+            counts = dict(self.counts)
+            for key in self.counts:
+                self.counts[key] = 0
+        return counts
+
+    def merge(self, counts):
+        with self._lock:
+            for key, value in counts.items():
+                self.counts[key] += value
+
+    def summary(self):
+        counts = self.counts
+        return (f"Highlighted {counts['highlighted'] + counts['cached']} code blocks "
+                f"({counts['cached']} from the snippet cache), {counts['unknown']} in unknown languages")
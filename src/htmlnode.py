@@ -1,17 +1,32 @@
+import sys
+from types import MappingProxyType
 from textnode import TextNode, TextType
+from inline import tokenize_inline, has_inline_markup, NESTABLE_TYPES
+
+# Shared by every node without attributes instead of a None or an empty dict each
+NO_PROPS = MappingProxyType({})
 
 class HTMLNode:
+    __slots__ = ("tag", "value", "children", "props")
+
     def __init__(self, tag=None, value=None, children=None, props=None):
-        self.tag = tag
+        # Tags come from a tiny vocabulary, so interning lets all nodes share one string
+        self.tag = sys.intern(tag) if tag is not None else None
         self.value = value
         self.children = children
-        self.props = props
+        self.props = NO_PROPS if props is None else props
 
     def to_html(self):
         raise NotImplementedError ("Child class must implement this method")
+
+    def iter_html(self):
+        yield self.to_html()
+
+    def write_html(self, fp):
+        fp.writelines(self.iter_html())
     
     def props_to_html(self):
-        if self.props is None or len(self.props) == 0:
+        if not self.props:
             return ""
         props_html = ""
         for prop in self.props:
@@ -19,9 +34,14 @@ class HTMLNode:
         return props_html
             
     def __repr__(self):
-        return f"HTMLNode({self.tag}, {self.value},{self.children},{self.props})"
+        return f"HTMLNode({self.tag}, {self.value},{self.children},{self.repr_props()})"
+
+    def repr_props(self):
+        return None if self.props is NO_PROPS else self.props
 
 class LeafNode(HTMLNode):
+    __slots__ = ()
+
     def __init__(self, tag, value, props=None):
         super().__init__(tag, value, None, props)
         
@@ -33,23 +53,50 @@ class LeafNode(HTMLNode):
         return f"<{self.tag}{self.props_to_html()}>{self.value}</{self.tag}>"
     
     def __repr__(self):
-        return f"LeafNode({self.tag}, {self.value}, {self.props})"
+        return f"LeafNode({self.tag}, {self.value}, {self.repr_props()})"
         
 class ParentNode(HTMLNode):
+    __slots__ = ()
+
     def __init__(self, tag, children, props=None):
         super().__init__(tag, None, children, props)
 
-    def to_html(self):
+    def check(self):
         if self.tag is None:
             raise ValueError ("Item requires a tag")
         elif self.children is None:
             raise ValueError ("A value is required in children")
-        
-        props_str = self.props_to_html()
-        inner_content = "".join([child.to_html() for child in self.children])
-        return f"<{self.tag}{props_str}>{inner_content}</{self.tag}>"
+
+    def to_html(self):
+        return "".join(self.iter_html())
+
+    def iter_html(self):
+        # Walk with an explicit stack instead of recursing, so each piece is
+        # yielded once rather than copied into every enclosing subtree string
+        stack = [self]
+        while stack:
+            item = stack.pop()
+            if isinstance(item, str):
+                yield item
+            elif isinstance(item, ParentNode):
+                item.check()
+                yield f"<{item.tag}{item.props_to_html()}>"
+                stack.append(f"</{item.tag}>")
+                stack.extend(reversed(item.children))
+            else:
+                yield from item.iter_html()
+
+def inline_children(text):
+    # Nested spans are lenient: a stray _ inside **snake_case** stays literal
+    return [text_node_to_html_node(node) for node in tokenize_inline(text, strict=False)]
 
 def text_node_to_html_node(text_node):
+    if text_node.text_type in NESTABLE_TYPES and has_inline_markup(text_node.text):
+        if text_node.text_type == TextType.BOLD:
+            return ParentNode("b", inline_children(text_node.text))
+        if text_node.text_type == TextType.ITALIC:
+            return ParentNode("i", inline_children(text_node.text))
+        return ParentNode("a", inline_children(text_node.text), {"href": text_node.url})
     if text_node.text_type == TextType.TEXT:
         return LeafNode(None, text_node.text)
     if text_node.text_type == TextType.BOLD:
@@ -63,4 +110,21 @@ def text_node_to_html_node(text_node):
     if text_node.text_type == TextType.IMAGE:
         return LeafNode("img", "", {"src": text_node.url, "alt": text_node.text})
     raise ValueError(f"invalid text type: {text_node.text_type}")
-    
\ No newline at end of file
+
+URL_PROPS = ("href", "src")
+
+def apply_basepath(node, basepath):
+    # Rewrite site-absolute links in generated markup; protocol-relative //host is left alone
+    if basepath == "/":
+        return node
+    stack = [node]
+    while stack:
+        item = stack.pop()
+        if item.props:
+            for key in URL_PROPS:
+                url = item.props.get(key)
+                if url and url.startswith("/") and not url.startswith("//"):
+                    item.props = {**item.props, key: basepath + url[1:]}
+        if item.children:
+            stack.extend(item.children)
+    return node
@@ -0,0 +1,239 @@
+import os
+import json
+import struct
+import hashlib
+from assets import is_current, copy_asset
+from manifest import hash_file, remove_output
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+IMAGE_INDEX_VERSION = 1
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".gif", ".webp")
+DEFAULT_WIDTHS = (480, 960, 1600)
+SAVE_OPTIONS = {".png": {"optimize": True}, ".jpg": {"quality": 82, "optimize": True},
+                ".jpeg": {"quality": 82, "optimize": True}, ".webp": {"quality": 80}}
+
+# url of an image -> {"width", "height", "srcset"} for the running build
+active = None
+
+def webp_dimensions(head):
+    chunk = head[12:16]
+    if chunk == b'VP8 ':
+        width, height = struct.unpack("<HH", head[26:30])
+        return width & 0x3fff, height & 0x3fff
+    if chunk == b'VP8L':
+        b = head[21:25]
+        width = 1 + (((b[1] & 0x3f) << 8) | b[0])
+        height = 1 + (((b[3] & 0x0f) << 10) | (b[2] << 2) | ((b[1] & 0xc0) >> 6))
+        return width, height
+    if chunk == b'VP8X':
+        return 1 + int.from_bytes(head[24:27], "little"), 1 + int.from_bytes(head[27:30], "little")
+    return None
+
+def jpeg_dimensions(file):
+    # Walk the segments until a start-of-frame marker, which carries the size
+    while True:
+        byte = file.read(1)
+        while byte == b'\xff':
+            byte = file.read(1)
+        if not byte:
+            return None
+        marker = byte[0]
+        if marker in (0xd8, 0x01) or 0xd0 <= marker <= 0xd7:
+            continue
+        header = file.read(2)
+        if len(header) < 2:
+            return None
+        length = struct.unpack(">H", header)[0]
+        if 0xc0 <= marker <= 0xcf and marker not in (0xc4, 0xc8, 0xcc):
+            frame = file.read(5)
+            if len(frame) < 5:
+                return None
+            height, width = struct.unpack(">HH", frame[1:5])
+            return width, height
+        file.seek(length - 2, os.SEEK_CUR)
+        if file.read(1) != b'\xff':
+            return None
+
+def read_dimensions(path):
+    # Only reads headers, so this works without an image library. A file cut
+    # off inside its header has no known size rather than failing the build.
+    try:
+        with open(path, 'rb') as file:
+            head = file.read(32)
+            if head.startswith(b'\x89PNG\r\n\x1a\n') and head[12:16] == b'IHDR':
+                return struct.unpack(">II", head[16:24])
+            if head[:6] in (b'GIF87a', b'GIF89a'):
+                return struct.unpack("<HH", head[6:10])
+            if head.startswith(b'RIFF') and head[8:12] == b'WEBP':
+                return webp_dimensions(head)
+            if head.startswith(b'\xff\xd8'):
+                file.seek(2)
+                return jpeg_dimensions(file)
+    except (struct.error, IndexError, OSError):
+        return None
+    return None
+
+def make_variants(source_path, extension, size, widths, cache_path):
+    # Resizes one image to every width smaller than it; returns [[width, height], ...]
+    width, height = size
+    variants = []
+    with Image.open(source_path) as image:
+        image.load()
+        for target in sorted(widths):
+            if target >= width:
+                continue
+            target_height = max(1, round(height * target / width))
+            path = cache_path(target)
+            tmp_path = path + '.tmp' + extension
+            image.resize((target, target_height), Image.LANCZOS).save(tmp_path, **SAVE_OPTIONS.get(extension, {}))
+            os.replace(tmp_path, path)
+            variants.append([target, target_height])
+    return variants
+
+def variant_name(rel_path, width, digest):
+    stem, extension = os.path.splitext(rel_path)
+    return f"{stem}-{width}w-{digest[:8]}{extension}"
+
+class ImageStage:
+    def __init__(self, source, destination, cache_dir, widths=DEFAULT_WIDTHS, jobs=None):
+        self.source = source
+        self.destination = destination
+        self.cache_dir = cache_dir
+        self.index_path = os.path.join(cache_dir, "index.json")
+        self.widths = sorted(widths)
+        self.jobs = jobs
+        # Part of every cached record: changing it reprocesses everything
+        self.settings = {"widths": self.widths, "encoder": Image is not None}
+        self.index = {"version": IMAGE_INDEX_VERSION, "paths": {}, "images": {}, "outputs": []}
+
+    def load(self):
+        try:
+            with open(self.index_path) as file:
+                index = json.load(file)
+        except (OSError, ValueError):
+            return
+        if isinstance(index, dict) and index.get("version") == IMAGE_INDEX_VERSION:
+            self.index = index
+
+    def save(self):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp_path = self.index_path + '.tmp'
+        with open(tmp_path, 'w') as file:
+            json.dump(self.index, file, indent=1, sort_keys=True)
+        os.replace(tmp_path, self.index_path)
+
+    def cache_path(self, digest, extension):
+        return lambda width: os.path.join(self.cache_dir, f"{digest}-{width}{extension}")
+
+    def digest(self, rel_path, source_stat):
+        # Content hash, skipping the read when size and mtime are unchanged
+        entry = self.index["paths"].get(rel_path)
+        if entry and entry[0] == source_stat.st_size and entry[1] == source_stat.st_mtime_ns:
+            return entry[2]
+        return hash_file(os.path.join(self.source, rel_path))
+
+    def process(self, rel_path):
+        source_path = os.path.join(self.source, rel_path)
+        source_stat = os.stat(source_path)
+        digest = self.digest(rel_path, source_stat)
+        extension = os.path.splitext(rel_path)[1].lower()
+        record = self.index["images"].get(digest)
+        if record is None or record["settings"] != self.settings:
+            size = read_dimensions(source_path)
+            variants = []
+            if size is not None and Image is not None:
+                try:
+                    variants = make_variants(source_path, extension, size, self.widths,
+                                             self.cache_path(digest, extension))
+                except (OSError, ValueError, Image.DecompressionBombError) as error:
+                    # Pillow's UnidentifiedImageError is an OSError; a broken
+                    # image keeps its size and is served without variants
+                    print(f"warning: {source_path}: no resized variants ({error})")
+            record = {"settings": self.settings, "size": size, "variants": variants, "extension": extension}
+            processed = True
+        else:
+            processed = False
+        return rel_path, [source_stat.st_size, source_stat.st_mtime_ns, digest], record, processed
+
+    def run(self, assets):
+        # Returns the url -> image info map for annotate_images
+        from concurrent.futures import ThreadPoolExecutor
+        self.load()
+        os.makedirs(self.cache_dir, exist_ok=True)
+        image_paths = [rel_path for rel_path in assets if rel_path.lower().endswith(IMAGE_EXTENSIONS)]
+        with ThreadPoolExecutor(max_workers=self.jobs) as executor:
+            results = list(executor.map(self.process, image_paths))
+
+        paths, images, outputs, info = {}, {}, [], {}
+        processed = 0
+        for rel_path, entry, record, fresh in results:
+            digest = entry[2]
+            paths[rel_path] = entry
+            images[digest] = record
+            processed += fresh
+            if record["size"] is None:
+                continue
+
+            url = "/" + rel_path.replace(os.sep, "/")
+            srcset = []
+            for width, _ in record["variants"]:
+                name = variant_name(rel_path, width, digest)
+                self.publish(self.cache_path(digest, record["extension"])(width), name)
+                outputs.append(name)
+                srcset.append(["/" + name.replace(os.sep, "/"), width])
+            if srcset:
+                srcset.append([url, record["size"][0]])
+            info[url] = {"width": record["size"][0], "height": record["size"][1], "srcset": srcset}
+
+        for name in sorted(set(self.index["outputs"]) - set(outputs)):
+            remove_output(os.path.join(self.destination, name), self.destination)
+        self.prune_cache(images)
+        self.index.update(paths=paths, images=images, outputs=sorted(outputs))
+        self.save()
+
+        encoder = "Pillow" if Image is not None else "no encoder, sizes only"
+        print(f"Images: {len(image_paths)} found, {processed} processed, {len(outputs)} variants ({encoder})")
+        return info
+
+    def publish(self, cached_path, name):
+        dest_path = os.path.join(self.destination, name)
+        cached_stat = os.stat(cached_path)
+        if not is_current(cached_stat, dest_path):
+            copy_asset(cached_path, dest_path, cached_stat)
+
+    def prune_cache(self, images):
+        keep = {os.path.basename(self.cache_path(digest, record["extension"])(width))
+                for digest, record in images.items() for width, _ in record["variants"]}
+        for name in os.listdir(self.cache_dir):
+            if name != "index.json" and name not in keep:
+                os.remove(os.path.join(self.cache_dir, name))
+
+def images_digest(info):
+    # Pages depend on this: any change means their <img> tags change
+    return hashlib.sha256(json.dumps(info, sort_keys=True).encode()).hexdigest()
+
+def changed_images(old, new):
+    # Output paths, relative to the site root, of images added, removed or resized
+    return {url.lstrip("/") for url in old.keys() | new.keys() if old.get(url) != new.get(url)}
+
+def annotate_images(node, info, basepath="/"):
+    # Fill in size, lazy loading and srcset for images we know about. Runs
+    # before apply_basepath, so srcset (which that leaves alone) gets the
+    # basepath here
+    stack = [node]
+    while stack:
+        item = stack.pop()
+        if item.tag == "img":
+            image = info.get(item.props.get("src"))
+            if image is not None:
+                props = {**item.props, "width": str(image["width"]), "height": str(image["height"]), "loading": "lazy"}
+                if image["srcset"]:
+                    props["srcset"] = ", ".join(f"{basepath}{url[1:]} {width}w" for url, width in image["srcset"])
+                item.props = props
+        if item.children:
+            stack.extend(item.children)
+    return node
@@ -0,0 +1,67 @@
+import re
+from textnode import TextType, TextNode
+
+# Anything that can open an inline span; the scanner jumps straight between these
+OPENER_PATTERN = re.compile(r"\*\*|_|`|!\[|\[")
+IMAGE_PATTERN = re.compile(r"!\[([^\[\]]+)\]\(([^\(\)]+)\)")
+LINK_PATTERN = re.compile(r"\[([^\[\]]*)\]\(([^\(\)]*)\)")
+
+DELIMITERS = {
+    "**": TextType.BOLD,
+    "_": TextType.ITALIC,
+    "`": TextType.CODE,
+}
+
+# Span types whose text may itself contain inline markup
+NESTABLE_TYPES = (TextType.BOLD, TextType.ITALIC, TextType.LINK)
+
+def tokenize_inline(text, strict=True):
+    # Single left-to-right pass. Whichever span opens first wins, so code spans
+    # keep their `_` and link text keeps its `**` for the nested render.
+    nodes = []
+    pending = 0
+    pos = 0
+    exhausted = set()
+
+    while True:
+        match = OPENER_PATTERN.search(text, pos)
+        if match is None:
+            break
+        opener = match.group()
+        start = match.start()
+
+        if opener in DELIMITERS:
+            end = -1 if opener in exhausted else text.find(opener, match.end())
+            if end == -1:
+                if strict:
+                    raise Exception(f"Invalid markdown syntax: unmatched delimiter {opener}")
+                # No closer anywhere further on, so later openers can't match either
+                exhausted.add(opener)
+                pos = match.end()
+                continue
+            if start > pending:
+                nodes.append(TextNode(text[pending:start], TextType.TEXT))
+            nodes.append(TextNode(text[match.end():end], DELIMITERS[opener]))
+            pending = pos = end + len(opener)
+            continue
+
+        if opener == "![":
+            span = IMAGE_PATTERN.match(text, start)
+            text_type = TextType.IMAGE
+        else:
+            span = LINK_PATTERN.match(text, start)
+            text_type = TextType.LINK
+        if span is None:
+            pos = match.end()
+            continue
+        if start > pending:
+            nodes.append(TextNode(text[pending:start], TextType.TEXT))
+        nodes.append(TextNode(span.group(1), text_type, span.group(2)))
+        pending = pos = span.end()
+
+    if pending < len(text):
+        nodes.append(TextNode(text[pending:], TextType.TEXT))
+    return nodes
+
+def has_inline_markup(text):
+    return OPENER_PATTERN.search(text) is not None
@@ -0,0 +1,125 @@
+import os
+import re
+import json
+import posixpath
+from urllib.parse import urlsplit, unquote
+
+LINK_INDEX_VERSION = 1
+REFERENCE_ATTRIBUTES = {"href": "link", "src": "image"}
+REFERENCE_PATTERN = re.compile(r'\b(href|src)="([^"]*)"')
+
+# The index for the running build, if references are being recorded
+active = None
+
+def node_references(node):
+    # Every href and src in a rendered tree, as (kind, target) pairs in document order
+    references = []
+    stack = [node]
+    while stack:
+        item = stack.pop()
+        if item.props:
+            for key, kind in REFERENCE_ATTRIBUTES.items():
+                target = item.props.get(key)
+                if target is not None:
+                    references.append((kind, target))
+        if item.children:
+            stack.extend(reversed(item.children))
+    return references
+
+def fragment_references(html):
+    # Same as node_references, for markup that only exists as a string (cache hits)
+    return [(REFERENCE_ATTRIBUTES[key], target) for key, target in REFERENCE_PATTERN.findall(html)]
+
+def resolve(target, page_url, basepath):
+    # Map a reference to a path relative to the output root, or None when it
+    # points off-site or at the page itself
+    parts = urlsplit(target)
+    if parts.scheme or parts.netloc or not parts.path:
+        return None
+    path = unquote(parts.path)
+    if path.startswith("/"):
+        if not path.startswith(basepath):
+            return path
+        path = path[len(basepath):]
+    elif page_url is None:
+        return None
+    else:
+        path = posixpath.join(posixpath.dirname(page_url), path)
+    trailing = path.endswith("/")
+    path = posixpath.normpath(path).lstrip("/")
+    if path in ("", "."):
+        return "index.html"
+    return path + "/index.html" if trailing else path
+
+class LinkIndex:
+    def __init__(self, destination, basepath="/"):
+        # source path -> {"url": output path relative to the site root, "references": [[kind, target], ...]}
+        self.destination = destination
+        self.basepath = basepath
+        self.pages = {}
+
+    def record(self, source, dest_path, references):
+        # dest_path None means relative targets can't be resolved (the template)
+        url = None
+        if dest_path is not None:
+            url = os.path.relpath(dest_path, self.destination).replace(os.sep, "/")
+        self.pages[source] = {"url": url, "references": [list(reference) for reference in references]}
+
+    def merge(self, pages):
+        self.pages.update(pages)
+
+    def retain(self, sources):
+        # Forget pages whose source no longer exists
+        for source in set(self.pages) - set(sources):
+            del self.pages[source]
+
+    def broken(self, site_files):
+        # site_files holds every output path relative to the site root
+        site_files = set(site_files)
+        broken = []
+        for source, page in sorted(self.pages.items()):
+            for kind, target in page["references"]:
+                path = resolve(target, page["url"], self.basepath)
+                if path is None or path in site_files or f"{path}/index.html" in site_files:
+                    continue
+                broken.append((source, kind, target))
+        return broken
+
+    def referencing(self, paths, kind):
+        # Sources with a reference of this kind to any of paths (relative to the site root)
+        paths = set(paths)
+        return {
+            source for source, page in self.pages.items()
+            if any(reference_kind == kind and resolve(target, page["url"], self.basepath) in paths
+                   for reference_kind, target in page["references"])
+        }
+
+    def reference_count(self):
+        return sum(len(page["references"]) for page in self.pages.values())
+
+    def to_json(self):
+        return {"version": LINK_INDEX_VERSION, "basepath": self.basepath, "pages": self.pages}
+
+    def load(self, path):
+        # Returns False when there is nothing usable to build on
+        try:
+            with open(path) as file:
+                data = json.load(file)
+        except (OSError, ValueError):
+            return False
+        if not isinstance(data, dict) or data.get("version") != LINK_INDEX_VERSION or data.get("basepath") != self.basepath:
+            return False
+        self.pages = data["pages"]
+        return True
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w') as file:
+            json.dump(self.to_json(), file, indent=1, sort_keys=True)
+        os.replace(tmp_path, path)
+
+def format_broken(broken):
+    lines = [f"{len(broken)} broken reference(s):"]
+    lines.extend(f"  {source}: {kind} {target}" for source, kind, target in broken)
+    return "\n".join(lines)
@@ -0,0 +1,168 @@
+import os
+import re
+import json
+import datetime
+from html import escape
+from htmlnode import ParentNode, LeafNode, apply_basepath
+from template import load_template
+from manifest import hash_bytes, remove_output, page_url
+import minify
+import compress
+
+BLOG_DIR = "blog"
+FEED_NAME = "atom.xml"
+FEED_SIZE = 20
+LISTED_FIELDS = ("title", "date", "url")
+SLUG_PATTERN = re.compile(r"[^a-z0-9]+")
+
+def slugify(text):
+    return SLUG_PATTERN.sub("-", text.lower()).strip("-") or "tag"
+
+def find_posts(pages, metadata, source, destination):
+    # Every page under content/blog/ except a hand-written blog index, newest first
+    blog_dir = os.path.join(source, BLOG_DIR) + os.sep
+    blog_index = os.path.join(source, BLOG_DIR, "index.md")
+    posts = []
+    for input_path, dest_path in pages.items():
+        if not input_path.startswith(blog_dir) or input_path == blog_index:
+            continue
+        meta = metadata[input_path]
+        # The feed needs a date for every entry; fall back to when the file last changed
+        updated = meta["date"]
+        if updated is None:
+            updated = datetime.date.fromtimestamp(os.stat(input_path).st_mtime).isoformat()
+        posts.append({"title": meta["title"] or input_path, "date": meta["date"], "updated": updated,
+                      "tags": meta["tags"], "url": page_url(dest_path, destination)})
+    # Undated posts go last, in a stable order
+    posts.sort(key=lambda post: post["title"])
+    posts.sort(key=lambda post: post["date"] or "", reverse=True)
+    return posts
+
+def paginate(posts, page_size):
+    return [posts[i:i + page_size] for i in range(0, len(posts), page_size)] or [[]]
+
+def listing_path(destination, base, number):
+    if number == 1:
+        return os.path.join(destination, base, "index.html")
+    return os.path.join(destination, base, "page", str(number), "index.html")
+
+def plan_listings(posts, destination, page_size):
+    # dest path -> everything the page shows; nothing is rendered yet
+    listings = {}
+    groups = [(BLOG_DIR, "Blog", posts)]
+    tags = sorted({tag for post in posts for tag in post["tags"]})
+    for tag in tags:
+        tagged = [post for post in posts if tag in post["tags"]]
+        groups.append((os.path.join(BLOG_DIR, "tags", slugify(tag)), f"Posts tagged “{tag}”", tagged))
+
+    for base, title, group in groups:
+        chunks = paginate(group, page_size)
+        for number, chunk in enumerate(chunks, 1):
+            newer = page_url(listing_path(destination, base, number - 1), destination) if number > 1 else None
+            older = page_url(listing_path(destination, base, number + 1), destination) if number < len(chunks) else None
+            listings[listing_path(destination, base, number)] = {
+                "title": title if number == 1 else f"{title}, page {number}",
+                # Only what the page shows, so its digest ignores anything else
+                "posts": [{key: post[key] for key in LISTED_FIELDS} for post in chunk],
+                "newer": newer,
+                "older": older,
+                "tags": [[tag, page_url(listing_path(destination, os.path.join(BLOG_DIR, "tags", slugify(tag)), 1), destination)]
+                         for tag in tags] if base == BLOG_DIR and number == 1 else [],
+            }
+    return listings
+
+def listing_node(listing):
+    items = []
+    for post in listing["posts"]:
+        children = [LeafNode("a", escape(post["title"], quote=False), {"href": post["url"]})]
+        if post["date"]:
+            children.append(LeafNode("time", escape(post["date"], quote=False), {"datetime": post["date"]}))
+        items.append(ParentNode("li", children))
+    children = [LeafNode("h1", escape(listing["title"], quote=False))]
+    children.append(ParentNode("ul", items) if items else LeafNode("p", "No posts yet."))
+    nav = []
+    if listing["newer"]:
+        nav.append(LeafNode("a", "Newer posts", {"href": listing["newer"], "rel": "prev"}))
+    if listing["older"]:
+        nav.append(LeafNode("a", "Older posts", {"href": listing["older"], "rel": "next"}))
+    if nav:
+        children.append(ParentNode("nav", nav))
+    if listing["tags"]:
+        children.append(ParentNode("p", [LeafNode("a", escape(tag, quote=False), {"href": url}) for tag, url in listing["tags"]]))
+    return ParentNode("div", children)
+
+def atom_feed(posts, basepath, site_url, updated):
+    def absolute(url):
+        return site_url.rstrip("/") + basepath + url[1:]
+
+    entries = []
+    for post in posts:
+        link = escape(absolute(post["url"]))
+        entries.append(
+            f"<entry><title>{escape(post['title'])}</title><link href=\"{link}\"/><id>{link}</id>"
+            f"<updated>{post['updated'][:10]}T00:00:00Z</updated>"
+            + "".join(f"<category term=\"{escape(tag)}\"/>" for tag in post["tags"])
+            + "</entry>"
+        )
+    home = escape(absolute("/" + BLOG_DIR + "/"))
+    return (
+        '<?xml version="1.0" encoding="utf-8"?>\n'
+        '<feed xmlns="http://www.w3.org/2005/Atom">'
+        f"<title>Blog</title><link href=\"{home}\"/>"
+        f"<link rel=\"self\" href=\"{escape(absolute('/' + BLOG_DIR + '/' + FEED_NAME))}\"/>"
+        f"<id>{home}</id><updated>{updated}T00:00:00Z</updated>"
+        + "".join(entries)
+        + "</feed>\n"
+    )
+
+def write_output(dest_path, data):
+    os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+    with open(dest_path, 'wb') as file:
+        file.write(data)
+    if compress.active is not None:
+        compress.active.submit(dest_path, data)
+
+def build_listings(pages, metadata, source, destination, template_path, basepath, previous,
+                   page_size=10, site_url=""):
+    # previous maps each listing written last time to the digest of what it
+    # showed; unchanged listings are not rendered again. Returns the new map.
+    posts = find_posts(pages, metadata, source, destination)
+    outputs = set(pages.values())
+    template_hash = hash_bytes(load_template(template_path).source.encode())
+    settings = {"template": template_hash, "basepath": basepath, "minify": minify.active is not None}
+
+    planned = plan_listings(posts, destination, page_size) if posts else {}
+    current = {}
+    written = 0
+    template = None
+    for dest_path, listing in planned.items():
+        if dest_path in outputs:
+            print(f"warning: {dest_path} comes from content/, not generating a listing there")
+            continue
+        digest = hash_bytes(json.dumps([listing, settings], sort_keys=True).encode())
+        current[dest_path] = digest
+        if previous.get(dest_path) == digest and os.path.exists(dest_path):
+            continue
+        if template is None:
+            template = load_template(template_path)
+            if minify.active is not None:
+                template = template.minified()
+        node = apply_basepath(listing_node(listing), basepath)
+        write_output(dest_path, template.render({"Title": escape(listing["title"], quote=False), "Content": node}, basepath).encode())
+        written += 1
+
+    recent = sorted(posts, key=lambda post: post["updated"], reverse=True)[:FEED_SIZE]
+    # Atom ids and links must be absolute, so like the sitemap the feed needs
+    # the site's URL; an earlier feed is removed below when it's not given
+    if recent and site_url:
+        feed_path = os.path.join(destination, BLOG_DIR, FEED_NAME)
+        digest = hash_bytes(json.dumps([recent, basepath, site_url], sort_keys=True).encode())
+        current[feed_path] = digest
+        if previous.get(feed_path) != digest or not os.path.exists(feed_path):
+            write_output(feed_path, atom_feed(recent, basepath, site_url, recent[0]["updated"][:10]).encode())
+            written += 1
+
+    for dest_path in sorted(set(previous) - set(current)):
+        remove_output(dest_path, destination)
+    print(f"Listings: {len(posts)} posts, {written} of {len(current)} listing files written")
+    return current
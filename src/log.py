@@ -0,0 +1,6 @@
+# Per-file progress lines; --quiet turns them off while summaries still print
+QUIET = False
+
+def detail(message):
+    if not QUIET:
+        print(message)
@@ -1,51 +1,378 @@
 import os
 import sys
 import shutil
-from codefile import generate_page
+import argparse
+from assets import sync_assets
+from renderer import generate_page, build_renderer
+from template import load_template
+from frontmatter import collect_metadata
+from fragment_cache import FragmentCache, format_stats
+import log
+import links
+import images
+import compress
+import minify
+import highlight
+import listings
+import search
+import mapped
+import tree_cache
+import sitemap
+import profiler
+from parallel import PageBuildError
+from pipeline import render_pages as render_pipelined, DEFAULT_IO_THREADS, DEFAULT_QUEUE_SIZE
+from manifest import hash_file, load_manifest, save_manifest, plan_build, update_manifest, remove_output
 
-def traverse_and_process(source, destination, template_path, basepath):
+MANIFEST_PATH = os.path.join('.buildcache', 'manifest.json')
+FRAGMENT_CACHE_PATH = os.path.join('.buildcache', 'fragments.bin')
+PROFILE_PATH = os.path.join('.buildcache', 'profile.json')
+LINK_INDEX_PATH = os.path.join('.buildcache', 'links.json')
+IMAGE_CACHE_PATH = os.path.join('.buildcache', 'images')
+SEARCH_STORE_PATH = os.path.join('.buildcache', 'search')
+TREE_CACHE_PATH = os.path.join('.buildcache', 'trees')
+
+def page_destination(input_path, source, destination):
+    dirpath, filename = os.path.split(input_path)
+    rel_path = os.path.relpath(dirpath, source)
+    dest_dir = os.path.join(destination, rel_path)
+    return os.path.normpath(os.path.join(dest_dir, filename.replace('.md', '.html')))
+
+def find_pages(source, destination):
+    pages = {}
     for dirpath, _, filenames in os.walk(source):
         for filename in filenames:
             if filename.endswith(".md"):
                 input_path = os.path.join(dirpath, filename)
-                rel_path = os.path.relpath(dirpath, source)
-                dest_dir = os.path.join(destination, rel_path)
-                os.makedirs(dest_dir, exist_ok=True)
+                pages[input_path] = page_destination(input_path, source, destination)
+    return pages
+
+def render_pages(pages, template_path, basepath, jobs=1, cache=None, cache_path=None, pipeline=None):
+    # pipeline is (io_threads, queue_size) to overlap reads and writes with rendering
+    if pipeline is not None:
+        render_pipelined(pages, template_path, basepath, cache, *pipeline)
+        return
+    if jobs > 1 and len(pages) > 1:
+        from parallel import render_pages as render_parallel
+        render_parallel(pages, template_path, basepath, jobs, cache, cache_path)
+        return
+
+    renderer = build_renderer(template_path, basepath, cache)
+    for input_path, dest_path in pages:
+        generate_page(input_path, template_path, dest_path, basepath, renderer=renderer)
+
+def traverse_and_process(source, destination, template_path, basepath, manifest=None, jobs=1, cache=None, cache_path=None, pages=None,
+                         pipeline=None):
+    if pages is None:
+        pages = find_pages(source, destination)
+
+    if manifest is None:
+        render_pages(pages.items(), template_path, basepath, jobs, cache, cache_path, pipeline)
+        return pages
+
+    hashed = {input_path: (dest_path, hash_file(input_path)) for input_path, dest_path in pages.items()}
+    template_hash = hash_file(template_path)
+    stale, removed = plan_build(manifest, hashed, template_hash, basepath)
+
+    for dest_path in removed:
+        log.detail(f"Removing stale page: {dest_path}")
+        remove_output(dest_path, destination)
+    render_pages([(input_path, hashed[input_path][0]) for input_path in stale], template_path, basepath, jobs, cache, cache_path,
+                 pipeline)
+    print(f"Rendered {len(stale)} of {len(pages)} pages")
+
+    update_manifest(manifest, hashed, template_hash, basepath)
+    return pages
+
+def check_links(index, pages, assets, template_path, basepath, destination, generated=()):
+    # Pages rendered this run are already in the index; unchanged ones carry over from the last
+    index.retain(pages)
+    template_html = load_template(template_path).render({}, basepath)
+    index.record(template_path, None, links.fragment_references(template_html))
 
-                dest_path = os.path.join(dest_dir, filename.replace('.md', '.html'))
-                generate_page(input_path, template_path, dest_path, basepath)
+    site_files = [rel_path.replace(os.sep, "/") for rel_path in assets]
+    outputs = list(pages.values()) + list(generated)
+    site_files.extend(os.path.relpath(dest_path, destination).replace(os.sep, "/") for dest_path in outputs)
+    broken = index.broken(site_files)
+    if broken:
+        print(links.format_broken(broken))
+    else:
+        print(f"Checked {index.reference_count()} references: no broken links")
+    return broken
+
+def parse_widths(text):
+    try:
+        return sorted({int(width) for width in text.split(",")})
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected comma-separated pixel widths, got {text!r}")
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Build the static site from content/ into docs/")
+    parser.add_argument('basepath', nargs='?', default='/')
+    parser.add_argument('--incremental', action='store_true',
+                        help="only re-render pages whose source, the template or basepath changed")
+    parser.add_argument('--jobs', '-j', type=int, default=1, metavar='N',
+                        help="render pages on N worker processes (0 means one per CPU)")
+    parser.add_argument('--pipeline', action='store_true',
+                        help="overlap reading and writing pages with rendering, using threads joined by bounded queues")
+    parser.add_argument('--io-threads', type=int, default=DEFAULT_IO_THREADS, metavar='N',
+                        help="reader and writer threads each for --pipeline")
+    parser.add_argument('--queue-size', type=int, default=DEFAULT_QUEUE_SIZE, metavar='N',
+                        help="pages each --pipeline queue holds before the stage feeding it waits")
+    parser.add_argument('--mmap-threshold', type=float, default=0, metavar='MB',
+                        help="memory-map pages of at least MB and write them out block by block")
+    parser.add_argument('--fragment-cache', type=float, default=0, metavar='MB',
+                        help="reuse rendered HTML for repeated blocks, keeping at most MB of fragments")
+    parser.add_argument('--persist-fragment-cache', action='store_true',
+                        help=f"load and save the fragment cache in {FRAGMENT_CACHE_PATH}")
+    parser.add_argument('--tree-cache', type=float, default=0, metavar='MB',
+                        help=f"keep parsed pages in {TREE_CACHE_PATH} so a template or basepath change skips "
+                             "parsing, evicting the least recently used beyond MB")
+    parser.add_argument('--hardlink-assets', action='store_true',
+                        help="hardlink static files into docs/ instead of copying them")
+    parser.add_argument('--quiet', '-q', action='store_true',
+                        help="skip the per-file progress lines")
+    parser.add_argument('--profile', action='store_true',
+                        help="time every build stage per page and print a summary")
+    parser.add_argument('--profile-output', default=PROFILE_PATH, metavar='PATH',
+                        help="where --profile writes its JSON report")
+    parser.add_argument('--profile-top', type=int, default=10, metavar='N',
+                        help="how many of the slowest pages to report")
+    parser.add_argument('--drafts', action='store_true',
+                        help="also build pages whose frontmatter sets draft: true")
+    parser.add_argument('--no-listings', dest='listings', action='store_false',
+                        help="don't generate the blog index, tag pages and Atom feed")
+    parser.add_argument('--page-size', type=int, default=10, metavar='N',
+                        help="posts per blog index or tag page")
+    parser.add_argument('--site-url', default='', metavar='URL',
+                        help="scheme and host for absolute links, e.g. https://example.com; "
+                             "atom.xml and sitemap.xml are only written with it")
+    parser.add_argument('--search', action='store_true',
+                        help="write a sharded client-side search index to docs/search/")
+    parser.add_argument('--images', action='store_true',
+                        help="add sizes and lazy loading to images, and resized variants when Pillow is installed")
+    parser.add_argument('--image-widths', type=parse_widths, default=images.DEFAULT_WIDTHS, metavar='W,W,...',
+                        help="widths of the resized variants --images generates")
+    parser.add_argument('--minify', action='store_true',
+                        help="collapse whitespace in pages (outside pre and code) and minify stylesheets")
+    parser.add_argument('--highlight', action='store_true',
+                        help="colour code blocks by their fence's language tag (```python), using Pygments when "
+                             "installed for languages without a built-in lexer")
+    parser.add_argument('--precompress', action='store_true',
+                        help="write .gz (and .br with the brotli module) next to every page and text asset")
+    parser.add_argument('--link-index', default=LINK_INDEX_PATH, metavar='PATH',
+                        help="where to keep the JSON index of every link and image reference")
+    parser.add_argument('--strict-links', action='store_true',
+                        help="exit with an error when any internal reference is broken")
+    args = parser.parse_args(argv)
+    if args.pipeline and args.jobs != 1:
+        parser.error("--pipeline renders in this process; it can't be combined with --jobs")
+    if args.io_threads < 1 or args.queue_size < 1:
+        parser.error("--io-threads and --queue-size must be at least 1")
+    return args
 
-def main():
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if argv and argv[0] == 'serve':
+        from serve import main as serve_main
+        serve_main(argv[1:])
+        return
+
+    args = parse_args(argv)
+    jobs = args.jobs if args.jobs > 0 else (os.cpu_count() or 1)
+    log.QUIET = args.quiet
+    prof = profiler.enable() if args.profile else None
+    index = links.LinkIndex('docs', args.basepath)
     template_path = 'template.html'
-    
-    if len(sys.argv) > 1:
-        basepath = sys.argv[1]
+    basepath = args.basepath
+
+    manifest = load_manifest(MANIFEST_PATH)
+    if args.incremental and os.path.exists("docs"):
+        print("Updating existing docs folder...")
     else:
-        basepath = '/'
-    
-    if os.path.exists("docs"):
-        shutil.rmtree('docs')
-        print("Removing Existing docs folder...")
-        
-    os.makedirs('docs', exist_ok=True)
-    print('Creating new docs folder...')
-    copy_directory('static', 'docs')
-    traverse_and_process('content', 'docs', template_path, basepath)
-        
-
-def copy_directory(source, destination):
-    for item in os.listdir(source):
-        source_path = os.path.join(source, item)
-        dest_path = os.path.join(destination, item)
-        
-        if os.path.isfile(source_path):
-            print(f"Copying file: {source_path} to {dest_path}")
-            shutil.copy(source_path, dest_path)
+        if os.path.exists("docs"):
+            shutil.rmtree('docs')
+            print("Removing Existing docs folder...")
+        # Nothing on disk to reuse, so the old manifest is meaningless
+        manifest["pages"] = {}
+        manifest["assets"] = []
+        manifest["compressed"] = {}
+        manifest["listings"] = {}
+
+        os.makedirs('docs', exist_ok=True)
+        print('Creating new docs folder...')
+
+    if manifest["minify"] != args.minify:
+        # Every page changes, and stylesheets must be rewritten rather than
+        # judged current by their mtime
+        manifest["pages"] = {}
+        for rel_path in manifest["assets"]:
+            if minify.is_minifiable(rel_path):
+                remove_output(os.path.join('docs', rel_path), 'docs')
+        manifest["minify"] = args.minify
+    minify.active = minify.Minifier() if args.minify else None
+    highlight.active = highlight.Highlighter() if args.highlight else None
+    highlight_signature = highlight.active.signature() if highlight.active is not None else None
+    # Every code block with a language tag renders differently
+    if manifest["highlight"] != highlight_signature:
+        manifest["pages"] = {}
+    manifest["highlight"] = highlight_signature
+    mapped.threshold = int(args.mmap_threshold * 1024 * 1024) if args.mmap_threshold > 0 else None
+
+    if args.precompress:
+        compress.active = compress.Compressor(manifest["compressed"])
+    else:
+        # Siblings from an earlier --precompress build would now be served stale
+        for path in manifest["compressed"]:
+            for suffix in compress.COMPRESSED_SUFFIXES:
+                if os.path.exists(path + suffix):
+                    os.remove(path + suffix)
+        manifest["compressed"] = {}
+
+    with profiler.stage("static_copy"):
+        manifest["assets"] = sync_assets('static', 'docs', manifest["assets"], hardlink=args.hardlink_assets)
+
+    image_digest = None
+    if args.images:
+        with profiler.stage("images"):
+            stage = images.ImageStage('static', 'docs', IMAGE_CACHE_PATH, args.image_widths)
+            images.active = stage.run(manifest["assets"])
+        image_digest = images.images_digest(images.active)
+    image_info = images.active if args.images else None
+
+    # Unchanged pages are not re-rendered, so their references must come from
+    # the saved index; without one, render everything to rebuild it
+    if manifest["pages"] and not index.load(args.link_index):
+        manifest["pages"] = {}
+    links.active = index
+
+    if manifest["images"] != image_info:
+        if isinstance(manifest["images"], dict) and image_info is not None:
+            # Only the pages showing a changed image get different <img> tags
+            for source in index.referencing(images.changed_images(manifest["images"], image_info), "image"):
+                manifest["pages"].pop(source, None)
         else:
-            print(f"Creating directory: {dest_path}")
-            if not os.path.exists(dest_path):
-                os.mkdir(dest_path)
-            copy_directory(source_path, dest_path)
+            # Turning --images on or off changes every <img> tag
+            manifest["pages"] = {}
+    manifest["images"] = image_info
+
+    search.active = None
+    if args.search:
+        search.active = search.SearchIndexer('docs', SEARCH_STORE_PATH)
+        # Same as the link index: skipped pages need their stored records
+        if manifest["pages"] and not search.active.has_store():
+            manifest["pages"] = {}
+
+    sitemap.active = None
+    if args.site_url:
+        sitemap.active = sitemap.SitemapIndex('docs', manifest["sitemap"])
+        # Skipped pages need their stored entries too
+        if manifest["sitemap"] is None:
+            manifest["pages"] = {}
+
+    cache = None
+    cache_path = FRAGMENT_CACHE_PATH if args.persist_fragment_cache else None
+    if args.fragment_cache > 0:
+        # Everything the per-block transform depends on
+        namespace = [basepath]
+        if image_digest is not None:
+            namespace.append(image_digest)
+        if args.minify:
+            namespace.append("minify")
+        if highlight_signature is not None:
+            namespace.append(highlight_signature)
+        cache = FragmentCache(int(args.fragment_cache * 1024 * 1024), "\0".join(namespace))
+        if cache_path:
+            cache.load(cache_path)
+
+    tree_cache.active = None
+    if args.tree_cache > 0:
+        tree_cache.active = tree_cache.TreeCache(TREE_CACHE_PATH, int(args.tree_cache * 1024 * 1024))
+
+    with profiler.stage("metadata"):
+        pages = find_pages('content', 'docs')
+        try:
+            metadata = collect_metadata(pages, manifest["metadata"])
+        except ValueError as error:
+            sys.exit(str(error))
+    drafts = {input_path for input_path, meta in metadata.items() if meta["draft"]}
+    if drafts and not args.drafts:
+        # Dropped before any rendering; an incremental build removes their old output
+        pages = {input_path: dest_path for input_path, dest_path in pages.items() if input_path not in drafts}
+        print(f"Skipping {len(drafts)} draft page(s)")
+
+    try:
+        pipeline = (args.io_threads, args.queue_size) if args.pipeline else None
+        pages = traverse_and_process('content', 'docs', template_path, basepath, manifest, jobs, cache, cache_path, pages,
+                                     pipeline)
+    except PageBuildError as error:
+        sys.exit(str(error))
+    generated = []
+    if args.listings:
+        with profiler.stage("listings"):
+            manifest["listings"] = listings.build_listings(
+                pages, metadata, 'content', 'docs', template_path, basepath, manifest["listings"],
+                args.page_size, args.site_url)
+        generated = list(manifest["listings"])
+    else:
+        for dest_path in manifest["listings"]:
+            remove_output(dest_path, 'docs')
+        manifest["listings"] = {}
+
+    sitemap_path = os.path.join('docs', sitemap.SITEMAP_NAME)
+    if sitemap.active is not None:
+        with profiler.stage("sitemap"):
+            generated.append(sitemap.active.finish(pages, generated, basepath, args.site_url))
+        manifest["sitemap"] = sitemap.active.entries
+    else:
+        if os.path.exists(sitemap_path):
+            remove_output(sitemap_path, 'docs')
+        manifest["sitemap"] = None
+
+    if search.active is not None:
+        with profiler.stage("search"):
+            manifest["search"] = search.active.finish(pages)
+        generated.extend(manifest["search"])
+    else:
+        for path in manifest["search"]:
+            remove_output(path, 'docs')
+        manifest["search"] = []
+    if minify.active is not None:
+        print(minify.active.summary())
+    if highlight.active is not None:
+        print(highlight.active.summary())
+    if compress.active is not None:
+        with profiler.stage("compress"):
+            compress.active.wait()
+            # Pages an incremental build skipped never passed through the
+            # compressor; only those without siblings need reading back
+            for dest_path in pages.values():
+                if not compress.active.has_siblings(dest_path):
+                    compress.active.submit(dest_path)
+            compress.active.close()
+        compress.active.retain_existing()
+        manifest["compressed"] = compress.active.index
+        print(compress.active.summary())
+    save_manifest(manifest, MANIFEST_PATH)
+
+    with profiler.stage("link_check"):
+        broken = check_links(index, pages, manifest["assets"], template_path, basepath, 'docs', generated)
+    index.save(args.link_index)
+
+    if tree_cache.active is not None:
+        print(tree_cache.active.summary(tree_cache.active.prune()))
+
+    if cache is not None:
+        print(format_stats(cache.stats()))
+        if cache_path:
+            cache.save(cache_path)
+
+    if prof is not None:
+        print(prof.report(args.profile_top))
+        prof.write_json(args.profile_output, args.profile_top)
+        print(f"Profile written to {args.profile_output}")
+
+    if broken and args.strict_links:
+        sys.exit(1)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,100 @@
+import os
+import json
+import hashlib
+
+MANIFEST_VERSION = 1
+# Precompressed copies that live next to an output and go away with it
+COMPRESSED_SUFFIXES = (".gz", ".br")
+
+def hash_bytes(data):
+    return hashlib.sha256(data).hexdigest()
+
+def hash_file(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for chunk in iter(lambda: file.read(1 << 16), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def new_manifest():
+    return {"version": MANIFEST_VERSION, "template": None, "basepath": None, "pages": {}, "assets": [], "images": None, "compressed": {}, "minify": False,
+            "highlight": None, "metadata": {}, "listings": {}, "search": [], "sitemap": None}
+
+def load_manifest(path):
+    try:
+        with open(path) as file:
+            manifest = json.load(file)
+    except (OSError, ValueError):
+        return new_manifest()
+
+    # A manifest written by another version can't be trusted, start over
+    if not isinstance(manifest, dict) or manifest.get("version") != MANIFEST_VERSION:
+        return new_manifest()
+    manifest.setdefault("assets", [])
+    manifest.setdefault("images", None)
+    manifest.setdefault("compressed", {})
+    manifest.setdefault("minify", False)
+    manifest.setdefault("highlight", None)
+    manifest.setdefault("metadata", {})
+    manifest.setdefault("listings", {})
+    manifest.setdefault("search", [])
+    manifest.setdefault("sitemap", None)
+    return manifest
+
+def save_manifest(manifest, path):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as file:
+        json.dump(manifest, file, indent=1, sort_keys=True)
+    os.replace(tmp_path, path)
+
+def plan_build(manifest, pages, template_hash, basepath):
+    # pages maps source path -> (dest path, source hash)
+    # Returns the pages that need rendering and the outputs to delete
+    rebuild_all = manifest["template"] != template_hash or manifest["basepath"] != basepath
+    old_pages = manifest["pages"]
+
+    stale = []
+    for source, (dest, digest) in pages.items():
+        entry = old_pages.get(source)
+        if rebuild_all or entry is None or entry["hash"] != digest or entry["dest"] != dest:
+            stale.append(source)
+        elif not os.path.exists(dest):
+            stale.append(source)
+
+    # Anything we rendered last time that no source maps to anymore
+    current_dests = {dest for dest, _ in pages.values()}
+    removed = sorted({entry["dest"] for entry in old_pages.values()} - current_dests)
+
+    return stale, removed
+
+def update_manifest(manifest, pages, template_hash, basepath):
+    manifest["template"] = template_hash
+    manifest["basepath"] = basepath
+    manifest["pages"] = {
+        source: {"hash": digest, "dest": dest}
+        for source, (dest, digest) in pages.items()
+    }
+
+def page_url(dest_path, destination):
+    # Site-absolute URL of an output, with index.html left implicit
+    rel_path = os.path.relpath(dest_path, destination).replace(os.sep, "/")
+    if rel_path == "index.html":
+        return "/"
+    if rel_path.endswith("/index.html"):
+        return "/" + rel_path[:-len("index.html")]
+    return "/" + rel_path
+
+def remove_output(path, root):
+    for output in (path,) + tuple(path + suffix for suffix in COMPRESSED_SUFFIXES):
+        if os.path.exists(output):
+            os.remove(output)
+    # Clean up directories left empty, but never the output root itself
+    directory = os.path.dirname(path)
+    root = os.path.abspath(root)
+    while os.path.abspath(directory).startswith(root + os.sep):
+        try:
+            os.rmdir(directory)
+        except OSError:
+            break
+        directory = os.path.dirname(directory)
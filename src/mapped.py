@@ -0,0 +1,51 @@
+import os
+import mmap
+
+# Pages of at least this many bytes are memory-mapped and streamed block by
+# block (--mmap-threshold); None leaves every page on the normal path
+threshold = None
+
+def is_large(path):
+    return threshold is not None and os.path.getsize(path) >= threshold
+
+class MappedSource:
+    # A read-only mapping of a source file whose lines are decoded one at a
+    # time from slices of the map, so the file never exists as one str or as
+    # a list of lines
+    def __init__(self, path):
+        self.path = path
+        self._file = None
+        self._map = None
+        self._view = None
+
+    def __enter__(self):
+        self._file = open(self.path, 'rb')
+        if os.fstat(self._file.fileno()).st_size:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            self._view = memoryview(self._map)
+        return self
+
+    def __exit__(self, *exc_info):
+        if self._view is not None:
+            self._view.release()
+            self._map.close()
+        self._file.close()
+        self._view = self._map = None
+
+    def __len__(self):
+        return len(self._map) if self._map is not None else 0
+
+    def line_ranges(self):
+        # (start, end) byte offsets of each line, newline included
+        size = len(self)
+        start = 0
+        while start < size:
+            end = self._map.find(b"\n", start)
+            end = size if end < 0 else end + 1
+            yield start, end
+            start = end
+
+    def lines(self):
+        for start, end in self.line_ranges():
+            with self._view[start:end] as line:
+                yield str(line, "utf-8")
@@ -0,0 +1,117 @@
+import re
+import threading
+
+# Whitespace inside these is significant, or not HTML at all
+PRESERVED_TAGS = ("pre", "code", "textarea", "script", "style")
+PRESERVED_PATTERN = re.compile(r"<(pre|code|textarea|script|style)\b.*?</\1\s*>", re.S | re.I)
+HTML_COMMENT_PATTERN = re.compile(r"<!--(?!\[).*?-->", re.S)
+BETWEEN_TAGS_PATTERN = re.compile(r">\s*\n\s*<")
+WHITESPACE_PATTERN = re.compile(r"\s+")
+
+CSS_TOKEN_PATTERN = re.compile(r'"(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\'|/\*.*?\*/', re.S)
+CSS_PUNCTUATION_PATTERN = re.compile(r"\s*([{};,>])\s*")
+CSS_EXTENSIONS = (".css",)
+
+# The Minifier for the running build, if --minify is on
+active = None
+
+def collapse_html(text):
+    text = HTML_COMMENT_PATTERN.sub("", text)
+    # A line break between two tags is indentation, not content
+    text = BETWEEN_TAGS_PATTERN.sub("><", text)
+    return WHITESPACE_PATTERN.sub(" ", text)
+
+def collapse_between(text, after_tag, before_tag):
+    # A preserved region starts with < and ends with >; standing them in for
+    # it lets the indentation next to it collapse like any other
+    head = ">" if after_tag else ""
+    tail = "<" if before_tag else ""
+    collapsed = collapse_html(head + text + tail)
+    return collapsed[len(head):len(collapsed) - len(tail)]
+
+def minify_html(text):
+    out = []
+    pos = 0
+    for match in PRESERVED_PATTERN.finditer(text):
+        out.append(collapse_between(text[pos:match.start()], pos > 0, True))
+        out.append(match.group())
+        pos = match.end()
+    out.append(collapse_between(text[pos:], pos > 0, False))
+    return "".join(out).strip()
+
+def minify_css_code(code):
+    code = WHITESPACE_PATTERN.sub(" ", code)
+    code = CSS_PUNCTUATION_PATTERN.sub(r"\1", code)
+    # Only after a colon: a space before one can be a descendant selector
+    return code.replace(": ", ":").replace(";}", "}")
+
+def minify_css(text):
+    # Strings are copied as they are and comments dropped, except /*! notices */
+    out = []
+    pos = 0
+    for match in CSS_TOKEN_PATTERN.finditer(text):
+        out.append(minify_css_code(text[pos:match.start()]))
+        token = match.group()
+        if not token.startswith("/*") or token.startswith("/*!"):
+            out.append(token)
+        pos = match.end()
+    out.append(minify_css_code(text[pos:]))
+    return "".join(out).replace(";}", "}").strip()
+
+def is_minifiable(path):
+    return path.lower().endswith(CSS_EXTENSIONS)
+
+class Minifier:
+    def __init__(self):
+        self.counts = {"html_saved": 0, "pages": 0, "css_before": 0, "css_after": 0, "css_files": 0}
+        self._lock = threading.Lock()
+
+    def minify_node(self, node):
+        # Collapses whitespace in text nodes outside of <pre> and <code>
+        saved = 0
+        stack = [node]
+        while stack:
+            item = stack.pop()
+            if item.tag in PRESERVED_TAGS:
+                continue
+            if item.value:
+                value = WHITESPACE_PATTERN.sub(" ", item.value)
+                saved += len(item.value) - len(value)
+                item.value = value
+            if item.children:
+                stack.extend(item.children)
+        with self._lock:
+            self.counts["html_saved"] += saved
+        return node
+
+    def add_page(self, saved):
+        with self._lock:
+            self.counts["html_saved"] += saved
+            self.counts["pages"] += 1
+
+    def minify_css(self, data):
+        minified = minify_css(data.decode()).encode()
+        with self._lock:
+            self.counts["css_before"] += len(data)
+            self.counts["css_after"] += len(minified)
+            self.counts["css_files"] += 1
+        return minified
+
+    def drain(self):
+        with self._lock:
+            counts = dict(self.counts)
+            for key in self.counts:
+                self.counts[key] = 0
+        return counts
+
+    def merge(self, counts):
+        with self._lock:
+            for key, value in counts.items():
+                self.counts[key] += value
+
+    def summary(self):
+        counts = self.counts
+        css_saved = counts["css_before"] - counts["css_after"]
+        css_ratio = css_saved / counts["css_before"] if counts["css_before"] else 0.0
+        return (f"Minified {counts['pages']} pages ({counts['html_saved']} bytes saved) and "
+                f"{counts['css_files']} stylesheets ({css_saved} bytes saved, {css_ratio:.0%})")
@@ -0,0 +1,150 @@
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from renderer import generate_page, build_renderer
+from template import load_template
+from fragment_cache import FragmentCache
+import log
+import links
+import images
+import compress
+import minify
+import highlight
+import search
+import sitemap
+import mapped
+import tree_cache
+import profiler
+
+# Set once per worker process by init_worker so every page reuses it
+_worker_state = {}
+
+class PageBuildError(Exception):
+    def __init__(self, failures):
+        self.failures = failures
+        lines = [f"{path}: {error}" for path, error in failures]
+        super().__init__(f"{len(failures)} page(s) failed to render:\n" + "\n".join(lines))
+
+def init_worker(settings):
+    _worker_state.update(settings)
+    log.QUIET = settings["quiet"]
+    if settings["profile"]:
+        profiler.enable()
+    images.active = settings["images"]
+    mapped.threshold = settings["mmap_threshold"]
+    # Before the tree cache, whose signature depends on it
+    highlight.active = highlight.Highlighter() if settings["highlight"] else None
+    tree_cache.active = tree_cache.TreeCache(*settings["trees"]) if settings["trees"] is not None else None
+    search.active = search.SearchIndexer(settings["search"]) if settings["search"] is not None else None
+    sitemap.active = sitemap.SitemapIndex(settings["sitemap"]) if settings["sitemap"] is not None else None
+    minify.active = minify.Minifier() if settings["minify"] else None
+    compress.active = None
+    if settings["compress"] is not None:
+        compress.active = compress.Compressor(settings["compress"], compress.default_threads(settings["jobs"]))
+    # A forked worker inherits the parent's index; start from an empty one
+    links.active = links.LinkIndex(*settings["links"]) if settings["links"] else None
+    cache = None
+    if settings["cache_bytes"]:
+        cache = FragmentCache(settings["cache_bytes"], settings["cache_namespace"])
+        if settings["cache_path"]:
+            cache.load(settings["cache_path"])
+        cache.track_new = True
+    _worker_state["cache"] = cache
+    # After the module settings above, which it captures
+    _worker_state["renderer"] = build_renderer(load_template(settings["template_path"]), settings["basepath"], cache)
+
+def render_batch(batch):
+    failures = []
+    cache = _worker_state["cache"]
+    for input_path, dest_path in batch:
+        try:
+            generate_page(input_path, _worker_state["template_path"], dest_path,
+                          _worker_state["basepath"], renderer=_worker_state["renderer"])
+        except Exception as error:
+            failures.append((input_path, f"{type(error).__name__}: {error}"))
+
+    result = {"failures": failures}
+    if cache is not None:
+        result["cache"] = cache.drain()
+    if profiler.active is not None:
+        result["profile"] = profiler.active.pages
+        profiler.active.pages = {}
+    if search.active is not None:
+        result["search"] = search.active.drain()
+    if sitemap.active is not None:
+        result["sitemap"] = sitemap.active.drain()
+    if minify.active is not None:
+        result["minify"] = minify.active.drain()
+    if compress.active is not None:
+        result["compress"] = compress.active.drain()
+    if highlight.active is not None:
+        result["highlight"] = highlight.active.drain()
+    if tree_cache.active is not None:
+        result["trees"] = tree_cache.active.drain()
+    if links.active is not None:
+        result["links"] = links.active.pages
+        links.active.pages = {}
+    return result
+
+def make_batches(pages, jobs):
+    # A few batches per worker keeps the pool busy without paying IPC per page
+    size = max(1, -(-len(pages) // (jobs * 4)))
+    return [pages[i:i + size] for i in range(0, len(pages), size)]
+
+def render_pages(pages, template_path, basepath, jobs, cache=None, cache_path=None):
+    pages = list(pages)
+    if not pages:
+        return
+
+    failures = []
+    batches = make_batches(pages, jobs)
+    settings = {
+        "template_path": template_path,
+        "basepath": basepath,
+        "cache_bytes": cache.max_bytes if cache is not None else 0,
+        "cache_namespace": cache.namespace if cache is not None else None,
+        "cache_path": cache_path,
+        "quiet": log.QUIET,
+        "profile": profiler.active is not None,
+        "images": images.active,
+        "mmap_threshold": mapped.threshold,
+        "trees": (tree_cache.active.directory, tree_cache.active.max_bytes) if tree_cache.active is not None else None,
+        "minify": minify.active is not None,
+        "highlight": highlight.active is not None,
+        "search": search.active.destination if search.active is not None else None,
+        "sitemap": sitemap.active.destination if sitemap.active is not None else None,
+        "compress": compress.active.index if compress.active is not None else None,
+        "jobs": jobs,
+        "links": (links.active.destination, links.active.basepath) if links.active is not None else None,
+    }
+    with ProcessPoolExecutor(max_workers=jobs, initializer=init_worker, initargs=(settings,)) as executor:
+        futures = {executor.submit(render_batch, batch): batch for batch in batches}
+        for future in as_completed(futures):
+            try:
+                result = future.result()
+                failures.extend(result["failures"])
+                if "cache" in result:
+                    cache.merge(*result["cache"])
+                if "profile" in result:
+                    profiler.active.merge(result["profile"])
+                if "search" in result:
+                    search.active.write_lines(result["search"])
+                if "sitemap" in result:
+                    sitemap.active.merge(result["sitemap"])
+                if "minify" in result:
+                    minify.active.merge(result["minify"])
+                if "compress" in result:
+                    compress.active.merge(*result["compress"])
+                if "highlight" in result:
+                    highlight.active.merge(result["highlight"])
+                if "trees" in result:
+                    tree_cache.active.merge(result["trees"])
+                if "links" in result:
+                    links.active.merge(result["links"])
+            except BrokenProcessPool as error:
+                # A worker died outright; blame its whole batch instead of hanging
+                failures.extend((input_path, f"worker crashed: {error}") for input_path, _ in futures[future])
+            except Exception as error:
+                failures.extend((input_path, repr(error)) for input_path, _ in futures[future])
+
+    if failures:
+        raise PageBuildError(sorted(failures))
@@ -0,0 +1,129 @@
+import os
+import time
+import queue
+import threading
+from renderer import build_renderer, build_page, generate_mapped
+from parallel import PageBuildError
+import log
+import mapped
+import compress
+import profiler
+
+DEFAULT_IO_THREADS = 4
+DEFAULT_QUEUE_SIZE = 16
+
+# Marks the end of a queue's input; each consumer thread gets one
+_DONE = None
+
+def _feed(pages, read_queue, io_threads):
+    for page in pages:
+        read_queue.put(page)
+    for _ in range(io_threads):
+        read_queue.put(_DONE)
+
+def _read(read_queue, render_queue, streamable):
+    while True:
+        page = read_queue.get()
+        if page is _DONE:
+            return
+        input_path, dest_path = page
+        start = time.perf_counter()
+        try:
+            if streamable and mapped.is_large(input_path):
+                # The render thread streams it from a mapping instead
+                render_queue.put((input_path, dest_path, None, None, 0.0))
+                continue
+            with open(input_path, 'rb') as file:
+                data = file.read()
+        except Exception as error:
+            render_queue.put((input_path, dest_path, None, error, 0.0))
+            continue
+        render_queue.put((input_path, dest_path, data, None, time.perf_counter() - start))
+
+def _write(write_queue, results):
+    compressor = compress.active
+    while True:
+        item = write_queue.get()
+        if item is _DONE:
+            return
+        input_path, dest_path, data = item
+        start = time.perf_counter()
+        try:
+            os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+            with open(dest_path, 'wb') as outfile:
+                outfile.write(data)
+            if compressor is not None:
+                compressor.submit(dest_path, data)
+        except Exception as error:
+            results.append((input_path, None, f"{type(error).__name__}: {error}"))
+            continue
+        results.append((input_path, time.perf_counter() - start, None))
+
+def render_pages(pages, template_path, basepath, cache=None, io_threads=DEFAULT_IO_THREADS,
+                 queue_size=DEFAULT_QUEUE_SIZE):
+    # Reading page N+1 and writing page N-1 overlap with rendering page N.
+    # A feeder thread hands pages to io_threads readers, this thread renders
+    # (parsing holds the GIL, so more renderers wouldn't help), and
+    # io_threads writers put the bytes on disk. Every queue holds at most
+    # queue_size pages, so a slow disk or a huge tree stalls the stage ahead of
+    # it instead of filling memory.
+    pages = list(pages)
+    if not pages:
+        return
+
+    read_queue = queue.Queue(queue_size)
+    render_queue = queue.Queue(queue_size)
+    write_queue = queue.Queue(queue_size)
+    # (input path, write seconds or None, error); list.append is atomic
+    written = []
+    renderer = build_renderer(template_path, basepath, cache)
+    threads = [threading.Thread(target=_feed, args=(pages, read_queue, io_threads), daemon=True)]
+    threads.extend(threading.Thread(target=_read, args=(read_queue, render_queue, renderer.streamable), daemon=True)
+                   for _ in range(io_threads))
+    writers = [threading.Thread(target=_write, args=(write_queue, written), daemon=True)
+               for _ in range(io_threads)]
+    for thread in threads + writers:
+        thread.start()
+
+    prof = profiler.active
+    failures = []
+    try:
+        for _ in range(len(pages)):
+            input_path, dest_path, data, error, read_seconds = render_queue.get()
+            if error is not None:
+                failures.append((input_path, f"{type(error).__name__}: {error}"))
+                continue
+            log.detail(f"Generating page from {input_path} to {dest_path} using {template_path}")
+            if prof is not None:
+                prof.start_page(input_path)
+                prof.add("read", read_seconds)
+            try:
+                if data is None:
+                    generate_mapped(renderer, input_path, dest_path)
+                    continue
+                page_variables = build_page(renderer, input_path, dest_path, data)
+                if prof is not None:
+                    with profiler.stage("to_html"):
+                        page_variables["Content"] = page_variables["Content"].to_html()
+                with profiler.stage("template"):
+                    page = renderer.template.render(page_variables, basepath).encode()
+            except Exception as error:
+                failures.append((input_path, f"{type(error).__name__}: {error}"))
+                continue
+            finally:
+                if prof is not None:
+                    prof.end_page()
+            write_queue.put((input_path, dest_path, page))
+    finally:
+        for _ in writers:
+            write_queue.put(_DONE)
+        for thread in writers:
+            thread.join()
+
+    for input_path, seconds, error in written:
+        if error is not None:
+            failures.append((input_path, error))
+        elif prof is not None:
+            prof.merge({input_path: {"write": seconds}})
+    if failures:
+        raise PageBuildError(sorted(failures))
@@ -0,0 +1,98 @@
+import os
+import json
+import time
+from contextlib import nullcontext
+
+# Block classification happens while scanning, so it is counted under "blocks"
+PAGE_STAGES = ("read", "blocks", "inline", "to_html", "template", "write")
+
+# The profiler for this process, or None when --profile is off
+active = None
+_disabled = nullcontext()
+
+class StageTimer:
+    __slots__ = ("profiler", "name", "start")
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc_info):
+        self.profiler.add(self.name, time.perf_counter() - self.start)
+
+class BuildProfiler:
+    def __init__(self):
+        self.pages = {}
+        self.build_stages = {}
+        self._current = None
+
+    def start_page(self, path):
+        self._current = self.pages.setdefault(path, {})
+
+    def end_page(self):
+        self._current = None
+
+    def add(self, name, seconds):
+        # Outside a page the time belongs to the build, e.g. the static copy
+        target = self.build_stages if self._current is None else self._current
+        target[name] = target.get(name, 0.0) + seconds
+
+    def merge(self, pages):
+        for path, stages in pages.items():
+            target = self.pages.setdefault(path, {})
+            for name, seconds in stages.items():
+                target[name] = target.get(name, 0.0) + seconds
+
+    def stage_totals(self):
+        totals = {name: 0.0 for name in PAGE_STAGES}
+        for stages in self.pages.values():
+            for name, seconds in stages.items():
+                totals[name] = totals.get(name, 0.0) + seconds
+        return totals
+
+    def slowest_pages(self, count):
+        ranked = sorted(self.pages.items(), key=lambda item: sum(item[1].values()), reverse=True)
+        return [(path, sum(stages.values()), stages) for path, stages in ranked[:count]]
+
+    def report(self, top=10):
+        totals = self.stage_totals()
+        page_count = max(len(self.pages), 1)
+        grand_total = sum(totals.values()) + sum(self.build_stages.values()) or 1.0
+
+        lines = [f"{'stage':<14}{'total s':>10}{'ms/page':>10}{'share':>8}"]
+        for name, seconds in totals.items():
+            lines.append(f"{name:<14}{seconds:>10.3f}{seconds * 1000 / page_count:>10.3f}{seconds / grand_total:>8.1%}")
+        for name, seconds in self.build_stages.items():
+            lines.append(f"{name:<14}{seconds:>10.3f}{'':>10}{seconds / grand_total:>8.1%}")
+
+        lines.append(f"\n{min(top, len(self.pages))} slowest of {len(self.pages)} pages:")
+        for path, seconds, _ in self.slowest_pages(top):
+            lines.append(f"{seconds * 1000:>10.3f} ms  {path}")
+        return "\n".join(lines)
+
+    def to_json(self, top=10):
+        return {
+            "stages": self.stage_totals(),
+            "build_stages": self.build_stages,
+            "slowest": [{"page": path, "seconds": seconds, "stages": stages}
+                        for path, seconds, stages in self.slowest_pages(top)],
+            "pages": self.pages,
+        }
+
+    def write_json(self, path, top=10):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(path, 'w') as file:
+            json.dump(self.to_json(top), file, indent=1, sort_keys=True)
+
+def enable():
+    global active
+    active = BuildProfiler()
+    return active
+
+def stage(name):
+    if active is None:
+        return _disabled
+    return StageTimer(active, name)
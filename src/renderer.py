@@ -0,0 +1,249 @@
+import io
+import os
+from htmlnode import ParentNode, apply_basepath
+from blocktype import markdown_to_html_node, render_blocks, scan_blocks, render, finish_block
+from template import Template, load_template
+from frontmatter import split_frontmatter, read_metadata
+from mapped import MappedSource
+import log
+import mapped
+import links
+import images
+import compress
+import minify
+import search
+import sitemap
+import tree_cache
+import profiler
+
+class TitleScanner:
+    # Passes lines through untouched and remembers the first "# " line, so the
+    # title comes out of the same read that feeds the block scanner
+    def __init__(self, lines):
+        self.lines = lines
+        self.title = None
+
+    def __iter__(self):
+        for line in self.lines:
+            if self.title is None:
+                result = line.strip()
+                if result.startswith("# "):
+                    self.title = result[2:]
+            yield line
+
+class StreamedContent:
+    # Stands in for a page's content node: blocks are rendered while the
+    # template writes them, so only one block's nodes exist at a time
+    def __init__(self, nodes):
+        self.nodes = nodes
+
+    def iter_html(self):
+        yield "<div>"
+        for node in self.nodes:
+            yield from node.iter_html()
+        yield "</div>"
+
+class Renderer:
+    # Everything that stays the same from page to page: the compiled template,
+    # basepath, fragment cache and output settings. Nothing on it changes after
+    # __init__ (the cache and minifier lock their own state), so one Renderer
+    # can be shared by any number of threads.
+    def __init__(self, template, basepath="/", cache=None, minifier=None, image_info=None, trees=None):
+        # template is a Template or a path to one; minifier is a minify.Minifier
+        # or True for a private one, image_info comes from ImageStage.run and
+        # trees is a tree_cache.TreeCache
+        if not isinstance(template, Template):
+            template = load_template(template)
+        if minifier is True:
+            minifier = minify.Minifier()
+        self.basepath = basepath
+        self.cache = cache
+        self.minifier = minifier
+        self.image_info = image_info
+        self.trees = trees
+        self.template = template.minified() if minifier is not None else template
+        self.template_saved = len(template.source) - len(self.template.source)
+        # Streamed content can only be written once, so a template that shows
+        # it twice gets every page rendered whole
+        self.streamable = self.template.segments[1::2].count("Content") <= 1
+        # Fill the template's lazy per-basepath cache now, not under concurrent renders
+        self.template.literals(basepath)
+
+    def transform(self, node):
+        if self.image_info is not None:
+            images.annotate_images(node, self.image_info, self.basepath)
+        apply_basepath(node, self.basepath)
+        if self.minifier is not None:
+            self.minifier.minify_node(node)
+
+    def parse(self, lines, references=None, text=None):
+        # lines is any iterable of lines, or a page's raw bytes, which the tree
+        # cache can look up; returns (metadata, title, content node)
+        if isinstance(lines, bytes):
+            if self.trees is not None:
+                return self.parse_cached(lines, references, text)
+            lines = io.TextIOWrapper(io.BytesIO(lines))
+        meta, body = split_frontmatter(lines)
+        scanner = TitleScanner(body)
+        content_node = markdown_to_html_node(scanner, self.cache, self.transform, references, text)
+        # A frontmatter title wins over the first heading
+        title = meta["title"] or scanner.title
+        if title is None:
+            raise Exception ("No title found")
+        return meta, title, content_node
+
+    def parse_cached(self, data, references=None, text=None):
+        # Only a source never seen before is parsed; the transform always runs,
+        # since basepath, images and minify are not part of the saved tree.
+        # The fragment cache is skipped: its blocks are already transformed.
+        entry = self.trees.get(data)
+        if entry is None:
+            meta, body = split_frontmatter(io.TextIOWrapper(io.BytesIO(data)))
+            scanner = TitleScanner(body)
+            blocks = scan_blocks(scanner)
+            if profiler.active is not None:
+                with profiler.stage("blocks"):
+                    blocks = list(blocks)
+            nodes = [render(block) for block in blocks]
+            self.trees.put(data, meta, scanner.title, nodes)
+            entry = (meta, scanner.title, nodes)
+        meta, title, nodes = entry
+        title = meta["title"] or title
+        if title is None:
+            raise Exception ("No title found")
+        children = [finish_block(node, self.transform, references, text) for node in nodes]
+        return meta, title, ParentNode("div", children)
+
+    def parse_streamed(self, lines, title, references=None, text=None):
+        # Like parse, but nothing is rendered until the content is written.
+        # The template may need the title first, so it is passed in, usually
+        # from read_metadata; a frontmatter title still wins.
+        meta, body = split_frontmatter(lines)
+        title = meta["title"] or title
+        if title is None:
+            raise Exception ("No title found")
+        content = StreamedContent(render_blocks(scan_blocks(body), self.cache, self.transform, references, text))
+        return meta, title, content
+
+    def page_variables(self, meta, title, content_node, variables=None):
+        if self.minifier is not None:
+            self.minifier.add_page(self.template_saved)
+        page_variables = {"Title": title, "Content": content_node}
+        if meta["date"] is not None:
+            page_variables["Date"] = meta["date"]
+        if meta["tags"]:
+            page_variables["Tags"] = ", ".join(meta["tags"])
+        if variables:
+            page_variables.update(variables)
+        return page_variables
+
+    def render_string(self, markdown, variables=None):
+        meta, title, content_node = self.parse(io.StringIO(markdown))
+        return self.template.render(self.page_variables(meta, title, content_node, variables), self.basepath)
+
+    def render_file(self, from_path, dest_path, variables=None):
+        with open(from_path) as file:
+            meta, title, content_node = self.parse(file)
+        os.makedirs(os.path.dirname(dest_path) or ".", exist_ok=True)
+        with open(dest_path, 'w') as outfile:
+            self.template.write(outfile, self.page_variables(meta, title, content_node, variables), self.basepath)
+
+def build_renderer(template, basepath, cache=None):
+    # A Renderer with this process's minify and image settings
+    return Renderer(template, basepath, cache, minify.active, images.active, tree_cache.active)
+
+def build_page(renderer, from_path, dest_path, lines, variables=None):
+    # Parses the lines read from from_path, records the page with the active
+    # link, search and sitemap indexes and returns the template variables
+    references = [] if links.active is not None else None
+    text = [] if search.active is not None else None
+    meta, title, content_node = renderer.parse(lines, references, text)
+    if sitemap.active is not None:
+        sitemap.active.record(from_path, dest_path, meta)
+    if references is not None:
+        links.active.record(from_path, dest_path, references)
+    if text is not None:
+        search.active.record(from_path, dest_path, title, " ".join(text))
+    return renderer.page_variables(meta, title, content_node, variables)
+
+def generate_mapped(renderer, from_path, dest_path, variables=None):
+    # For pages over mapped.threshold: the source is memory-mapped and each
+    # block is written as soon as it is rendered, so memory follows the
+    # largest block rather than the size of the page
+    references = [] if links.active is not None else None
+    text = [] if search.active is not None else None
+    title = read_metadata(from_path)["title"]
+    os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+    with MappedSource(from_path) as source:
+        meta, title, content = renderer.parse_streamed(source.lines(), title, references, text)
+        if sitemap.active is not None:
+            sitemap.active.record(from_path, dest_path, meta)
+        with open(dest_path, 'w') as outfile:
+            renderer.template.write(outfile, renderer.page_variables(meta, title, content, variables), renderer.basepath)
+    if references is not None:
+        links.active.record(from_path, dest_path, references)
+    if text is not None:
+        search.active.record(from_path, dest_path, title, " ".join(text))
+    if compress.active is not None:
+        compress.active.submit(dest_path)
+
+def generate_page(from_path, template_path, dest_path, basepath, template=None, variables=None, cache=None,
+                  renderer=None):
+    # The build's version of Renderer.render_file: it also feeds whichever of
+    # the link index, search index, compressor and profiler are active. Builds
+    # pass one renderer from build_renderer for all their pages; without it a
+    # Renderer is made for just this page from the other arguments.
+    log.detail(f"Generating page from {from_path} to {dest_path} using {template_path}")
+    prof = profiler.active
+    if prof is not None:
+        prof.start_page(from_path)
+
+    if renderer is None:
+        renderer = build_renderer(template if template is not None else template_path, basepath, cache)
+    basepath = renderer.basepath
+    if renderer.streamable and mapped.is_large(from_path):
+        generate_mapped(renderer, from_path, dest_path, variables)
+        if prof is not None:
+            prof.end_page()
+        return
+    if renderer.trees is not None:
+        # Saved trees are keyed on the source's bytes
+        with profiler.stage("read"):
+            with open(from_path, 'rb') as file:
+                data = file.read()
+        page_variables = build_page(renderer, from_path, dest_path, data, variables)
+    else:
+        with open(from_path) as file:
+            if prof is None:
+                lines = file
+            else:
+                # Read up front so reading and parsing are timed apart
+                with profiler.stage("read"):
+                    lines = file.readlines()
+            page_variables = build_page(renderer, from_path, dest_path, lines, variables)
+    content_node = page_variables["Content"]
+    template = renderer.template
+
+    os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+    compressor = compress.active
+    if prof is None:
+        with open(dest_path, 'w') as outfile:
+            template.write(outfile, page_variables, basepath)
+        if compressor is not None:
+            # Read back on a compressor thread rather than rendered to one string here
+            compressor.submit(dest_path)
+        return
+
+    # Profiling splits serialization, template fill and the write into separate
+    # steps so each can be timed; normal builds stream all three at once
+    with profiler.stage("to_html"):
+        page_variables["Content"] = content_node.to_html()
+    with profiler.stage("template"):
+        page = template.render(page_variables, basepath)
+    with profiler.stage("write"):
+        data = page.encode()
+        with open(dest_path, 'wb') as outfile:
+            outfile.write(data)
+    if compressor is not None:
+        compressor.submit(dest_path, data)
+    prof.end_page()
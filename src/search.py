@@ -0,0 +1,191 @@
+import os
+import re
+import json
+import string
+import threading
+from collections import Counter
+from manifest import page_url, remove_output
+import compress
+
+SEARCH_DIR = "search"
+SEARCH_INDEX_VERSION = 1
+TOKEN_PATTERN = re.compile(r"\w+")
+# Only real tags: page text can hold a bare "<" that was never escaped
+TAG_PATTERN = re.compile(r"</?[A-Za-z!][^>]*>")
+STOPWORDS = frozenset(
+    "a an and are as at be but by for from has have he her his i in is it its of on or she "
+    "that the their they this to was were will with you".split()
+)
+TITLE_WEIGHT = 5
+SHARD_KEYS = string.ascii_lowercase + string.digits
+
+# The SearchIndexer for the running build, if --search is on
+active = None
+
+def tokenize(text):
+    return [term for term in TOKEN_PATTERN.findall(text.lower()) if len(term) > 1 and term not in STOPWORDS]
+
+def term_counts(title, text):
+    counts = Counter(tokenize(text))
+    for term in tokenize(title):
+        counts[term] += TITLE_WEIGHT
+    return counts
+
+def shard_key(term):
+    # Browsers fetch the one shard for a query term's first character
+    return term[0] if term[0] in SHARD_KEYS else "_"
+
+def node_text(node):
+    # The text of every leaf, which is the block's TextNode stream after rendering
+    parts = []
+    stack = [node]
+    while stack:
+        item = stack.pop()
+        if item.children:
+            stack.extend(reversed(item.children))
+        elif item.value:
+            parts.append(item.value)
+    return " ".join(parts)
+
+def fragment_text(html):
+    # Cache hits only have markup; dropping the tags leaves the same text
+    return TAG_PATTERN.sub(" ", html)
+
+def write_if_changed(path, data):
+    # Unchanged shards keep their mtime, so they stay cached everywhere downstream
+    compressor = compress.active
+    try:
+        with open(path, 'rb') as file:
+            if file.read() == data:
+                if compressor is not None and not compressor.has_siblings(path):
+                    compressor.submit(path, data)
+                return False
+    except FileNotFoundError:
+        pass
+    with open(path, 'wb') as file:
+        file.write(data)
+    if compressor is not None:
+        compressor.submit(path, data)
+    return True
+
+class SearchIndexer:
+    def __init__(self, destination, store_dir=None):
+        # Without a store_dir (pool workers) records are buffered for drain()
+        self.destination = destination
+        self.store_dir = store_dir
+        self.rendered = set()
+        self._buffer = []
+        self._spool = None
+        self._lock = threading.Lock()
+        if store_dir is not None:
+            self.store_path = os.path.join(store_dir, "pages.jsonl")
+            self.spool_path = os.path.join(store_dir, "spool.jsonl")
+
+    def has_store(self):
+        return os.path.exists(self.store_path)
+
+    def record(self, source, dest_path, title, text):
+        line = json.dumps({"source": source, "url": page_url(dest_path, self.destination), "title": title,
+                           "terms": term_counts(title, text)}, sort_keys=True)
+        self.write_lines([(source, line)])
+
+    def write_lines(self, lines):
+        with self._lock:
+            if self.store_dir is None:
+                self._buffer.extend(lines)
+                return
+            if self._spool is None:
+                os.makedirs(self.store_dir, exist_ok=True)
+                self._spool = open(self.spool_path, 'w')
+            for source, line in lines:
+                self._spool.write(line + "\n")
+                self.rendered.add(source)
+
+    def drain(self):
+        with self._lock:
+            lines, self._buffer = self._buffer, []
+        return lines
+
+    def merge_store(self, sources):
+        # This run's records, then last run's for pages that weren't re-rendered
+        # and still exist; both are streamed line by line
+        if self._spool is not None:
+            self._spool.close()
+            self._spool = None
+        sources = set(sources)
+        tmp_path = self.store_path + '.tmp'
+        os.makedirs(self.store_dir, exist_ok=True)
+        with open(tmp_path, 'w') as out:
+            if os.path.exists(self.spool_path):
+                with open(self.spool_path) as spool:
+                    for line in spool:
+                        if json.loads(line)["source"] in sources:
+                            out.write(line)
+                os.remove(self.spool_path)
+            if os.path.exists(self.store_path):
+                with open(self.store_path) as store:
+                    for line in store:
+                        source = json.loads(line)["source"]
+                        if source in sources and source not in self.rendered:
+                            out.write(line)
+        os.replace(tmp_path, self.store_path)
+
+    def finish(self, sources):
+        # Writes docs/search/: index.json names the shards, pages.json maps page
+        # ids to [url, title], and <key>.json holds term -> [id, count, id, count, ...]
+        # for terms starting with key. Returns the files written.
+        self.merge_store(sources)
+        out_dir = os.path.join(self.destination, SEARCH_DIR)
+        os.makedirs(out_dir, exist_ok=True)
+        ids = {source: i for i, source in enumerate(sorted(sources))}
+        pages = [None] * len(ids)
+
+        # Postings are partitioned by shard on disk, so only one shard is ever
+        # held in memory while it is inverted
+        spill_paths = {}
+        spills = {}
+        try:
+            with open(self.store_path) as store:
+                for line in store:
+                    record = json.loads(line)
+                    page_id = ids[record["source"]]
+                    pages[page_id] = [record["url"], record["title"]]
+                    for term, count in record["terms"].items():
+                        key = shard_key(term)
+                        if key not in spills:
+                            spill_paths[key] = os.path.join(self.store_dir, f"shard-{key}.tsv")
+                            spills[key] = open(spill_paths[key], 'w')
+                        spills[key].write(f"{term}\t{page_id}\t{count}\n")
+        finally:
+            for spill in spills.values():
+                spill.close()
+
+        shards = {}
+        written = []
+        for key in sorted(spill_paths):
+            pairs = {}
+            with open(spill_paths[key]) as spill:
+                for line in spill:
+                    term, page_id, count = line.rstrip("\n").split("\t")
+                    pairs.setdefault(term, []).append((int(page_id), int(count)))
+            os.remove(spill_paths[key])
+            # Sorted by page id so a shard only changes when its terms do
+            postings = {term: [value for pair in sorted(found) for value in pair] for term, found in pairs.items()}
+            name = f"{key}.json"
+            shards[key] = name
+            written.append(os.path.join(out_dir, name))
+            write_if_changed(written[-1], json.dumps(postings, sort_keys=True, separators=(",", ":")).encode())
+
+        pages_path = os.path.join(out_dir, "pages.json")
+        write_if_changed(pages_path, json.dumps(pages, separators=(",", ":")).encode())
+        index_path = os.path.join(out_dir, "index.json")
+        index = {"version": SEARCH_INDEX_VERSION, "pages": "pages.json", "shards": shards, "other": "_"}
+        write_if_changed(index_path, json.dumps(index, sort_keys=True, separators=(",", ":")).encode())
+        written.extend([pages_path, index_path])
+
+        for name in os.listdir(out_dir):
+            path = os.path.join(out_dir, name)
+            if path not in written and name.endswith(".json"):
+                remove_output(path, self.destination)
+        print(f"Search index: {len(ids)} pages, {len(shards)} shards")
+        return written
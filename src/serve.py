@@ -0,0 +1,295 @@
+import os
+import sys
+import time
+import select
+import struct
+import argparse
+import threading
+import functools
+from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
+from assets import sync_one
+from renderer import generate_page, build_renderer
+from template import load_template
+from manifest import load_manifest, remove_output
+from frontmatter import read_metadata, collect_metadata
+import log
+import compress
+import listings
+import main as site
+
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_ISDIR = 0x40000000
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF
+EVENT_HEADER = struct.Struct("iIII")
+
+# How long to keep collecting events after the first one, so a save that
+# touches several files turns into one rebuild
+SETTLE_SECONDS = 0.01
+
+class InotifyWatcher:
+    def __init__(self, roots, files):
+        import ctypes
+        import ctypes.util
+
+        self.libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self.fd = self.libc.inotify_init1(os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.watches = {}
+        self.files = {os.path.normpath(path) for path in files}
+        # Files seen under the watched trees, so a directory moved or deleted
+        # away can report what it took with it
+        self.known = set()
+        for root in roots:
+            self.add_tree(root)
+        # Single files are watched through their directory so atomic renames are seen
+        for directory in {os.path.dirname(path) or '.' for path in self.files}:
+            self.add_watch(directory)
+
+    def add_watch(self, directory):
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(directory), WATCH_MASK)
+        if wd >= 0:
+            self.watches[wd] = os.path.normpath(directory)
+
+    def add_tree(self, root):
+        for dirpath, _, filenames in os.walk(root):
+            self.add_watch(dirpath)
+            self.known.update(os.path.normpath(os.path.join(dirpath, filename)) for filename in filenames)
+
+    def remove_tree(self, root):
+        # Returns the known files that were under root
+        prefix = os.path.join(root, "")
+        for wd, directory in list(self.watches.items()):
+            if directory == root or directory.startswith(prefix):
+                # The kernel has already dropped it if the directory was deleted
+                self.libc.inotify_rm_watch(self.fd, wd)
+                del self.watches[wd]
+        removed = {path for path in self.known if path.startswith(prefix)}
+        self.known -= removed
+        return removed
+
+    def read_events(self, timeout):
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return set()
+        data = os.read(self.fd, 65536)
+        changed = set()
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b"\0").decode()
+            offset += length
+            directory = self.watches.get(wd)
+            if directory is None or not name:
+                continue
+            path = os.path.normpath(os.path.join(directory, name))
+            if mask & IN_ISDIR:
+                if mask & (IN_CREATE | IN_MOVED_TO):
+                    self.add_tree(path)
+                    changed.update(walk_files(path))
+                elif mask & (IN_MOVED_FROM | IN_DELETE):
+                    changed.update(self.remove_tree(path))
+                continue
+            if mask & (IN_MOVED_FROM | IN_DELETE):
+                self.known.discard(path)
+            else:
+                self.known.add(path)
+            changed.add(path)
+        return changed
+
+    def wait(self):
+        changed = self.read_events(None)
+        deadline = time.monotonic() + SETTLE_SECONDS
+        while (remaining := deadline - time.monotonic()) > 0:
+            changed |= self.read_events(remaining)
+        return changed
+
+class PollingWatcher:
+    def __init__(self, roots, files, interval=0.2):
+        self.roots = roots
+        self.files = files
+        self.interval = interval
+        self.snapshot = self.scan()
+
+    def scan(self):
+        snapshot = {}
+        paths = [path for root in self.roots for path in walk_files(root)] + list(self.files)
+        for path in paths:
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            snapshot[os.path.normpath(path)] = (stat.st_mtime_ns, stat.st_size)
+        return snapshot
+
+    def wait(self):
+        while True:
+            time.sleep(self.interval)
+            snapshot = self.scan()
+            changed = {path for path in snapshot.keys() | self.snapshot.keys()
+                       if snapshot.get(path) != self.snapshot.get(path)}
+            self.snapshot = snapshot
+            if changed:
+                return changed
+
+def walk_files(root):
+    for dirpath, _, filenames in os.walk(root):
+        for filename in filenames:
+            yield os.path.normpath(os.path.join(dirpath, filename))
+
+def make_watcher(roots, files, poll=False):
+    if not poll and sys.platform.startswith("linux"):
+        try:
+            return InotifyWatcher(roots, files)
+        except (OSError, AttributeError) as error:
+            print(f"inotify unavailable ({error}), falling back to polling")
+    return PollingWatcher(roots, files)
+
+class SiteWatcher:
+    # Keeps one Renderer (and so the compiled template) in memory and maps each change to the
+    # smallest rebuild: one page, one asset, or every page for the template.
+    # Listings are rebuilt when a page's frontmatter or the template changes.
+    # metadata_cache and previous_listings are the manifest's, so the first
+    # change doesn't rewrite what the startup build just wrote.
+    def __init__(self, content, static, destination, template_path, basepath,
+                 metadata_cache=None, previous_listings=None):
+        self.content = os.path.normpath(content)
+        self.static = os.path.normpath(static)
+        self.destination = destination
+        self.template_path = os.path.normpath(template_path)
+        self.basepath = basepath
+        self.renderer = build_renderer(load_template(template_path), basepath)
+        self.metadata_cache = {} if metadata_cache is None else metadata_cache
+        self.listings = {} if previous_listings is None else previous_listings
+        self.metadata = None
+
+    def render(self, input_path):
+        dest_path = site.page_destination(input_path, self.content, self.destination)
+        if os.path.exists(input_path) and not read_metadata(input_path)["draft"]:
+            generate_page(input_path, self.template_path, dest_path, self.basepath, renderer=self.renderer)
+        else:
+            remove_output(dest_path, self.destination)
+
+    def sync(self, source_path):
+        rel_path = os.path.relpath(source_path, self.static)
+        if os.path.exists(source_path):
+            os.makedirs(os.path.join(self.destination, os.path.dirname(rel_path)), exist_ok=True)
+            sync_one(self.static, self.destination, rel_path, False)
+        else:
+            remove_output(os.path.join(self.destination, rel_path), self.destination)
+
+    def update_listings(self, template_changed):
+        pages = site.find_pages(self.content, self.destination)
+        metadata = collect_metadata(pages, self.metadata_cache)
+        if metadata == self.metadata and not template_changed:
+            return
+        self.metadata = metadata
+        pages = {input_path: dest_path for input_path, dest_path in pages.items()
+                 if not metadata[input_path]["draft"]}
+        self.listings = listings.build_listings(pages, metadata, self.content, self.destination,
+                                                self.template_path, self.basepath, self.listings)
+
+    def handle(self, changed):
+        template_changed = self.template_path in changed
+        if template_changed:
+            self.renderer = build_renderer(load_template(self.template_path), self.basepath)
+            pages = list(site.find_pages(self.content, self.destination))
+        else:
+            pages = [path for path in changed
+                     if path.startswith(self.content + os.sep) and path.endswith(".md")]
+        assets = [path for path in changed if path.startswith(self.static + os.sep)]
+
+        for path in sorted(assets):
+            self.sync(path)
+        failures = []
+        for path in sorted(pages):
+            try:
+                self.render(path)
+            except Exception as error:
+                failures.append(f"{path}: {error}")
+        if pages:
+            try:
+                self.update_listings(template_changed)
+            except ValueError as error:
+                failures.append(str(error))
+        if compress.active is not None:
+            compress.active.wait()
+        return len(pages), len(assets), failures
+
+def make_handler(root, basepath):
+    class BasepathHandler(SimpleHTTPRequestHandler):
+        def redirect(self, status, location):
+            self.send_response(status)
+            self.send_header("Location", location)
+            self.end_headers()
+
+        def send_head(self):
+            if not self.path.startswith(basepath):
+                if self.path == "/" and basepath != "/":
+                    self.redirect(302, basepath)
+                    return None
+                path, query = self.path.partition("?")[::2]
+                if path == basepath.rstrip("/"):
+                    # /blog for a site at /blog/, like a directory without its slash
+                    self.redirect(301, basepath + ("?" + query if query else ""))
+                    return None
+                self.send_error(404, "Outside of the site's basepath")
+                return None
+            return super().send_head()
+
+        def translate_path(self, path):
+            return super().translate_path("/" + path[len(basepath):])
+
+        def log_message(self, format, *args):
+            log.detail("%s - %s" % (self.address_string(), format % args))
+
+    return functools.partial(BasepathHandler, directory=root)
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(prog="main.py serve", description="Serve docs/ locally and rebuild on change")
+    parser.add_argument('basepath', nargs='?', default='/')
+    parser.add_argument('--port', type=int, default=8888)
+    parser.add_argument('--bind', default='127.0.0.1')
+    parser.add_argument('--watch', action='store_true', help="rebuild changed pages and assets as they are saved")
+    parser.add_argument('--poll', action='store_true', help="poll for changes instead of using inotify")
+    parser.add_argument('--quiet', '-q', action='store_true')
+    return parser.parse_args(argv)
+
+def main(argv):
+    args = parse_args(argv)
+    build_args = [args.basepath, '--incremental'] + (['--quiet'] if args.quiet else [])
+    site.main(build_args)
+
+    server = ThreadingHTTPServer((args.bind, args.port), make_handler('docs', args.basepath))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    print(f"Serving docs/ at http://{args.bind}:{server.server_address[1]}{args.basepath}")
+
+    try:
+        if not args.watch:
+            thread.join()
+            return
+        manifest = load_manifest(site.MANIFEST_PATH)
+        state = SiteWatcher('content', 'static', 'docs', 'template.html', args.basepath,
+                            manifest["metadata"], manifest["listings"])
+        watcher = make_watcher(['content', 'static'], ['template.html'], args.poll)
+        print(f"Watching content/, static/ and template.html with {type(watcher).__name__}")
+        while True:
+            changed = watcher.wait()
+            start = time.perf_counter()
+            pages, assets, failures = state.handle(changed)
+            elapsed = (time.perf_counter() - start) * 1000
+            for failure in failures:
+                print(f"error: {failure}")
+            if pages or assets:
+                print(f"Rebuilt {pages} page(s) and {assets} asset(s) in {elapsed:.1f} ms")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.shutdown()
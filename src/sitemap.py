@@ -0,0 +1,65 @@
+import os
+import datetime
+import threading
+from html import escape
+from manifest import page_url
+import compress
+
+SITEMAP_NAME = "sitemap.xml"
+
+# The SitemapIndex for the running build, if --site-url is set
+active = None
+
+def lastmod(input_path, meta):
+    if meta.get("date"):
+        return meta["date"][:10]
+    return datetime.date.fromtimestamp(os.stat(input_path).st_mtime).isoformat()
+
+class SitemapIndex:
+    # Each page's URL and lastmod, recorded as the page is rendered. An
+    # incremental build renders only stale pages, so entries are kept in the
+    # manifest and finish() writes a stored one for every page it skipped.
+    def __init__(self, destination, entries=None):
+        self.destination = destination
+        # source path -> [url relative to the basepath, lastmod]
+        self.entries = {} if entries is None else dict(entries)
+        self._fresh = {}
+        self._lock = threading.Lock()
+
+    def record(self, source, dest_path, meta):
+        entry = [page_url(dest_path, self.destination), lastmod(source, meta)]
+        with self._lock:
+            self.entries[source] = entry
+            self._fresh[source] = entry
+
+    def drain(self):
+        with self._lock:
+            fresh, self._fresh = self._fresh, {}
+        return fresh
+
+    def merge(self, entries):
+        with self._lock:
+            self.entries.update(entries)
+
+    def finish(self, pages, generated, basepath, site_url):
+        # pages maps source -> output for every page in the build; generated
+        # lists other HTML outputs (listings) that have no source. Entries for
+        # pages no longer built are dropped.
+        self.entries = {source: entry for source, entry in self.entries.items() if source in pages}
+        path = os.path.join(self.destination, SITEMAP_NAME)
+        prefix = site_url.rstrip("/") + basepath
+        urls = [(url, modified) for url, modified in self.entries.values()]
+        urls += [(page_url(dest_path, self.destination), None) for dest_path in generated if dest_path.endswith(".html")]
+        with open(path, 'w') as file:
+            file.write('<?xml version="1.0" encoding="UTF-8"?>\n'
+                       '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n')
+            for url, modified in sorted(urls, key=lambda item: item[0]):
+                if modified is None:
+                    file.write(f"<url><loc>{escape(prefix + url[1:])}</loc></url>\n")
+                else:
+                    file.write(f"<url><loc>{escape(prefix + url[1:])}</loc><lastmod>{modified}</lastmod></url>\n")
+            file.write("</urlset>\n")
+        if compress.active is not None:
+            compress.active.submit(path)
+        print(f"Sitemap: {len(urls)} URLs")
+        return path
@@ -0,0 +1,76 @@
+import os
+import re
+from minify import minify_html
+
+SLOT_PATTERN = re.compile(r"\{\{\s*(\w+)\s*\}\}")
+URL_ATTRIBUTE_PATTERN = re.compile(r'((?:href|src)=")/(?!/)')
+
+# path -> (mtime_ns, size, Template)
+_template_cache = {}
+
+class Template:
+    def __init__(self, source):
+        self.source = source
+        self._minified = None
+        # Literal text and slot names alternate: even indices are literals
+        self.segments = []
+        self.raw_slots = []
+        pos = 0
+        for match in SLOT_PATTERN.finditer(source):
+            self.segments.append(source[pos:match.start()])
+            self.segments.append(match.group(1))
+            self.raw_slots.append(match.group())
+            pos = match.end()
+        self.segments.append(source[pos:])
+        self._literals_by_basepath = {}
+
+    def literals(self, basepath):
+        # Basepath only touches the template's own attributes, never slot values
+        literals = self._literals_by_basepath.get(basepath)
+        if literals is None:
+            literals = [
+                URL_ATTRIBUTE_PATTERN.sub(lambda match: match.group(1) + basepath, literal)
+                for literal in self.segments[::2]
+            ]
+            self._literals_by_basepath[basepath] = literals
+        return literals
+
+    def minified(self):
+        # Minifying the source, slots and all, lets <pre> regions that span a
+        # slot be seen whole
+        if self._minified is None:
+            self._minified = Template(minify_html(self.source))
+        return self._minified
+
+    def iter_render(self, variables, basepath="/"):
+        literals = self.literals(basepath)
+        yield literals[0]
+        for i, name in enumerate(self.segments[1::2]):
+            value = variables.get(name)
+            if value is None:
+                # Unknown slots are left exactly as written
+                yield self.raw_slots[i]
+            elif isinstance(value, str):
+                yield value
+            elif hasattr(value, "iter_html"):
+                yield from value.iter_html()
+            else:
+                yield from value
+            yield literals[i + 1]
+
+    def render(self, variables, basepath="/"):
+        return "".join(self.iter_render(variables, basepath))
+
+    def write(self, fp, variables, basepath="/"):
+        fp.writelines(self.iter_render(variables, basepath))
+
+def load_template(path):
+    stat = os.stat(path)
+    cached = _template_cache.get(path)
+    if cached is not None and cached[0] == stat.st_mtime_ns and cached[1] == stat.st_size:
+        return cached[2]
+
+    with open(path) as file:
+        template = Template(file.read())
+    _template_cache[path] = (stat.st_mtime_ns, stat.st_size, template)
+    return template
@@ -0,0 +1,68 @@
+import os
+import shutil
+import tempfile
+import unittest
+from assets import sync_assets
+
+class TestSyncAssets(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.source = os.path.join(self.root, "static")
+        self.dest = os.path.join(self.root, "docs")
+        os.makedirs(os.path.join(self.source, "images"))
+        self.write("index.css", "body {}")
+        self.write("images/a.png", "png bytes")
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def write(self, rel_path, text):
+        with open(os.path.join(self.source, rel_path), "w") as file:
+            file.write(text)
+
+    def read(self, rel_path):
+        with open(os.path.join(self.dest, rel_path)) as file:
+            return file.read()
+
+    def test_copies_tree(self):
+        assets = sync_assets(self.source, self.dest)
+        self.assertEqual(assets, ["images/a.png", "index.css"])
+        self.assertEqual(self.read("images/a.png"), "png bytes")
+
+    def test_skips_unchanged_files(self):
+        sync_assets(self.source, self.dest)
+        # Same size and mtime means the destination is left alone
+        dest_path = os.path.join(self.dest, "index.css")
+        with open(dest_path, "w") as file:
+            file.write("body {}")
+        stat = os.stat(os.path.join(self.source, "index.css"))
+        os.utime(dest_path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+        inode = os.stat(dest_path).st_ino
+        sync_assets(self.source, self.dest)
+        self.assertEqual(os.stat(dest_path).st_ino, inode)
+
+    def test_recopies_changed_files(self):
+        sync_assets(self.source, self.dest)
+        self.write("index.css", "body { color: red }")
+        sync_assets(self.source, self.dest)
+        self.assertEqual(self.read("index.css"), "body { color: red }")
+
+    def test_prunes_removed_assets(self):
+        previous = sync_assets(self.source, self.dest)
+        with open(os.path.join(self.dest, "page.html"), "w") as file:
+            file.write("rendered")
+        os.remove(os.path.join(self.source, "images", "a.png"))
+        sync_assets(self.source, self.dest, previous)
+        self.assertFalse(os.path.exists(os.path.join(self.dest, "images")))
+        self.assertTrue(os.path.exists(os.path.join(self.dest, "page.html")))
+
+    def test_hardlinked_asset_is_not_written_through(self):
+        sync_assets(self.source, self.dest, hardlink=True)
+        self.write("index.css", "body { margin: 0 }")
+        sync_assets(self.source, self.dest, hardlink=True)
+        self.assertEqual(self.read("index.css"), "body { margin: 0 }")
+        with open(os.path.join(self.source, "images", "a.png")) as file:
+            self.assertEqual(file.read(), "png bytes")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,5 +1,8 @@
 import unittest
-from blocktype import markdown_to_html_node
+from enum import Enum
+from htmlnode import LeafNode
+import blocktype
+from blocktype import markdown_to_html_node, scan_blocks, block_to_block_type, BlockType
 
 class TestBlockTypes(unittest.TestCase):
     def test_paragraphs(self):
@@ -34,5 +37,70 @@ class TestBlockTypes(unittest.TestCase):
             "<div><pre><code>This is text that _should_ remain\nthe **same** even with inline stuff\n</code></pre></div>",
         )
 
+    def test_code_fence_keeps_indentation_and_blank_lines(self):
+        md = "# Title\n\n```\ndef f():\n    return 1\n\n\nprint(f())\n```\n\nAfter"
+        html = markdown_to_html_node(md).to_html()
+        self.assertEqual(
+            html,
+            "<div><h1>Title</h1><pre><code>def f():\n    return 1\n\n\nprint(f())\n</code></pre><p>After</p></div>",
+        )
+
+class TestScanBlocks(unittest.TestCase):
+    def test_types_and_line_ranges(self):
+        md = "# Heading\n\n> quote\n> more\n\n- a\n- b\n\n1. one\n2. two\n\nplain\ntext\n"
+        blocks = list(scan_blocks(md.splitlines(keepends=True)))
+        self.assertEqual(
+            [(block.block_type, block.start, block.end) for block in blocks],
+            [
+                (BlockType.HEADING, 1, 1),
+                (BlockType.QUOTE, 3, 4),
+                (BlockType.UNORDERED_LIST, 6, 7),
+                (BlockType.ORDERED_LIST, 9, 10),
+                (BlockType.PARAGRAPH, 12, 13),
+            ],
+        )
+        self.assertEqual(blocks[1].text, "> quote\n> more")
+
+    def test_unclosed_fence_runs_to_end(self):
+        blocks = list(scan_blocks(["```\n", "code\n", "\n", "more\n"]))
+        self.assertEqual(len(blocks), 1)
+        self.assertEqual(blocks[0].block_type, BlockType.CODE)
+        self.assertEqual(blocks[0].lines, ["```", "code", "", "more"])
+
+    def test_block_to_block_type(self):
+        self.assertEqual(block_to_block_type("### Title"), BlockType.HEADING)
+        self.assertEqual(block_to_block_type("####### Title"), BlockType.PARAGRAPH)
+        self.assertEqual(block_to_block_type("```\ncode\n```"), BlockType.CODE)
+        self.assertEqual(block_to_block_type("1. a\n3. b"), BlockType.PARAGRAPH)
+
+    def test_payloads_are_parsed_once(self):
+        md = "## Sub\n\n> a\n>b\n\n- x\n- y\n\n1. one\n2. two\n\nline\nwrap"
+        blocks = list(scan_blocks(md.splitlines()))
+        self.assertEqual(
+            [block.payload for block in blocks],
+            [(2, "Sub"), ["a", "b"], ["x", "y"], ["one", "two"], "line wrap"],
+        )
+
+class TestBlockRenderers(unittest.TestCase):
+    def test_horizontal_rule(self):
+        html = markdown_to_html_node("above\n\n---\n\nbelow").to_html()
+        self.assertEqual(html, "<div><p>above</p><hr></hr><p>below</p></div>")
+
+    def test_registered_block_type(self):
+        Custom = Enum("Custom", {"NOTE": "note"})
+
+        def match_note(lines):
+            if lines[0] == "!note":
+                return " ".join(lines[1:])
+            return None
+
+        blocktype.register_block_type(Custom.NOTE, lambda text: LeafNode("aside", text), match_note)
+        try:
+            html = markdown_to_html_node("!note\nremember this\n\nplain").to_html()
+        finally:
+            blocktype.BLOCK_MATCHERS.remove((Custom.NOTE, match_note))
+            del blocktype.BLOCK_RENDERERS[Custom.NOTE]
+        self.assertEqual(html, "<div><aside>remember this</aside><p>plain</p></div>")
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,99 @@
+import os
+import gzip
+import shutil
+import tempfile
+import threading
+import unittest
+from unittest import mock
+import compress
+from compress import Compressor
+from assets import sync_one
+from manifest import remove_output
+
+PAGE = b"<html><body>" + b"<p>the ring of power</p>" * 100 + b"</body></html>"
+
+class TestCompressor(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp, "index.html")
+        with open(self.path, 'wb') as file:
+            file.write(PAGE)
+
+    def tearDown(self):
+        compress.active = None
+        shutil.rmtree(self.tmp)
+
+    def test_writes_gzip_sibling(self):
+        compressor = Compressor()
+        compressor.submit(self.path, PAGE)
+        compressor.wait()
+        with open(self.path + ".gz", 'rb') as file:
+            self.assertEqual(gzip.decompress(file.read()), PAGE)
+        self.assertEqual(compressor.counts["compressed"], 1)
+
+    def test_unchanged_bytes_are_skipped(self):
+        first = Compressor()
+        first.submit(self.path, PAGE)
+        first.wait()
+
+        second = Compressor(first.index)
+        with mock.patch.object(compress, "compress_bytes") as compress_bytes:
+            second.submit(self.path, PAGE)
+            second.wait()
+        compress_bytes.assert_not_called()
+        self.assertEqual(second.counts["skipped"], 1)
+
+    def test_reads_file_without_data(self):
+        compressor = Compressor()
+        compressor.submit(self.path)
+        compressor.close()
+        with open(self.path + ".gz", 'rb') as file:
+            self.assertEqual(gzip.decompress(file.read()), PAGE)
+
+    def test_submit_blocks_when_full(self):
+        # One thread and two slots: a third file waits until one is done
+        release = threading.Event()
+        real_compress = compress.compress_bytes
+        def slow_compress(data):
+            release.wait()
+            return real_compress(data)
+        compressor = Compressor(threads=1)
+        with mock.patch.object(compress, "compress_bytes", slow_compress):
+            compressor.submit(self.path, PAGE)
+            compressor.submit(self.path, PAGE)
+            third = threading.Thread(target=compressor.submit, args=(self.path, PAGE))
+            third.start()
+            third.join(0.1)
+            self.assertTrue(third.is_alive())
+            release.set()
+            third.join()
+            compressor.close()
+        self.assertEqual(compressor.counts["compressed"] + compressor.counts["skipped"], 3)
+
+    def test_incompressible_output_gets_no_sibling(self):
+        compressor = Compressor()
+        compressor.submit(self.path, b"<p>")
+        compressor.submit(os.path.join(self.tmp, "photo.png"), PAGE)
+        compressor.wait()
+        self.assertEqual(os.listdir(self.tmp), ["index.html"])
+
+    def test_remove_output_takes_siblings(self):
+        compressor = Compressor()
+        compressor.submit(self.path, PAGE)
+        compressor.wait()
+        remove_output(self.path, self.tmp)
+        self.assertEqual(os.listdir(self.tmp), [])
+
+    def test_asset_sync_feeds_compressor(self):
+        source = os.path.join(self.tmp, "static")
+        destination = os.path.join(self.tmp, "docs")
+        os.makedirs(source)
+        os.makedirs(destination)
+        shutil.copy(self.path, os.path.join(source, "style.css"))
+        compress.active = Compressor()
+        sync_one(source, destination, "style.css", False)
+        compress.active.wait()
+        self.assertTrue(os.path.exists(os.path.join(destination, "style.css.gz")))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,67 @@
+import os
+import shutil
+import tempfile
+import unittest
+from fragment_cache import FragmentCache
+from blocktype import markdown_to_html_node
+
+class TestFragmentCache(unittest.TestCase):
+    def test_hit_and_miss_counters(self):
+        cache = FragmentCache(1024)
+        self.assertIsNone(cache.get("block"))
+        cache.put("block", "<p>block</p>")
+        self.assertEqual(cache.get("block"), "<p>block</p>")
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+    def test_evicts_least_recently_used(self):
+        cache = FragmentCache(10)
+        cache.put("a", "aaaa")
+        cache.put("b", "bbbb")
+        cache.get("a")
+        cache.put("c", "cccc")
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("a"), "aaaa")
+        self.assertLessEqual(cache.size, 10)
+
+    def test_budget_counts_utf8_bytes(self):
+        cache = FragmentCache(10)
+        cache.put("a", "ééééé")
+        self.assertEqual(cache.size, 10)
+        cache.put("b", "é")
+        self.assertIsNone(cache.get("a"))
+        self.assertLessEqual(cache.size, 10)
+
+    def test_namespace_separates_entries(self):
+        cache = FragmentCache(1024, "/one/")
+        other = FragmentCache(1024, "/two/")
+        self.assertNotEqual(cache.key("block"), other.key("block"))
+
+    def test_persists_to_disk(self):
+        root = tempfile.mkdtemp()
+        try:
+            path = os.path.join(root, "fragments.bin")
+            cache = FragmentCache(1024, "/")
+            cache.put("block", "<p>block</p>")
+            cache.save(path)
+
+            loaded = FragmentCache(1024, "/")
+            loaded.load(path)
+            self.assertEqual(loaded.get("block"), "<p>block</p>")
+
+            other = FragmentCache(1024, "/site/")
+            other.load(path)
+            self.assertEqual(len(other), 0)
+        finally:
+            shutil.rmtree(root)
+
+    def test_cached_render_matches_uncached(self):
+        md = "# Title\n\nShared **notice** block\n\n- one\n- two\n\nShared **notice** block"
+        cache = FragmentCache(1 << 20)
+        expected = markdown_to_html_node(md).to_html()
+        self.assertEqual(markdown_to_html_node(md, cache).to_html(), expected)
+        self.assertEqual(cache.hits, 1)
+        self.assertEqual(markdown_to_html_node(md, cache).to_html(), expected)
+        self.assertEqual(cache.hits, 5)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,73 @@
+import os
+import shutil
+import tempfile
+import unittest
+from frontmatter import parse_frontmatter, split_frontmatter, read_metadata, collect_metadata
+
+class TestFrontmatter(unittest.TestCase):
+    def test_parse(self):
+        meta = parse_frontmatter([
+            'title: "Of Elves: a history"\n',
+            "date: 2024-05-01\n",
+            "draft: yes\n",
+            "tags:\n",
+            "  - elves\n",
+            "  - lore\n",
+            "order: 3\n",
+        ])
+        self.assertEqual(meta, {"title": "Of Elves: a history", "date": "2024-05-01", "draft": True,
+                                "tags": ["elves", "lore"], "order": 3})
+
+    def test_defaults_and_flow_lists(self):
+        meta = parse_frontmatter(["tags: [a, 'b c']\n"])
+        self.assertEqual(meta, {"tags": ["a", "b c"], "draft": False, "title": None, "date": None})
+
+    def test_invalid_line(self):
+        with self.assertRaises(ValueError):
+            parse_frontmatter(["just words\n"])
+
+    def test_split_leaves_body(self):
+        meta, body = split_frontmatter(["---\n", "title: T\n", "---\n", "# Heading\n", "text\n"])
+        self.assertEqual(meta["title"], "T")
+        self.assertEqual(list(body), ["# Heading\n", "text\n"])
+
+        meta, body = split_frontmatter(["# Heading\n", "text\n"])
+        self.assertIsNone(meta["title"])
+        self.assertEqual(list(body), ["# Heading\n", "text\n"])
+
+    def test_leading_horizontal_rule(self):
+        # Never closed, or closed with no "key: value" in between: it's a rule
+        for lines in (["---\n", "\n", "# T\n"], ["---\n", "\n", "# T\n", "\n", "---\n", "text\n"]):
+            meta, body = split_frontmatter(lines)
+            self.assertIsNone(meta["title"])
+            self.assertEqual(list(body), lines)
+
+class TestReadMetadata(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def write(self, name, text):
+        path = os.path.join(self.tmp, name)
+        with open(path, 'w') as file:
+            file.write(text)
+        return path
+
+    def test_title_from_heading(self):
+        path = self.write("a.md", "---\ndate: 2024-01-02\n---\n\n# From Heading\n\nbody\n")
+        meta = read_metadata(path)
+        self.assertEqual((meta["title"], meta["date"]), ("From Heading", "2024-01-02"))
+
+    def test_leading_horizontal_rule(self):
+        path = self.write("hr.md", "---\n\n# After The Rule\n\nbody\n")
+        self.assertEqual(read_metadata(path)["title"], "After The Rule")
+
+    def test_collect_names_the_bad_file(self):
+        path = self.write("bad.md", "---\ntitle: T\nnot valid\n---\n")
+        with self.assertRaisesRegex(ValueError, "bad.md"):
+            collect_metadata([path])
+
+if __name__ == "__main__":
+    unittest.main()
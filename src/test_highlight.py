@@ -0,0 +1,68 @@
+import unittest
+import highlight
+from highlight import Highlighter, fence_language
+from blocktype import markdown_to_html_node
+
+class TestFenceLanguage(unittest.TestCase):
+    def test_info_strings(self):
+        self.assertEqual(fence_language("```python"), "python")
+        self.assertEqual(fence_language("``` Python "), "python")
+        self.assertEqual(fence_language("```js {.numbered}"), "js")
+        self.assertEqual(fence_language("```{.bash}"), "bash")
+        self.assertIsNone(fence_language("```"))
+
+class TestHighlighter(unittest.TestCase):
+    def test_python_tokens_are_escaped(self):
+        tokens = Highlighter().tokens("py", 'if x < 1:\n    print("<b>")  # done\n')
+        self.assertIn(("k", "if"), tokens)
+        self.assertIn(("o", "&lt;"), tokens)
+        self.assertIn(("nb", "print"), tokens)
+        self.assertIn(("s", '"&lt;b&gt;"'), tokens)
+        self.assertIn(("c", "# done"), tokens)
+        # Whitespace, indentation included, is kept as plain text
+        self.assertIn((None, ":\n    "), tokens)
+
+    def test_unknown_language(self):
+        highlighter = Highlighter()
+        self.assertIsNone(highlighter.tokens("no-such-language", "x = 1\n"))
+        self.assertEqual(highlighter.counts["unknown"], 1)
+
+    def test_cache_is_bounded_lru(self):
+        highlighter = Highlighter(max_entries=2)
+        first = highlighter.tokens("python", "a = 1\n")
+        highlighter.tokens("python", "b = 2\n")
+        self.assertIs(highlighter.tokens("python", "a = 1\n"), first)
+        highlighter.tokens("python", "c = 3\n")
+        self.assertEqual(len(highlighter._entries), 2)
+        # "b" was least recently used, so it's gone and "a" is still cached
+        self.assertIs(highlighter.tokens("python", "a = 1\n"), first)
+        self.assertEqual(highlighter.counts, {"highlighted": 3, "cached": 2, "unknown": 0})
+
+class TestHighlightedBlocks(unittest.TestCase):
+    def setUp(self):
+        self.addCleanup(setattr, highlight, "active", highlight.active)
+        highlight.active = Highlighter()
+
+    def test_spans_keep_indentation(self):
+        html = markdown_to_html_node("```python\ndef f():\n    return None\n```").to_html()
+        self.assertEqual(
+            html,
+            '<div><pre><code class="language-python"><span class="k">def</span> <span class="nf">f</span>'
+            '():\n    <span class="k">return</span> <span class="kc">None</span>\n</code></pre></div>',
+        )
+
+    def test_unknown_language_stays_plain(self):
+        html = markdown_to_html_node("```no-such-language\n  a <b>\n```").to_html()
+        self.assertEqual(html, '<div><pre><code class="language-no-such-language">  a <b>\n</code></pre></div>')
+
+    def test_off_leaves_tagged_fences_unchanged(self):
+        highlight.active = None
+        html = markdown_to_html_node("```go\nfunc main() {}\n```").to_html()
+        self.assertEqual(html, "<div><pre><code>func main() {}\n</code></pre></div>")
+
+    def test_untagged_fence_is_unchanged(self):
+        html = markdown_to_html_node("```\nx = 1\n```").to_html()
+        self.assertEqual(html, "<div><pre><code>x = 1\n</code></pre></div>")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,3 +1,4 @@
+import io
 import unittest
 from htmlnode import HTMLNode, LeafNode, ParentNode, text_node_to_html_node
 from textnode import TextNode, TextType
@@ -56,6 +57,38 @@ class TestHTMLNode(unittest.TestCase):
         "<div><span><b>grandchild</b></span></div>",
         )
 
+    def test_iter_html_matches_to_html(self):
+        node = ParentNode("div", [
+            LeafNode("b", "bold"),
+            ParentNode("p", [LeafNode(None, "text"), LeafNode("a", "link", {"href": "/x"})]),
+        ])
+        self.assertEqual("".join(node.iter_html()), node.to_html())
+        self.assertEqual(node.to_html(), '<div><b>bold</b><p>text<a href="/x">link</a></p></div>')
+
+    def test_write_html(self):
+        node = ParentNode("div", [LeafNode("span", "child")])
+        out = io.StringIO()
+        node.write_html(out)
+        self.assertEqual(out.getvalue(), "<div><span>child</span></div>")
+
+    def test_deep_nesting(self):
+        node = LeafNode(None, "x")
+        for _ in range(5000):
+            node = ParentNode("span", [node])
+        html = node.to_html()
+        self.assertTrue(html.startswith("<span><span>"))
+        self.assertEqual(len(html), 5000 * len("<span></span>") + 1)
+
+    def test_parent_without_tag_raises(self):
+        with self.assertRaises(ValueError):
+            ParentNode(None, [LeafNode("b", "x")]).to_html()
+
+    def test_nodes_are_slotted(self):
+        node = LeafNode("b", "bold")
+        self.assertFalse(hasattr(node, "__dict__"))
+        self.assertIs(node.props, LeafNode("i", "x").props)
+        self.assertEqual(repr(node), "LeafNode(b, bold, None)")
+
     def test_text(self):
         node = TextNode("This is a text node", TextType.TEXT)
         html_node = text_node_to_html_node(node)
@@ -0,0 +1,107 @@
+import os
+import struct
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+import images
+from images import ImageStage, read_dimensions, annotate_images, changed_images, variant_name
+from htmlnode import LeafNode, ParentNode
+
+def png_header(width, height):
+    return b'\x89PNG\r\n\x1a\n' + struct.pack(">I", 13) + b'IHDR' + struct.pack(">II", width, height) + b'\x08\x06\x00\x00\x00'
+
+def jpeg_header(width, height):
+    app0 = b'\xff\xe0' + struct.pack(">H", 16) + b'JFIF\x00' + bytes(9)
+    sof = b'\xff\xc0' + struct.pack(">HBHH", 11, 8, height, width) + bytes(6)
+    return b'\xff\xd8' + app0 + sof
+
+class TestDimensions(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def write(self, name, data):
+        path = os.path.join(self.tmp, name)
+        with open(path, 'wb') as file:
+            file.write(data)
+        return path
+
+    def test_formats(self):
+        self.assertEqual(read_dimensions(self.write("a.png", png_header(640, 480))), (640, 480))
+        self.assertEqual(read_dimensions(self.write("a.jpg", jpeg_header(800, 600))), (800, 600))
+        self.assertEqual(read_dimensions(self.write("a.gif", b'GIF89a' + struct.pack("<HH", 32, 16) + bytes(8))), (32, 16))
+        self.assertIsNone(read_dimensions(self.write("a.txt", b'not an image')))
+
+    def test_truncated_headers(self):
+        for name, data in (("a.png", png_header(640, 480)[:20]), ("a.gif", b'GIF89a\x20'),
+                           ("a.jpg", jpeg_header(800, 600)[:-9]), ("a.webp", b'RIFF\0\0\0\0WEBPVP8L\0')):
+            self.assertIsNone(read_dimensions(self.write(name, data)), name)
+
+class TestImageStage(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.static = os.path.join(self.tmp, "static")
+        self.docs = os.path.join(self.tmp, "docs")
+        os.makedirs(os.path.join(self.static, "images"))
+        os.makedirs(self.docs)
+        with open(os.path.join(self.static, "images", "a.png"), 'wb') as file:
+            file.write(png_header(2000, 1000))
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def stage(self):
+        return ImageStage(self.static, self.docs, os.path.join(self.tmp, "cache"), widths=[480, 960])
+
+    def test_sizes_without_encoder(self):
+        with mock.patch.object(images, "Image", None):
+            info = self.stage().run([os.path.join("images", "a.png"), "style.css"])
+        self.assertEqual(info, {"/images/a.png": {"width": 2000, "height": 1000, "srcset": []}})
+
+    def test_broken_image_gets_no_variants(self):
+        encoder = mock.Mock()
+        encoder.open.side_effect = OSError("cannot identify image file")
+        encoder.DecompressionBombError = type("DecompressionBombError", (Exception,), {})
+        with mock.patch.object(images, "Image", encoder), mock.patch("builtins.print"):
+            info = self.stage().run([os.path.join("images", "a.png")])
+        self.assertEqual(info, {"/images/a.png": {"width": 2000, "height": 1000, "srcset": []}})
+
+    def test_unchanged_images_are_not_reprocessed(self):
+        rel_path = os.path.join("images", "a.png")
+        with mock.patch.object(images, "Image", None):
+            self.stage().run([rel_path])
+            with mock.patch.object(images, "read_dimensions") as read:
+                self.stage().run([rel_path])
+        read.assert_not_called()
+
+    def test_variant_name(self):
+        self.assertEqual(variant_name(os.path.join("images", "a.png"), 480, "abcdef0123"),
+                         os.path.join("images", "a-480w-abcdef01.png"))
+
+class TestChangedImages(unittest.TestCase):
+    def test_changed_images(self):
+        old = {"/images/a.png": {"width": 1, "height": 1, "srcset": []}, "/images/b.png": {"width": 2, "height": 2, "srcset": []}}
+        new = {"/images/a.png": {"width": 1, "height": 1, "srcset": []}, "/images/b.png": {"width": 3, "height": 2, "srcset": []},
+               "/images/c.png": {"width": 1, "height": 1, "srcset": []}}
+        self.assertEqual(changed_images(old, new), {"images/b.png", "images/c.png"})
+        self.assertEqual(changed_images(new, {}), {"images/a.png", "images/b.png", "images/c.png"})
+
+class TestAnnotate(unittest.TestCase):
+    def test_annotate_images(self):
+        info = {"/images/a.png": {"width": 960, "height": 480,
+                                  "srcset": [["/images/a-480w-x.png", 480], ["/images/a.png", 960]]}}
+        node = ParentNode("p", [LeafNode("img", "", {"src": "/images/a.png", "alt": "a"}),
+                                LeafNode("img", "", {"src": "/other.png", "alt": "b"})])
+        annotate_images(node, info, "/site/")
+        self.assertEqual(
+            node.children[0].props,
+            {"src": "/images/a.png", "alt": "a", "width": "960", "height": "480", "loading": "lazy",
+             "srcset": "/site/images/a-480w-x.png 480w, /site/images/a.png 960w"},
+        )
+        self.assertEqual(node.children[1].props, {"src": "/other.png", "alt": "b"})
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,55 @@
+import unittest
+from textnode import TextNode, TextType
+from inline import tokenize_inline
+from htmlnode import text_node_to_html_node
+
+class TestTokenizeInline(unittest.TestCase):
+    def test_all_span_types(self):
+        nodes = tokenize_inline(
+            "This is **text** with an _italic_ word and a `code block` and an "
+            "![obi wan image](https://i.imgur.com/fJRm4Vk.jpeg) and a [link](https://boot.dev)"
+        )
+        self.assertListEqual(
+            [
+                TextNode("This is ", TextType.TEXT),
+                TextNode("text", TextType.BOLD),
+                TextNode(" with an ", TextType.TEXT),
+                TextNode("italic", TextType.ITALIC),
+                TextNode(" word and a ", TextType.TEXT),
+                TextNode("code block", TextType.CODE),
+                TextNode(" and an ", TextType.TEXT),
+                TextNode("obi wan image", TextType.IMAGE, "https://i.imgur.com/fJRm4Vk.jpeg"),
+                TextNode(" and a ", TextType.TEXT),
+                TextNode("link", TextType.LINK, "https://boot.dev"),
+            ],
+            nodes,
+        )
+
+    def test_code_span_keeps_underscores(self):
+        nodes = tokenize_inline("call `snake_case_name` here")
+        self.assertEqual(nodes[1], TextNode("snake_case_name", TextType.CODE))
+        self.assertEqual(len(nodes), 3)
+
+    def test_underscore_in_url(self):
+        nodes = tokenize_inline("[docs](https://example.com/some_page)")
+        self.assertListEqual([TextNode("docs", TextType.LINK, "https://example.com/some_page")], nodes)
+
+    def test_bold_inside_link(self):
+        nodes = tokenize_inline("see [**this**](/here)")
+        self.assertEqual(nodes[1], TextNode("**this**", TextType.LINK, "/here"))
+        self.assertEqual(text_node_to_html_node(nodes[1]).to_html(), '<a href="/here"><b>this</b></a>')
+
+    def test_unmatched_delimiter_raises(self):
+        with self.assertRaises(Exception):
+            tokenize_inline("an **unclosed span")
+
+    def test_lenient_mode_keeps_stray_delimiters(self):
+        nodes = tokenize_inline("snake_case", strict=False)
+        self.assertListEqual([TextNode("snake_case", TextType.TEXT)], nodes)
+
+    def test_nested_bold_keeps_stray_underscore(self):
+        node = text_node_to_html_node(TextNode("snake_case", TextType.BOLD))
+        self.assertEqual(node.to_html(), "<b>snake_case</b>")
+
+if __name__ == "__main__":
+    unittest.main()
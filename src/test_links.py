@@ -0,0 +1,73 @@
+import os
+import shutil
+import tempfile
+import unittest
+from blocktype import markdown_to_html_node
+from fragment_cache import FragmentCache
+from links import LinkIndex, resolve, node_references, fragment_references
+
+class TestReferences(unittest.TestCase):
+    def test_node_and_fragment_references_agree(self):
+        node = markdown_to_html_node("A [link](/a) and ![img](/b.png)\n\n- [c](c.html)")
+        expected = [("link", "/a"), ("image", "/b.png"), ("link", "c.html")]
+        self.assertEqual(node_references(node), expected)
+        self.assertEqual(fragment_references(node.to_html()), expected)
+
+    def test_cache_hits_still_record_references(self):
+        cache = FragmentCache(1 << 20)
+        markdown_to_html_node("[a](/a)", cache)
+        references = []
+        markdown_to_html_node("[a](/a)", cache, references=references)
+        self.assertEqual(cache.hits, 1)
+        self.assertEqual(references, [("link", "/a")])
+
+class TestResolve(unittest.TestCase):
+    def test_resolve(self):
+        self.assertEqual(resolve("/blog/x/", "index.html", "/"), "blog/x/index.html")
+        self.assertEqual(resolve("/site/a.png", "index.html", "/site/"), "a.png")
+        self.assertEqual(resolve("../b.html#top", "blog/x/index.html", "/"), "blog/b.html")
+        self.assertEqual(resolve("/", "blog/index.html", "/"), "index.html")
+        self.assertIsNone(resolve("https://example.com/x", "index.html", "/"))
+        self.assertIsNone(resolve("#section", "index.html", "/"))
+        self.assertIsNone(resolve("rel.html", None, "/"))
+
+class TestLinkIndex(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def test_broken_references(self):
+        index = LinkIndex("docs")
+        index.record("content/index.md", os.path.join("docs", "index.html"),
+                     [("link", "/blog/"), ("link", "/blog"), ("image", "/missing.png"), ("link", "mailto:me@x")])
+        broken = index.broken(["index.html", "blog/index.html"])
+        self.assertEqual(broken, [("content/index.md", "image", "/missing.png")])
+
+    def test_referencing(self):
+        index = LinkIndex("docs", "/site/")
+        index.record("a.md", os.path.join("docs", "blog", "a.html"), [("image", "/site/images/x.png"), ("link", "/site/y.png")])
+        index.record("b.md", os.path.join("docs", "blog", "b.html"), [("image", "../images/y.png")])
+        index.record("c.md", os.path.join("docs", "c.html"), [])
+        self.assertEqual(index.referencing(["images/x.png"], "image"), {"a.md"})
+        self.assertEqual(index.referencing(["images/x.png", "images/y.png"], "image"), {"a.md", "b.md"})
+        self.assertEqual(index.referencing(["y.png"], "image"), set())
+
+    def test_round_trip_and_retain(self):
+        path = os.path.join(self.tmp, "links.json")
+        index = LinkIndex("docs", "/site/")
+        index.record("a.md", os.path.join("docs", "a.html"), [("link", "/site/b.html")])
+        index.record("b.md", os.path.join("docs", "b.html"), [])
+        index.save(path)
+
+        loaded = LinkIndex("docs", "/site/")
+        self.assertTrue(loaded.load(path))
+        loaded.retain(["a.md"])
+        self.assertEqual(list(loaded.pages), ["a.md"])
+        self.assertEqual(loaded.broken(["a.html"]), [("a.md", "link", "/site/b.html")])
+        # A different basepath means different targets, so the index is not reused
+        self.assertFalse(LinkIndex("docs", "/").load(path))
+
+if __name__ == "__main__":
+    unittest.main()
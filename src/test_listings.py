@@ -0,0 +1,104 @@
+import os
+import shutil
+import tempfile
+import unittest
+from listings import find_posts, plan_listings, build_listings, page_url, slugify
+
+def meta(title, date=None, tags=()):
+    return {"title": title, "date": date, "tags": list(tags), "draft": False}
+
+class TestListings(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.content = os.path.join(self.tmp, "content")
+        self.docs = os.path.join(self.tmp, "docs")
+        self.template = os.path.join(self.tmp, "template.html")
+        with open(self.template, 'w') as file:
+            file.write("<title>{{ Title }}</title><main>{{ Content }}</main>")
+        self.pages = {}
+        self.metadata = {}
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def add_post(self, name, title, date=None, tags=()):
+        source = os.path.join(self.content, "blog", name, "index.md")
+        os.makedirs(os.path.dirname(source), exist_ok=True)
+        with open(source, 'w') as file:
+            file.write(f"# {title}\n")
+        self.pages[source] = os.path.join(self.docs, "blog", name, "index.html")
+        self.metadata[source] = meta(title, date, tags)
+
+    def build(self, previous, page_size=2, site_url="https://example.com"):
+        return build_listings(self.pages, self.metadata, self.content, self.docs, self.template, "/", previous,
+                              page_size, site_url)
+
+    def test_page_url_and_slug(self):
+        self.assertEqual(page_url(os.path.join("docs", "index.html"), "docs"), "/")
+        self.assertEqual(page_url(os.path.join("docs", "blog", "a", "index.html"), "docs"), "/blog/a/")
+        self.assertEqual(slugify("Middle Earth!"), "middle-earth")
+
+    def test_posts_newest_first(self):
+        self.add_post("old", "Old", "2023-01-01")
+        self.add_post("new", "New", "2024-01-01")
+        self.add_post("undated", "Undated")
+        self.pages[os.path.join(self.content, "index.md")] = os.path.join(self.docs, "index.html")
+        posts = find_posts(self.pages, self.metadata, self.content, self.docs)
+        self.assertEqual([post["title"] for post in posts], ["New", "Old", "Undated"])
+
+    def test_pagination_and_tags(self):
+        for i in range(5):
+            self.add_post(f"p{i}", f"Post {i}", f"2024-01-0{i + 1}", tags=["elves"] if i % 2 else [])
+        posts = find_posts(self.pages, self.metadata, self.content, self.docs)
+        listings = plan_listings(posts, self.docs, 2)
+        blog = os.path.join(self.docs, "blog")
+        self.assertEqual(sorted(os.path.relpath(path, blog) for path in listings), [
+            os.path.join("index.html"),
+            os.path.join("page", "2", "index.html"),
+            os.path.join("page", "3", "index.html"),
+            os.path.join("tags", "elves", "index.html"),
+        ])
+        second = listings[os.path.join(blog, "page", "2", "index.html")]
+        self.assertEqual([post["title"] for post in second["posts"]], ["Post 2", "Post 1"])
+        self.assertEqual((second["newer"], second["older"]), ("/blog/", "/blog/page/3/"))
+
+    def test_only_changed_listings_are_written(self):
+        for i in range(3):
+            self.add_post(f"p{i}", f"Post {i}", f"2024-01-0{i + 1}")
+        first = self.build({})
+        feed = os.path.join(self.docs, "blog", "atom.xml")
+        self.assertIn(feed, first)
+        with open(os.path.join(self.docs, "blog", "index.html")) as file:
+            self.assertIn('<a href="/blog/p2/">Post 2</a>', file.read())
+
+        mtimes = {path: os.stat(path).st_mtime_ns for path in first}
+        self.assertEqual(self.build(first), first)
+        self.assertEqual({path: os.stat(path).st_mtime_ns for path in first}, mtimes)
+
+        # An older post only lands on the last page, which now spills over
+        self.add_post("p9", "Post 9", "2020-01-01")
+        second = self.build(first)
+        self.assertEqual(second[os.path.join(self.docs, "blog", "index.html")],
+                         first[os.path.join(self.docs, "blog", "index.html")])
+        self.assertIn(os.path.join(self.docs, "blog", "page", "2", "index.html"), second)
+
+        del self.pages[next(iter(self.pages))]
+        del self.metadata[next(iter(self.metadata))]
+        del self.pages[next(iter(self.pages))]
+        del self.metadata[next(iter(self.metadata))]
+        third = self.build(second)
+        self.assertFalse(os.path.exists(os.path.join(self.docs, "blog", "page", "2", "index.html")))
+        self.assertEqual(len(third), 2)
+
+    def test_feed_needs_site_url(self):
+        self.add_post("p0", "Post 0", "2024-01-01")
+        feed = os.path.join(self.docs, "blog", "atom.xml")
+        first = self.build({})
+        with open(feed) as file:
+            self.assertIn('<id>https://example.com/blog/p0/</id>', file.read())
+        # Without it the ids would be relative, so the old feed goes away
+        self.assertNotIn(feed, self.build(first, site_url=""))
+        self.assertFalse(os.path.exists(feed))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,54 @@
+import os
+import shutil
+import tempfile
+import unittest
+from manifest import new_manifest, plan_build, update_manifest, remove_output
+
+class TestPlanBuild(unittest.TestCase):
+    def setUp(self):
+        self.manifest = new_manifest()
+        self.pages = {
+            "content/index.md": ("docs/index.html", "aaa"),
+            "content/blog/tom/index.md": ("docs/blog/tom/index.html", "bbb"),
+        }
+        update_manifest(self.manifest, self.pages, "tpl", "/")
+
+    def test_empty_manifest_renders_everything(self):
+        stale, removed = plan_build(new_manifest(), self.pages, "tpl", "/")
+        self.assertEqual(sorted(stale), sorted(self.pages))
+        self.assertEqual(removed, [])
+
+    def test_only_changed_source_is_stale(self):
+        pages = dict(self.pages)
+        pages["content/index.md"] = ("docs/index.html", "changed")
+        stale, _ = plan_build(self.manifest, pages, "tpl", "/")
+        self.assertIn("content/index.md", stale)
+
+    def test_template_change_renders_everything(self):
+        stale, _ = plan_build(self.manifest, self.pages, "other", "/")
+        self.assertEqual(sorted(stale), sorted(self.pages))
+
+    def test_basepath_change_renders_everything(self):
+        stale, _ = plan_build(self.manifest, self.pages, "tpl", "/Staticsite/")
+        self.assertEqual(sorted(stale), sorted(self.pages))
+
+    def test_removed_source_deletes_output(self):
+        pages = {"content/index.md": self.pages["content/index.md"]}
+        _, removed = plan_build(self.manifest, pages, "tpl", "/")
+        self.assertEqual(removed, ["docs/blog/tom/index.html"])
+
+class TestRemoveOutput(unittest.TestCase):
+    def test_prunes_empty_directories(self):
+        root = tempfile.mkdtemp()
+        try:
+            path = os.path.join(root, "blog", "tom", "index.html")
+            os.makedirs(os.path.dirname(path))
+            open(path, "w").close()
+            remove_output(path, root)
+            self.assertFalse(os.path.exists(os.path.join(root, "blog")))
+            self.assertTrue(os.path.exists(root))
+        finally:
+            shutil.rmtree(root)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,84 @@
+import os
+import shutil
+import tempfile
+import unittest
+import mapped
+from mapped import MappedSource
+from renderer import generate_page
+from fragment_cache import FragmentCache
+
+TEMPLATE = "<html><title>{{ Title }}</title><body>{{ Content }}</body></html>"
+
+class TestMappedSource(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def write(self, name, data):
+        path = os.path.join(self.root, name)
+        with open(path, 'wb') as file:
+            file.write(data)
+        return path
+
+    def test_lines(self):
+        path = self.write("a.md", "# Tïtle\n\nlast line without newline".encode())
+        with MappedSource(path) as source:
+            self.assertEqual(list(source.lines()), ["# Tïtle\n", "\n", "last line without newline"])
+            self.assertEqual(list(source.line_ranges()), [(0, 9), (9, 10), (10, 35)])
+
+    def test_empty_file(self):
+        with MappedSource(self.write("empty.md", b"")) as source:
+            self.assertEqual(list(source.lines()), [])
+
+class TestMappedRender(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.template_path = os.path.join(self.root, "template.html")
+        with open(self.template_path, "w") as file:
+            file.write(TEMPLATE)
+        self.addCleanup(setattr, mapped, "threshold", mapped.threshold)
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def render(self, text, threshold, cache=None):
+        source = os.path.join(self.root, "page.md")
+        with open(source, "w") as file:
+            file.write(text)
+        dest = os.path.join(self.root, "out", f"page-{threshold}.html")
+        mapped.threshold = threshold
+        generate_page(source, self.template_path, dest, "/base/", cache=cache)
+        with open(dest) as file:
+            return file.read()
+
+    def test_matches_normal_render(self):
+        text = ("---\ntags: [a]\n---\n# Title\n\nSome **bold** [link](/x)\n\n```\ncode\n\n  kept\n```\n\n"
+                "- one\n- two\n\n> quote\n")
+        expected = self.render(text, None)
+        self.assertEqual(self.render(text, 1), expected)
+        # Cached fragments stream out the same way
+        cache = FragmentCache(1 << 20, "/base/")
+        self.render(text, 1, cache)
+        self.assertEqual(self.render(text, 1, cache), expected)
+
+    def test_content_used_twice(self):
+        # Streamed content can't be written twice; such templates render whole
+        with open(self.template_path, "w") as file:
+            file.write("{{ Content }}|{{ Content }}")
+        text = "# Title\n\nSome text\n"
+        expected = self.render(text, None)
+        self.assertEqual(expected.count("Some text"), 2)
+        self.assertEqual(self.render(text, 1), expected)
+
+    def test_frontmatter_title(self):
+        html = self.render("---\ntitle: From Header\n---\n\ntext\n", 1)
+        self.assertIn("<title>From Header</title>", html)
+
+    def test_missing_title(self):
+        with self.assertRaises(Exception):
+            self.render("no title here", 1)
+
+if __name__ == "__main__":
+    unittest.main()
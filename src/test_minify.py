@@ -0,0 +1,37 @@
+import unittest
+from minify import minify_html, minify_css, Minifier
+from template import Template
+from blocktype import markdown_to_html_node
+
+class TestMinifyHTML(unittest.TestCase):
+    def test_collapses_indentation(self):
+        html = "<!doctype html>\n<html>\n  <head>\n    <title>T</title>\n  </head>\n  <!-- note -->\n</html>\n"
+        self.assertEqual(minify_html(html), "<!doctype html><html><head><title>T</title></head></html>")
+
+    def test_keeps_inline_spaces_and_pre(self):
+        html = "<p><b>a</b> <i>b</i>   c</p>\n<pre>  x\n\n  y</pre>"
+        self.assertEqual(minify_html(html), "<p><b>a</b> <i>b</i> c</p><pre>  x\n\n  y</pre>")
+
+    def test_template_pre_around_slot(self):
+        template = Template("<div>\n  <pre>{{ Code }}\n  </pre>\n</div>")
+        self.assertEqual(template.minified().render({"Code": "a"}), "<div><pre>a\n  </pre></div>")
+
+class TestMinifyCSS(unittest.TestCase):
+    def test_minify_css(self):
+        css = '/* gone */\nbody {\n  font-family: "A  B", serif;\n  margin: 0;\n}\n\na :hover > b,\ni { color: red; }\n/*! kept */'
+        self.assertEqual(minify_css(css), 'body{font-family:"A  B",serif;margin:0}a :hover>b,i{color:red}/*! kept */')
+
+class TestMinifier(unittest.TestCase):
+    def test_minify_node_leaves_code_alone(self):
+        node = markdown_to_html_node("> one\n> two\n\nsome `a  b` code\n\n```\n  keep   this\n```")
+        minifier = Minifier()
+        minifier.minify_node(node)
+        self.assertEqual(
+            node.to_html(),
+            "<div><blockquote>one two</blockquote><p>some <code>a  b</code> code</p>"
+            "<pre><code>  keep   this\n</code></pre></div>",
+        )
+        self.assertEqual(minifier.counts["html_saved"], 0)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,54 @@
+import os
+import shutil
+import tempfile
+import unittest
+from renderer import generate_page
+from parallel import render_pages, make_batches, PageBuildError
+
+TEMPLATE = "<html><title>{{ Title }}</title><body>{{ Content }}</body></html>"
+
+class TestParallelRender(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.template_path = os.path.join(self.root, "template.html")
+        with open(self.template_path, "w") as file:
+            file.write(TEMPLATE)
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def write_page(self, name, text):
+        path = os.path.join(self.root, name + ".md")
+        with open(path, "w") as file:
+            file.write(text)
+        return path
+
+    def test_matches_serial_output(self):
+        pages = []
+        for i in range(5):
+            source = self.write_page(f"page{i}", f"# Page {i}\n\nSome **bold** [link](/x{i})")
+            pages.append((source, os.path.join(self.root, "out", f"page{i}.html")))
+        render_pages(pages, self.template_path, "/base/", 2)
+
+        for source, dest in pages:
+            serial_dest = dest + ".serial"
+            generate_page(source, self.template_path, serial_dest, "/base/")
+            with open(dest, "rb") as a, open(serial_dest, "rb") as b:
+                self.assertEqual(a.read(), b.read())
+
+    def test_failures_are_collected(self):
+        good = self.write_page("good", "# Good")
+        bad = self.write_page("bad", "no title here")
+        pages = [(good, os.path.join(self.root, "good.html")), (bad, os.path.join(self.root, "bad.html"))]
+        with self.assertRaises(PageBuildError) as context:
+            render_pages(pages, self.template_path, "/", 2)
+        self.assertEqual([path for path, _ in context.exception.failures], [bad])
+        self.assertTrue(os.path.exists(os.path.join(self.root, "good.html")))
+
+    def test_batches_cover_every_page(self):
+        pages = list(range(10))
+        batches = make_batches(pages, 3)
+        self.assertEqual([page for batch in batches for page in batch], pages)
+
+if __name__ == "__main__":
+    unittest.main()
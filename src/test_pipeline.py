@@ -0,0 +1,65 @@
+import os
+import shutil
+import tempfile
+import unittest
+import mapped
+from renderer import generate_page
+from pipeline import render_pages
+from parallel import PageBuildError
+
+TEMPLATE = "<html><title>{{ Title }}</title><body>{{ Content }}</body></html>"
+
+class TestPipelineRender(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.template_path = os.path.join(self.root, "template.html")
+        with open(self.template_path, "w") as file:
+            file.write(TEMPLATE)
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def write_page(self, name, text):
+        path = os.path.join(self.root, name + ".md")
+        with open(path, "w") as file:
+            file.write(text)
+        return path
+
+    def test_matches_serial_output(self):
+        pages = []
+        for i in range(30):
+            source = self.write_page(f"page{i}", f"# Page {i}\n\nSome **bold** [link](/x{i})\n\n- a\n- b")
+            pages.append((source, os.path.join(self.root, "out", f"sub{i % 3}", f"page{i}.html")))
+        # One-slot queues keep every stage waiting on the next
+        render_pages(pages, self.template_path, "/base/", io_threads=2, queue_size=1)
+
+        for source, dest in pages:
+            serial_dest = dest + ".serial"
+            generate_page(source, self.template_path, serial_dest, "/base/")
+            with open(dest, "rb") as a, open(serial_dest, "rb") as b:
+                self.assertEqual(a.read(), b.read())
+
+    def test_large_page_with_content_twice(self):
+        with open(self.template_path, "w") as file:
+            file.write("{{ Content }}|{{ Content }}")
+        self.addCleanup(setattr, mapped, "threshold", mapped.threshold)
+        mapped.threshold = 1
+        source = self.write_page("big", "# Big\n\nSome text\n")
+        dest = os.path.join(self.root, "big.html")
+        render_pages([(source, dest)], self.template_path, "/", io_threads=1, queue_size=1)
+        with open(dest) as file:
+            self.assertEqual(file.read().count("Some text"), 2)
+
+    def test_failures_are_collected(self):
+        good = self.write_page("good", "# Good")
+        bad = self.write_page("bad", "no title here")
+        missing = os.path.join(self.root, "missing.md")
+        pages = [(good, os.path.join(self.root, "good.html")), (bad, os.path.join(self.root, "bad.html")),
+                 (missing, os.path.join(self.root, "missing.html"))]
+        with self.assertRaises(PageBuildError) as context:
+            render_pages(pages, self.template_path, "/", io_threads=1, queue_size=1)
+        self.assertEqual([path for path, _ in context.exception.failures], sorted([bad, missing]))
+        self.assertTrue(os.path.exists(os.path.join(self.root, "good.html")))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,39 @@
+import unittest
+import profiler
+from blocktype import markdown_to_html_node
+
+class TestProfiler(unittest.TestCase):
+    def tearDown(self):
+        profiler.active = None
+
+    def test_disabled_stage_is_a_no_op(self):
+        profiler.active = None
+        with profiler.stage("read"):
+            pass
+        self.assertIsNone(profiler.active)
+
+    def test_records_page_stages(self):
+        prof = profiler.enable()
+        prof.start_page("page.md")
+        markdown_to_html_node("# Title\n\nSome **bold** text")
+        prof.end_page()
+        stages = prof.pages["page.md"]
+        for name in ("blocks", "inline"):
+            self.assertIn(name, stages)
+
+    def test_time_outside_pages_goes_to_build(self):
+        prof = profiler.enable()
+        with profiler.stage("static_copy"):
+            pass
+        self.assertIn("static_copy", prof.build_stages)
+        self.assertEqual(prof.pages, {})
+
+    def test_slowest_pages_and_merge(self):
+        prof = profiler.BuildProfiler()
+        prof.merge({"a.md": {"read": 0.1}, "b.md": {"read": 0.3}})
+        prof.merge({"a.md": {"write": 0.5}})
+        self.assertEqual([path for path, _, _ in prof.slowest_pages(2)], ["a.md", "b.md"])
+        self.assertIn("2 slowest of 2 pages", prof.report(2))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,75 @@
+import os
+import shutil
+import tempfile
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from renderer import Renderer, generate_page
+from template import Template
+from fragment_cache import FragmentCache
+
+TEMPLATE = "<html><title>{{ Title }}</title><a href=\"/\">home</a><body>{{ Content }}</body></html>"
+
+class TestRenderer(unittest.TestCase):
+    def test_render_string(self):
+        renderer = Renderer(Template(TEMPLATE), "/base/")
+        html = renderer.render_string("# Hello\n\nSee [docs](/docs)\n")
+        self.assertEqual(html, '<html><title>Hello</title><a href="/base/">home</a><body><div>'
+                               '<h1>Hello</h1><p>See <a href="/base/docs">docs</a></p></div></body></html>')
+
+    def test_frontmatter_and_variables(self):
+        renderer = Renderer(Template("{{ Title }}|{{ Date }}|{{ Extra }}"))
+        html = renderer.render_string("---\ntitle: Front\ndate: 2024-01-01\n---\n# Heading\n", {"Extra": "x"})
+        self.assertEqual(html, "Front|2024-01-01|x")
+
+    def test_leading_horizontal_rule(self):
+        renderer = Renderer(Template("{{ Title }}|{{ Content }}"))
+        self.assertEqual(renderer.render_string("---\n\n# T\n"), "T|<div><hr></hr><h1>T</h1></div>")
+
+    def test_missing_title(self):
+        with self.assertRaises(Exception):
+            Renderer(Template(TEMPLATE)).render_string("no title here")
+
+    def test_minify(self):
+        renderer = Renderer(Template("<p>  {{ Title }}  </p>"), minifier=True)
+        self.assertEqual(renderer.render_string("# A\n"), "<p> A </p>")
+        self.assertEqual(renderer.minifier.counts["pages"], 1)
+
+    def test_shared_between_threads(self):
+        renderer = Renderer(Template(TEMPLATE), "/base/", cache=FragmentCache(1 << 20))
+        documents = [f"# Page {i}\n\nSome **bold** [link](/x{i % 3})\n\n- a\n- b\n" for i in range(40)]
+        expected = [Renderer(Template(TEMPLATE), "/base/").render_string(document) for document in documents]
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            self.assertEqual(list(executor.map(renderer.render_string, documents)), expected)
+
+    def test_render_file(self):
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root)
+        template_path = os.path.join(root, "template.html")
+        source = os.path.join(root, "page.md")
+        with open(template_path, "w") as file:
+            file.write(TEMPLATE)
+        with open(source, "w") as file:
+            file.write("# Page\n\ntext\n")
+        renderer = Renderer(template_path)
+        dest = os.path.join(root, "out", "page.html")
+        renderer.render_file(source, dest)
+        with open(dest) as file:
+            self.assertEqual(file.read(), renderer.render_string("# Page\n\ntext\n"))
+
+    def test_generate_page_uses_given_renderer(self):
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root)
+        source = os.path.join(root, "page.md")
+        with open(source, "w") as file:
+            file.write("# Page\n\n[a](/a)\n")
+        renderer = Renderer(Template(TEMPLATE), "/base/")
+        dests = [os.path.join(root, "out", f"page{i}.html") for i in range(2)]
+        for dest in dests:
+            # The template path is never opened, the renderer already holds one
+            generate_page(source, os.path.join(root, "missing.html"), dest, "/base/", renderer=renderer)
+        for dest in dests:
+            with open(dest) as file:
+                self.assertEqual(file.read(), renderer.render_string("# Page\n\n[a](/a)\n"))
+
+if __name__ == "__main__":
+    unittest.main()
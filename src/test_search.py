@@ -0,0 +1,107 @@
+import os
+import json
+import shutil
+import tempfile
+import unittest
+from search import SearchIndexer, tokenize, shard_key, fragment_text
+from sitemap import SitemapIndex
+
+class TestTerms(unittest.TestCase):
+    def test_tokenize(self):
+        self.assertEqual(tokenize("The Ring of Power, and a 2nd ring"), ["ring", "power", "2nd", "ring"])
+
+    def test_shard_key(self):
+        self.assertEqual(shard_key("ring"), "r")
+        self.assertEqual(shard_key("2nd"), "2")
+        self.assertEqual(shard_key("éowyn"), "_")
+
+    def test_fragment_text_keeps_bare_angle_brackets(self):
+        self.assertEqual(tokenize(fragment_text('<p><a href="/">< Back Home</a></p>')), ["back", "home"])
+
+class TestSearchIndexer(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.docs = os.path.join(self.tmp, "docs")
+        self.store = os.path.join(self.tmp, "store")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def read(self, name):
+        with open(os.path.join(self.docs, "search", name)) as file:
+            return json.load(file)
+
+    def record(self, indexer, source, title, text):
+        dest_path = os.path.join(self.docs, source, "index.html")
+        indexer.record(source, dest_path, title, text)
+
+    def test_shards(self):
+        indexer = SearchIndexer(self.docs, self.store)
+        self.record(indexer, "a", "Rivendell", "elves live in rivendell")
+        self.record(indexer, "b", "Moria", "dwarves and elves")
+        indexer.finish(["a", "b"])
+
+        index = self.read("index.json")
+        self.assertEqual(index["shards"], {"d": "d.json", "e": "e.json", "l": "l.json", "m": "m.json", "r": "r.json"})
+        self.assertEqual(self.read("pages.json"), [["/a/", "Rivendell"], ["/b/", "Moria"]])
+        # Title terms are weighted; postings are [id, count, ...] by page id
+        self.assertEqual(self.read("r.json"), {"rivendell": [0, 6]})
+        self.assertEqual(self.read("e.json"), {"elves": [0, 1, 1, 1]})
+
+    def test_incremental_merge(self):
+        indexer = SearchIndexer(self.docs, self.store)
+        self.record(indexer, "a", "Rivendell", "elves")
+        self.record(indexer, "b", "Moria", "dwarves")
+        indexer.finish(["a", "b"])
+        moria = os.path.join(self.docs, "search", "m.json")
+        mtime = os.stat(moria).st_mtime_ns
+
+        # Only "a" is re-rendered; "b" comes from the store, "c" was deleted
+        indexer = SearchIndexer(self.docs, self.store)
+        self.record(indexer, "a", "Lorien", "elves")
+        indexer.finish(["a", "b"])
+        self.assertEqual(self.read("pages.json"), [["/a/", "Lorien"], ["/b/", "Moria"]])
+        self.assertFalse(os.path.exists(os.path.join(self.docs, "search", "r.json")))
+        self.assertEqual(os.stat(moria).st_mtime_ns, mtime)
+
+        indexer = SearchIndexer(self.docs, self.store)
+        indexer.finish(["a"])
+        self.assertEqual(self.read("pages.json"), [["/a/", "Lorien"]])
+        self.assertFalse(os.path.exists(moria))
+
+class TestSitemap(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def test_entries(self):
+        docs = os.path.join(self.tmp, "docs")
+        os.makedirs(docs)
+        source = os.path.join(self.tmp, "index.md")
+        open(source, 'w').close()
+        index = SitemapIndex(docs)
+        index.record(source, os.path.join(docs, "index.html"), {"date": "2024-05-01"})
+        listing = os.path.join(docs, "blog", "index.html")
+        path = index.finish({source: os.path.join(docs, "index.html")},
+                            [listing, os.path.join(docs, "blog", "atom.xml")], "/site/", "https://example.com/")
+        with open(path) as file:
+            sitemap = file.read()
+        self.assertIn("<url><loc>https://example.com/site/</loc><lastmod>2024-05-01</lastmod></url>", sitemap)
+        self.assertIn("<url><loc>https://example.com/site/blog/</loc></url>", sitemap)
+        self.assertNotIn("atom.xml", sitemap)
+
+    def test_skipped_pages_keep_stored_entries(self):
+        docs = os.path.join(self.tmp, "docs")
+        os.makedirs(docs)
+        kept, gone = os.path.join(self.tmp, "kept.md"), os.path.join(self.tmp, "gone.md")
+        stored = {kept: ["/kept/", "2024-01-01"], gone: ["/gone/", "2024-01-01"]}
+        index = SitemapIndex(docs, stored)
+        index.finish({kept: os.path.join(docs, "kept.html")}, [], "/", "https://example.com")
+        self.assertEqual(index.entries, {kept: ["/kept/", "2024-01-01"]})
+        with open(os.path.join(docs, "sitemap.xml")) as file:
+            self.assertIn("<loc>https://example.com/kept/</loc>", file.read())
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,138 @@
+import os
+import sys
+import shutil
+import tempfile
+import threading
+import unittest
+import http.client
+from http.server import ThreadingHTTPServer
+from serve import SiteWatcher, InotifyWatcher, PollingWatcher, make_handler
+
+class TestSiteWatcher(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.cwd = os.getcwd()
+        os.chdir(self.root)
+        os.makedirs(os.path.join("content", "blog"))
+        os.makedirs("static")
+        os.makedirs("docs")
+        self.write("template.html", "<title>{{ Title }}</title>{{ Content }}")
+        self.write(os.path.join("content", "index.md"), "# Home")
+        self.write(os.path.join("content", "blog", "post.md"), "# Post")
+        self.state = SiteWatcher("content", "static", "docs", "template.html", "/")
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        shutil.rmtree(self.root)
+
+    def write(self, path, text):
+        with open(path, "w") as file:
+            file.write(text)
+
+    def read(self, path):
+        with open(path) as file:
+            return file.read()
+
+    def test_only_changed_page_is_rendered(self):
+        pages, assets, failures = self.state.handle({os.path.join("content", "blog", "post.md")})
+        self.assertEqual((pages, assets, failures), (1, 0, []))
+        self.assertTrue(os.path.exists(os.path.join("docs", "blog", "post.html")))
+        self.assertFalse(os.path.exists(os.path.join("docs", "index.html")))
+
+    def test_template_change_renders_every_page(self):
+        self.write("template.html", "<h1>{{ Title }}</h1>")
+        pages, _, _ = self.state.handle({"template.html"})
+        self.assertEqual(pages, 2)
+        self.assertEqual(self.read(os.path.join("docs", "index.html")), "<h1>Home</h1>")
+
+    def test_asset_sync_and_removal(self):
+        css = os.path.join("static", "index.css")
+        self.write(css, "body {}")
+        self.state.handle({css})
+        self.assertEqual(self.read(os.path.join("docs", "index.css")), "body {}")
+        os.remove(css)
+        self.state.handle({css})
+        self.assertFalse(os.path.exists(os.path.join("docs", "index.css")))
+
+    def test_frontmatter_change_rebuilds_listings(self):
+        post = os.path.join("content", "blog", "post.md")
+        blog_index = os.path.join("docs", "blog", "index.html")
+        self.state.handle({post})
+        self.assertIn(">Post</a>", self.read(blog_index))
+        self.write(post, "---\ntitle: Renamed\n---\n# Post")
+        self.state.handle({post})
+        self.assertIn(">Renamed</a>", self.read(blog_index))
+
+    def test_failures_are_reported(self):
+        self.write(os.path.join("content", "index.md"), "no title")
+        _, _, failures = self.state.handle({os.path.join("content", "index.md")})
+        self.assertEqual(len(failures), 1)
+
+class TestBasepathHandler(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        with open(os.path.join(self.root, "index.html"), "w") as file:
+            file.write("home")
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(self.root, "/blog/"))
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        shutil.rmtree(self.root)
+
+    def get(self, path):
+        connection = http.client.HTTPConnection("127.0.0.1", self.server.server_address[1])
+        self.addCleanup(connection.close)
+        connection.request("GET", path)
+        response = connection.getresponse()
+        return response.status, response.getheader("Location"), response.read()
+
+    def test_basepath_without_slash_redirects(self):
+        self.assertEqual(self.get("/blog")[:2], (301, "/blog/"))
+        self.assertEqual(self.get("/blog?q=1")[:2], (301, "/blog/?q=1"))
+        self.assertEqual(self.get("/blog/"), (200, None, b"home"))
+        self.assertEqual(self.get("/blogger")[0], 404)
+
+class TestPollingWatcher(unittest.TestCase):
+    def test_detects_changes(self):
+        root = tempfile.mkdtemp()
+        try:
+            path = os.path.join(root, "page.md")
+            watcher = PollingWatcher([root], [], interval=0.01)
+            with open(path, "w") as file:
+                file.write("# Page")
+            self.assertEqual(watcher.wait(), {os.path.normpath(path)})
+        finally:
+            shutil.rmtree(root)
+
+@unittest.skipUnless(sys.platform.startswith("linux"), "inotify is Linux only")
+class TestInotifyWatcher(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        self.tree = os.path.join(self.root, "content")
+        os.makedirs(os.path.join(self.tree, "blog", "old"))
+        self.pages = {os.path.join(self.tree, "blog", "post.md"), os.path.join(self.tree, "blog", "old", "draft.md")}
+        for path in self.pages:
+            with open(path, "w") as file:
+                file.write("# Page")
+        self.watcher = InotifyWatcher([self.tree], [])
+        self.addCleanup(os.close, self.watcher.fd)
+
+    def test_directory_moved_away_reports_its_files(self):
+        os.rename(os.path.join(self.tree, "blog"), os.path.join(self.root, "blog"))
+        self.assertEqual(self.watcher.wait(), self.pages)
+        # Its watches went with it, so later edits outside the tree are not seen
+        self.assertEqual(list(self.watcher.watches.values()), [self.tree])
+        with open(os.path.join(self.root, "blog", "post.md"), "w") as file:
+            file.write("# Edited")
+        self.assertEqual(self.watcher.read_events(0.05), set())
+
+    def test_directory_deleted(self):
+        shutil.rmtree(os.path.join(self.tree, "blog"))
+        self.assertEqual(self.watcher.wait(), self.pages)
+        self.assertEqual(list(self.watcher.watches.values()), [self.tree])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,63 @@
+import os
+import shutil
+import tempfile
+import unittest
+from template import Template, load_template
+from htmlnode import ParentNode, LeafNode, apply_basepath
+
+class TestTemplate(unittest.TestCase):
+    def test_render_slots(self):
+        template = Template("<title>{{ Title }}</title><main>{{Content}}</main>")
+        self.assertEqual(template.render({"Title": "Hi", "Content": "<p>x</p>"}), "<title>Hi</title><main><p>x</p></main>")
+
+    def test_render_node_content(self):
+        template = Template("<main>{{ Content }}</main>")
+        node = ParentNode("p", [LeafNode("b", "bold")])
+        self.assertEqual(template.render({"Content": node}), "<main><p><b>bold</b></p></main>")
+
+    def test_extra_variables(self):
+        template = Template('<meta name="description" content="{{ Description }}"><time>{{ Date }}</time>')
+        html = template.render({"Description": "About", "Date": "2024-01-01"})
+        self.assertEqual(html, '<meta name="description" content="About"><time>2024-01-01</time>')
+
+    def test_unknown_slot_left_alone(self):
+        template = Template("<p>{{ Missing }}</p>")
+        self.assertEqual(template.render({}), "<p>{{ Missing }}</p>")
+
+    def test_basepath_only_rewrites_template(self):
+        template = Template('<link href="/index.css"><a href="//cdn.example.com/x">{{ Content }}')
+        html = template.render({"Content": 'text about href="/x"'}, "/site/")
+        self.assertEqual(html, '<link href="/site/index.css"><a href="//cdn.example.com/x">text about href="/x"')
+
+class TestApplyBasepath(unittest.TestCase):
+    def test_rewrites_generated_links(self):
+        node = ParentNode("p", [
+            LeafNode("a", "home", {"href": "/blog"}),
+            LeafNode("img", "", {"src": "/images/a.png", "alt": "a"}),
+            LeafNode("a", "out", {"href": "https://example.com"}),
+        ])
+        apply_basepath(node, "/site/")
+        self.assertEqual(
+            node.to_html(),
+            '<p><a href="/site/blog">home</a><img src="/site/images/a.png" alt="a"></img><a href="https://example.com">out</a></p>',
+        )
+
+class TestLoadTemplate(unittest.TestCase):
+    def test_cached_until_modified(self):
+        root = tempfile.mkdtemp()
+        try:
+            path = os.path.join(root, "template.html")
+            with open(path, "w") as file:
+                file.write("<p>{{ Title }}</p>")
+            first = load_template(path)
+            self.assertIs(load_template(path), first)
+
+            with open(path, "w") as file:
+                file.write("<h1>{{ Title }}</h1>")
+            os.utime(path, ns=(0, os.stat(path).st_mtime_ns + 1))
+            self.assertEqual(load_template(path).render({"Title": "x"}), "<h1>x</h1>")
+        finally:
+            shutil.rmtree(root)
+
+if __name__ == "__main__":
+    unittest.main()
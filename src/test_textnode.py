@@ -14,5 +14,10 @@ class TestTextNode(unittest.TestCase):
         node2 = TextNode("Random string", TextType.ITALIC)
         self.assertEqual(node, node2)
 
+    def test_slotted(self):
+        node = TextNode("link", TextType.LINK, "/x")
+        self.assertFalse(hasattr(node, "__dict__"))
+        self.assertEqual(repr(node), "TextNode(link, link, /x)")
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
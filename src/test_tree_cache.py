@@ -0,0 +1,71 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+import blocktype
+from blocktype import markdown_to_html_node
+from renderer import Renderer
+from template import Template
+from tree_cache import TreeCache, dump_node, load_node
+
+TEMPLATE = "<title>{{ Title }}</title>{{ Content }}"
+PAGE = b"---\ntags: [a]\n---\n# Title\n\nSome **bold** [link](/x) and ![img](/i.png)\n\n- one\n- _two_\n\n```\ncode\n```\n"
+
+class TestTreeCache(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.directory = os.path.join(self.root, "trees")
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def test_node_round_trip(self):
+        node = markdown_to_html_node(PAGE.decode().split("---\n", 2)[2])
+        self.assertEqual(load_node(dump_node(node)).to_html(), node.to_html())
+
+    def test_hit_matches_fresh_parse(self):
+        trees = TreeCache(self.directory, 1 << 20)
+        expected = Renderer(Template(TEMPLATE), "/base/").render_string(PAGE.decode())
+        for _ in range(2):
+            renderer = Renderer(Template(TEMPLATE), "/base/", trees=trees)
+            meta, title, node = renderer.parse(PAGE)
+            html = renderer.template.render(renderer.page_variables(meta, title, node), "/base/")
+            self.assertEqual(html, expected)
+        self.assertEqual(trees.counts, {"hits": 1, "misses": 1, "written": 1})
+
+        # Saved trees are untransformed, so another basepath reuses them
+        renderer = Renderer(Template(TEMPLATE), "/other/", trees=trees)
+        meta, title, node = renderer.parse(PAGE)
+        self.assertIn('href="/other/x"', node.to_html())
+        self.assertEqual(trees.counts["hits"], 2)
+
+    def test_parser_change_misses(self):
+        trees = TreeCache(self.directory, 1 << 20)
+        Renderer(Template(TEMPLATE), trees=trees).parse(PAGE)
+        with mock.patch.object(blocktype, "PARSER_VERSION", blocktype.PARSER_VERSION + 1):
+            self.assertIsNone(TreeCache(self.directory, 1 << 20).get(PAGE))
+
+    def test_corrupt_entry_is_a_miss(self):
+        trees = TreeCache(self.directory, 1 << 20)
+        Renderer(Template(TEMPLATE), trees=trees).parse(PAGE)
+        with open(trees.path(PAGE), 'wb') as file:
+            file.write(b"garbage")
+        self.assertIsNone(trees.get(PAGE))
+
+    def test_prune_evicts_least_recently_used(self):
+        trees = TreeCache(self.directory, 1 << 20)
+        renderer = Renderer(Template(TEMPLATE), trees=trees)
+        pages = [f"# Page {i}\n\ntext {i}\n".encode() for i in range(3)]
+        for i, page in enumerate(pages):
+            renderer.parse(page)
+            os.utime(trees.path(page), ns=(i, i))
+        trees.get(pages[0])
+        size = os.path.getsize(trees.path(pages[0]))
+        trees.max_bytes = size * 2
+        self.assertEqual(trees.prune(), 1)
+        self.assertFalse(os.path.exists(trees.path(pages[1])))
+        self.assertTrue(os.path.exists(trees.path(pages[0])))
+
+if __name__ == "__main__":
+    unittest.main()
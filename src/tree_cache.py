@@ -0,0 +1,135 @@
+import os
+import marshal
+import hashlib
+import threading
+from htmlnode import LeafNode, ParentNode
+import blocktype
+import highlight
+
+TREE_CACHE_VERSION = 1
+HEADER = b"SSGT%d\n" % TREE_CACHE_VERSION
+SUFFIX = ".tree"
+
+# The TreeCache for the running build, if --tree-cache is on
+active = None
+
+def parser_signature():
+    # Anything that can change the tree a source parses to: the parser's own
+    # version, every block type's matcher and renderer, registered ones too,
+    # and whether code blocks are highlighted
+    parts = [str(blocktype.PARSER_VERSION)]
+    parts.append(highlight.active.signature() if highlight.active is not None else "plain")
+    for block_type, renderer in sorted(blocktype.BLOCK_RENDERERS.items(), key=lambda item: str(item[0])):
+        parts.append(f"{block_type}={renderer.__module__}.{renderer.__qualname__}")
+    for block_type, matcher in blocktype.BLOCK_MATCHERS:
+        parts.append(f"{block_type}?{matcher.__module__}.{matcher.__qualname__}")
+    return "\n".join(parts)
+
+def dump_node(node):
+    # Leaves are (tag, value, props) and parents (tag, [children], props), so
+    # a str or a list in the middle tells them apart
+    if type(node) is LeafNode:
+        return (node.tag, node.value, dict(node.props) if node.props else None)
+    if type(node) is ParentNode:
+        return (node.tag, [dump_node(child) for child in node.children], dict(node.props) if node.props else None)
+    raise TypeError(f"can't cache a {type(node).__name__}")
+
+def load_node(data):
+    tag, body, props = data
+    if isinstance(body, list):
+        return ParentNode(tag, [load_node(child) for child in body], props)
+    return LeafNode(tag, body, props)
+
+class TreeCache:
+    # Parsed pages on disk, one file per source: the frontmatter, the title
+    # and the untransformed node of every block. Entries are keyed by the
+    # source's bytes and the parser signature, so a template, basepath or
+    # output setting change reuses them and any parser change misses.
+    def __init__(self, directory, max_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.signature = parser_signature().encode()
+        self.counts = {"hits": 0, "misses": 0, "written": 0}
+        self._lock = threading.Lock()
+
+    def path(self, data):
+        digest = hashlib.sha256(self.signature + b"\0" + data).hexdigest()
+        return os.path.join(self.directory, digest + SUFFIX)
+
+    def _count(self, name):
+        with self._lock:
+            self.counts[name] += 1
+
+    def get(self, data):
+        # Returns (meta, title, block nodes) for the source bytes, or None
+        path = self.path(data)
+        try:
+            with open(path, 'rb') as file:
+                raw = file.read()
+            if not raw.startswith(HEADER):
+                raise ValueError("unknown tree cache format")
+            meta, title, blocks = marshal.loads(raw[len(HEADER):])
+            nodes = [load_node(block) for block in blocks]
+            # Recently used entries are the last to be evicted
+            os.utime(path)
+        except (OSError, ValueError, EOFError, TypeError):
+            self._count("misses")
+            return None
+        self._count("hits")
+        return meta, title, nodes
+
+    def put(self, data, meta, title, nodes):
+        # Must run before the nodes are transformed
+        try:
+            payload = marshal.dumps((meta, title, [dump_node(node) for node in nodes]))
+        except (TypeError, ValueError):
+            # A custom node type or metadata marshal can't hold; just don't cache it
+            return
+        if len(payload) > self.max_bytes:
+            return
+        path = self.path(data)
+        os.makedirs(self.directory, exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as file:
+            file.write(HEADER + payload)
+        os.replace(tmp_path, path)
+        self._count("written")
+
+    def drain(self):
+        with self._lock:
+            counts = dict(self.counts)
+            for key in self.counts:
+                self.counts[key] = 0
+        return counts
+
+    def merge(self, counts):
+        with self._lock:
+            for key, value in counts.items():
+                self.counts[key] += value
+
+    def prune(self):
+        # Least recently used entries go first until the cache fits in max_bytes
+        try:
+            names = [name for name in os.listdir(self.directory) if name.endswith(SUFFIX)]
+        except FileNotFoundError:
+            return 0
+        entries = []
+        for name in names:
+            path = os.path.join(self.directory, name)
+            stat = os.stat(path)
+            entries.append((stat.st_mtime_ns, stat.st_size, path))
+        entries.sort()
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            os.remove(path)
+            total -= size
+            removed += 1
+        return removed
+
+    def summary(self, removed=0):
+        counts = self.counts
+        return (f"Tree cache: {counts['hits']} hits, {counts['misses']} misses, "
+                f"{counts['written']} written, {removed} evicted")